@@ -0,0 +1,105 @@
+"""
+JWT authentication without a per-request ``users`` lookup.
+
+``StatelessJWTAuthentication`` validates the access token, checks its
+``token_version`` against the user's (see ``accounts.tokens``) and returns a ``ClaimsUser``
+built from the token's ``user_id``, ``role`` and ``is_active`` claims —
+enough for ``IsAuthenticated``, ``IsAdminUserRole`` and queries filtered
+on ``user_id``.  Code that needs the full ``User`` reads
+``request.user.user``, which goes through a small per-process cache
+(``JWT_USER_CACHE_TTL`` seconds).  Tokens issued before the claims
+existed are served from the same cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+from .tokens import CLAIMS, is_revoked
+
+
+# ── Per-process user cache ──────────────────────────────────────
+
+
+class UserCache:
+    """Bounded, thread-safe ``pk → User`` cache with a fixed time to live."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # pk → (expires_at, user)
+
+    def get(self, pk):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(pk)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+        user = User.objects.filter(pk=pk).first()
+        with self._lock:
+            self._entries[pk] = (now + settings.JWT_USER_CACHE_TTL, user)
+            self._entries.move_to_end(pk)
+            while len(self._entries) > settings.JWT_USER_CACHE_SIZE:
+                self._entries.popitem(last=False)
+        return user
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+# ── Authentication ──────────────────────────────────────────────
+
+
+class ClaimsUser(TokenUser):
+    """A request user backed by the access token's claims."""
+
+    @cached_property
+    def id(self):
+        return User._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def is_active(self):
+        return self.token.get("is_active", False)
+
+    @cached_property
+    def user(self):
+        """The full ``User`` row, at most ``JWT_USER_CACHE_TTL`` seconds old."""
+        return user_cache.get(self.pk)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that trusts the token's claims instead of MySQL."""
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+        if is_revoked(validated_token):
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+
+        if all(claim in validated_token for claim in CLAIMS):
+            user = ClaimsUser(validated_token)
+        else:
+            user = user_cache.get(validated_token[api_settings.USER_ID_CLAIM])
+            if user is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,258 @@
+"""
+Refresh-token blacklist checks without a database round trip, and pruning.
+
+simplejwt checks every refresh token with
+``BlacklistedToken.objects.filter(token__jti=jti).exists()``.  Instead,
+each worker keeps a Bloom filter of the blacklisted JTIs:
+
+* built lazily from the unexpired ``BlacklistedToken`` rows, and rebuilt
+  in a background thread every ``JWT_BLACKLIST_REBUILD_INTERVAL`` seconds
+  (pruned and expired entries drop out, the filter is resized);
+* synced incrementally at most every ``JWT_BLACKLIST_SYNC_INTERVAL``
+  seconds, reading rows past the highest ``BlacklistedToken`` id the
+  filter had seen ``JWT_BLACKLIST_SYNC_OVERLAP`` seconds earlier — ids are
+  allocated in insert order but can commit out of order, so a transaction
+  shorter than the overlap is never skipped;
+* tokens blacklisted by this application are also marked with a file in
+  ``JWT_BLACKLIST_MARKER_DIR`` (``<time bucket>/<jti>``) until every worker
+  on the host has synced them.  Markers are not subject to cache culling,
+  and whole expired buckets are removed as workers sync.
+
+A JTI the filter has never seen, without a marker, is not blacklisted:
+the common case costs no query.  A filter hit is confirmed against the
+database, so false positives only cost the query simplejwt always made.
+
+``prune_expired`` deletes expired ``OutstandingToken`` rows (and, by
+cascade, their ``BlacklistedToken`` rows) a chunk of primary keys at a
+time, each in its own short transaction.
+"""
+
+import collections
+import hashlib
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ── Markers ─────────────────────────────────────────────────────
+
+
+def _marker_ttl():
+    return max(60, 4 * settings.JWT_BLACKLIST_SYNC_INTERVAL)
+
+
+def _bucket(offset=0):
+    return str(int(time.time() // _marker_ttl()) - offset)
+
+
+def mark(jti):
+    """Mark *jti* blacklisted for at least ``_marker_ttl()`` seconds."""
+    directory = os.path.join(settings.JWT_BLACKLIST_MARKER_DIR, _bucket())
+    os.makedirs(directory, exist_ok=True)
+    open(os.path.join(directory, jti), "w").close()
+
+
+def is_marked(jti):
+    return any(
+        os.path.exists(
+            os.path.join(settings.JWT_BLACKLIST_MARKER_DIR, _bucket(offset), jti)
+        )
+        for offset in (0, 1)
+    )
+
+
+def prune_markers():
+    """Remove marker buckets older than the previous one."""
+    keep = {_bucket(0), _bucket(1)}
+    try:
+        buckets = os.listdir(settings.JWT_BLACKLIST_MARKER_DIR)
+    except FileNotFoundError:
+        return
+    for bucket in set(buckets) - keep:
+        shutil.rmtree(
+            os.path.join(settings.JWT_BLACKLIST_MARKER_DIR, bucket),
+            ignore_errors=True,
+        )
+
+
+# ── Bloom filter ────────────────────────────────────────────────
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing of one BLAKE2b digest)."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.bits = max(8, math.ceil(bits))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(
+            self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value)
+        )
+
+
+# ── Per-process blacklist filter ────────────────────────────────
+
+
+class BlacklistFilter:
+    """A worker's view of the blacklisted JTIs (see the module docstring)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuilding = threading.Lock()
+        self._bloom = None
+        self._watermark = 0
+        self._seen = collections.deque()  # (monotonic time, watermark)
+        self._synced_at = 0.0
+        self._built_at = 0.0
+
+    def _rows(self, queryset):
+        return queryset.order_by("pk").values_list("pk", "token__jti").iterator()
+
+    def _build(self):
+        latest = BlacklistedToken.objects.order_by("-pk").values_list("pk", flat=True)
+        watermark = latest.first() or 0
+        live = BlacklistedToken.objects.filter(
+            pk__lte=watermark, token__expires_at__gt=timezone.now()
+        )
+        jtis = [jti for _, jti in self._rows(live)]
+        bloom = BloomFilter(
+            max(settings.JWT_BLACKLIST_FILTER_CAPACITY, 2 * len(jtis)),
+            settings.JWT_BLACKLIST_FILTER_ERROR_RATE,
+        )
+        for jti in jtis:
+            bloom.add(jti)
+        with self._lock:
+            # Entries synced meanwhile are past the new watermark and replayed
+            self._bloom, self._watermark = bloom, watermark
+            self._built_at = self._synced_at = time.monotonic()
+            self._seen.append((self._built_at, watermark))
+        logger.debug("Built the token blacklist filter with %d JTI(s)", len(jtis))
+
+    def _rebuild_in_background(self):
+        if not self._rebuilding.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self._build()
+            except Exception:
+                logger.exception("Token blacklist filter rebuild failed")
+            finally:
+                self._rebuilding.release()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _floor(self, now):
+        """The watermark as of ``JWT_BLACKLIST_SYNC_OVERLAP`` seconds ago."""
+        cutoff = now - settings.JWT_BLACKLIST_SYNC_OVERLAP
+        while len(self._seen) > 1 and self._seen[1][0] <= cutoff:
+            self._seen.popleft()
+        return self._seen[0][1] if self._seen else self._watermark
+
+    def _sync(self):
+        with self._lock:
+            floor = self._floor(time.monotonic())
+        rows = list(self._rows(BlacklistedToken.objects.filter(pk__gt=floor)))
+        with self._lock:
+            for _, jti in rows:
+                if jti not in self._bloom:
+                    self._bloom.add(jti)
+            if rows:
+                self._watermark = max(self._watermark, rows[-1][0])
+            self._synced_at = time.monotonic()
+            self._seen.append((self._synced_at, self._watermark))
+            if self._bloom.count > 2 * self._bloom.capacity:
+                self._built_at = 0.0  # overfull: rebuild at a larger size
+        prune_markers()
+
+    def _refresh(self):
+        if self._bloom is None:
+            with self._rebuilding:
+                if self._bloom is None:
+                    self._build()
+            return
+        now = time.monotonic()
+        if now - self._built_at >= settings.JWT_BLACKLIST_REBUILD_INTERVAL:
+            self._rebuild_in_background()
+        if now - self._synced_at >= settings.JWT_BLACKLIST_SYNC_INTERVAL:
+            self._sync()
+
+    def is_blacklisted(self, jti):
+        """Whether the refresh token *jti* has been blacklisted."""
+        self._refresh()
+        if jti in self._bloom:
+            return BlacklistedToken.objects.filter(token__jti=jti).exists()
+        # Blacklisted by another worker since this one last synced?
+        return is_marked(jti)
+
+    def note_blacklisted(self, jti):
+        """Publish a JTI this process just blacklisted to the other workers."""
+        mark(jti)
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+
+blacklist_filter = BlacklistFilter()
+
+
+# ── Pruning ─────────────────────────────────────────────────────
+
+
+def prune_expired(chunk_size=1000, pause=0.0, now=None):
+    """
+    Delete ``OutstandingToken`` rows that expired before *now*, with their
+    ``BlacklistedToken`` rows, *chunk_size* primary keys per transaction,
+    sleeping *pause* seconds between chunks.  Returns the number of
+    outstanding tokens deleted.
+
+    Expired rows are found by walking the primary key upwards: tokens are
+    issued with fixed lifetimes, so the expired ones sit at the low end and
+    each chunk's scan stops after *chunk_size* matches.
+    """
+    now = now or timezone.now()
+    deleted, last_pk = 0, 0
+    while True:
+        pks = list(
+            OutstandingToken.objects.filter(pk__gt=last_pk, expires_at__lte=now)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:chunk_size]
+        )
+        if not pks:
+            return deleted
+        with transaction.atomic():
+            _, per_model = OutstandingToken.objects.filter(pk__in=pks).delete()
+        deleted += per_model.get(OutstandingToken._meta.label, 0)
+        last_pk = pks[-1]
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,51 @@
+"""
+Delete expired refresh tokens from the simplejwt blacklist tables.
+
+Every login, registration and refresh adds an ``OutstandingToken`` row and
+every rotation a ``BlacklistedToken`` row; once a token has expired neither
+is needed.  Rows are deleted a chunk of primary keys per transaction, so
+no lock is held for long (see ``accounts.blacklist.prune_expired``).
+
+Usage:
+    python manage.py prune_tokens                      # run once
+    python manage.py prune_tokens --interval 3600      # loop every hour
+    python manage.py prune_tokens --chunk-size 500 --pause 0.1
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.blacklist import prune_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted JWTs in small chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.05,
+            help="Seconds to sleep between chunks.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Repeat every N seconds instead of running once.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        while True:
+            started = time.monotonic()
+            deleted = prune_expired(options["chunk_size"], options["pause"])
+            self.stdout.write(
+                f"Pruned {deleted} expired token(s) "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+            if not interval:
+                return
+            time.sleep(interval)
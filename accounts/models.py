@@ -1,3 +1,4 @@
+from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 
@@ -55,6 +56,10 @@ class User(AbstractUser):
         default=Role.USER,
         help_text="Application-level role: admin or user",
     )
+    token_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Bumped to revoke every JWT issued to this user so far",
+    )
 
     class Meta:
         db_table = "users"
@@ -64,5 +69,22 @@ class User(AbstractUser):
         ]
         ordering = ["-date_joined"]
 
+    def check_password(self, raw_password):
+        """
+        Like Django's, but a hash upgrade (e.g. more PBKDF2 iterations) on
+        login is flagged so that it does not revoke the user's tokens.
+        """
+
+        def setter(raw_password):
+            self.set_password(raw_password)
+            self._password = None
+            self._rehashing = True
+            try:
+                self.save(update_fields=["password"])
+            finally:
+                self._rehashing = False
+
+        return check_password(raw_password, self.password, setter)
+
     def __str__(self):
         return f"{self.email} ({self.get_full_name() or self.role})"
@@ -2,9 +2,12 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 
 from .models import User
+from .tokens import RoleRefreshToken, stamp_claims, tokens_for
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -51,11 +54,7 @@ class RegisterSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         """Append JWT tokens to the response."""
         data = super().to_representation(instance)
-        refresh = RefreshToken.for_user(instance)
-        data["tokens"] = {
-            "refresh": str(refresh),
-            "access": str(refresh.access_token),
-        }
+        data["tokens"] = tokens_for(instance)
         return data
 
 
@@ -80,8 +79,42 @@ class LoginSerializer(serializers.Serializer):
         return attrs
 
     def get_tokens(self, user):
-        refresh = RefreshToken.for_user(user)
-        return {
-            "refresh": str(refresh),
-            "access": str(refresh.access_token),
-        }
+        return tokens_for(user)
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refreshes tokens like simplejwt's serializer, but refuses revoked
+    refresh tokens and stamps the user's current role, active flag and
+    token version on the new tokens (see ``accounts.tokens``).
+    """
+
+    token_class = RoleRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = User.objects.filter(
+            pk=refresh.payload.get(api_settings.USER_ID_CLAIM)
+        ).first()
+        if (
+            user is None
+            or not user.is_active
+            or refresh.get("token_version", 0) != user.token_version
+        ):
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account"
+            )
+
+        stamp_claims(refresh, user)
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+
+        return data
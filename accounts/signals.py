@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import User
+from .tokens import forget_user, revoke_tokens
+
+# Changes that must invalidate the tokens already issued to a user
+REVOKING_FIELDS = ("role", "is_active", "password")
+
+
+@receiver(pre_save, sender=User)
+def detect_revoking_change(sender, instance, update_fields=None, **kwargs):
+    instance._revoke_tokens = False
+    if instance.pk is None or getattr(instance, "_rehashing", False):
+        return  # new user, or a password hash upgraded on login
+    watched = {*REVOKING_FIELDS, "token_version"}
+    if update_fields is not None and not set(update_fields) & watched:
+        return  # e.g. last_login
+    previous = (
+        User.objects.filter(pk=instance.pk)
+        .values(*REVOKING_FIELDS, "token_version")
+        .first()
+    )
+    if previous is None:
+        return
+    # Only revoke_tokens() moves the version; never write a stale one back
+    instance.token_version = previous["token_version"]
+    instance._revoke_tokens = any(
+        previous[field] != getattr(instance, field) for field in REVOKING_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def revoke_on_change(sender, instance, **kwargs):
+    if instance._revoke_tokens:
+        instance._revoke_tokens = False
+        instance.token_version = revoke_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_on_delete(sender, instance, **kwargs):
+    forget_user(instance.pk)
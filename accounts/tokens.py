@@ -0,0 +1,174 @@
+"""
+JWTs that carry the claims the API authorises on, and their revocation.
+
+Refresh and access tokens issued through ``RoleRefreshToken`` embed the
+user's ``role``, ``is_active`` flag and ``token_version``, so
+``StatelessJWTAuthentication`` can authorise a request without loading
+the ``User`` row.
+
+Claims are a snapshot taken at issue time.  When a user's role, active
+flag or password changes, ``revoke_tokens`` increments
+``User.token_version`` in the database, and every token carrying an older
+version is refused — access tokens by the authentication class, refresh
+tokens by ``RoleTokenRefreshSerializer``, which also re-reads the user and
+stamps fresh claims on every refresh.  Tokens issued right after the
+change carry the new version and stay valid.  Deleted users have no
+version, so their tokens are refused too.
+
+The current version is read through the shared cache:
+
+    auth:ver:<user_id>    the user's token_version
+
+The database stays authoritative: a missing or evicted entry is re-read
+from it, entries expire after ``JWT_TOKEN_VERSION_CACHE_TTL`` seconds, and
+a revocation overwrites the entry when it commits.  A worker with a
+per-process cache therefore sees a revocation within that TTL.
+
+Refresh tokens check the rotation blacklist through the per-process
+filter in ``accounts.blacklist`` rather than a query per refresh.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import (
+    AccessToken,
+    BlacklistMixin,
+    RefreshToken,
+)
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from config.shared_cache import shared_cache
+
+from .blacklist import blacklist_filter
+from .models import User
+
+CLAIMS = ("role", "is_active", "token_version")
+
+
+def _key(user_id):
+    return f"auth:ver:{user_id}"
+
+
+def stamp_claims(token, user):
+    """Copy the authorisation claims of *user* onto *token*."""
+    token["role"] = user.role
+    token["is_active"] = user.is_active
+    token["token_version"] = user.token_version
+    return token
+
+
+class RoleAccessToken(AccessToken):
+    pass
+
+
+class RoleRefreshToken(RefreshToken):
+    access_token_class = RoleAccessToken
+
+    @classmethod
+    def for_user(cls, user):
+        # simplejwt's BlacklistMixin stores the token in OutstandingToken
+        # before subclasses can add claims: stamp first, then store it
+        token = stamp_claims(super(BlacklistMixin, cls).for_user(user), user)
+        OutstandingToken.objects.create(
+            user_id=user.pk,
+            jti=token[api_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token["exp"]),
+        )
+        return token
+
+    def check_blacklist(self):
+        """Consult this worker's blacklist filter instead of querying every time."""
+        if not settings.JWT_BLACKLIST_FILTER_ENABLED:
+            return super().check_blacklist()
+        if blacklist_filter.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def _outstanding(self):
+        # simplejwt loads the User here; the outstanding row only needs its id
+        return OutstandingToken.objects.get_or_create(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            defaults={
+                "user_id": self.payload.get(api_settings.USER_ID_CLAIM),
+                "created_at": self.current_time,
+                "token": str(self),
+                "expires_at": datetime_from_epoch(self.payload["exp"]),
+            },
+        )[0]
+
+    def outstand(self):
+        return self._outstanding()
+
+    def blacklist(self):
+        """Blacklist this token and publish its JTI to the other workers."""
+        jti = self.payload[api_settings.JTI_CLAIM]
+        result = BlacklistedToken.objects.get_or_create(token=self._outstanding())
+        if settings.JWT_BLACKLIST_FILTER_ENABLED:
+            transaction.on_commit(lambda: blacklist_filter.note_blacklisted(jti))
+        return result
+
+
+def tokens_for(user):
+    """The ``{"refresh", "access"}`` pair returned by register and login."""
+    refresh = RoleRefreshToken.for_user(user)
+    return {
+        "refresh": str(refresh),
+        "access": str(refresh.access_token),
+    }
+
+
+# ── Revocation ──────────────────────────────────────────────────
+
+
+def revoke_tokens(user_id):
+    """
+    Refuse every token issued to *user_id* so far.  Returns the new
+    ``token_version`` (``None`` if the user does not exist).
+    """
+    User.objects.filter(pk=user_id).update(token_version=F("token_version") + 1)
+    version = (
+        User.objects.filter(pk=user_id).values_list("token_version", flat=True).first()
+    )
+    if version is not None:
+        transaction.on_commit(
+            lambda: shared_cache().set(
+                _key(user_id), version, settings.JWT_TOKEN_VERSION_CACHE_TTL
+            )
+        )
+    return version
+
+
+def forget_user(user_id):
+    """Drop the cached version of a deleted user."""
+    transaction.on_commit(lambda: shared_cache().delete(_key(user_id)))
+
+
+def current_version(user_id):
+    """*user_id*'s ``token_version``, or ``None`` if the user is gone."""
+    cache = shared_cache()
+    version = cache.get(_key(user_id))
+    if version is None:
+        version = (
+            User.objects.filter(pk=user_id)
+            .values_list("token_version", flat=True)
+            .first()
+        )
+        if version is not None:
+            # add, not set: never overwrite a revocation that committed meanwhile
+            cache.add(_key(user_id), version, settings.JWT_TOKEN_VERSION_CACHE_TTL)
+    return version
+
+
+def is_revoked(token):
+    """Whether *token* was issued before its user's latest revocation."""
+    version = current_version(token.get(api_settings.USER_ID_CLAIM))
+    return version is None or token.get("token_version", 0) != version
@@ -0,0 +1,99 @@
+"""
+Helpers for ``APILogMiddleware``: sampling decisions, body sanitisation and
+the batched writer for the ``api_logs`` collection.
+
+Only the sampling decision and a small dict build happen on the request
+thread; JSON parsing and sanitisation of the body run in the shipper's
+background thread.
+"""
+
+import json
+import re
+
+from django.conf import settings
+
+from .mongo import get_collection, insert_new
+
+SENSITIVE_KEY = re.compile(
+    r"pass(word)?|token|secret|refresh|access|authori[sz]ation|api[_-]?key|card|cvv",
+    re.IGNORECASE,
+)
+REDACTED = "***"
+
+
+class Sampler:
+    """
+    Per-path, per-status-class sampling rates.
+
+    The path rate is the longest matching prefix in
+    ``ANALYTICS_API_LOG_PATH_RATES`` (else ``ANALYTICS_API_LOG_SAMPLE_RATE``);
+    a status class listed in ``ANALYTICS_API_LOG_STATUS_RATES`` (``"5xx"``)
+    can only raise it, so errors are kept even on heavily sampled paths.
+    """
+
+    def __init__(self, default_rate, path_rates, status_rates):
+        self.default_rate = default_rate
+        self.path_rates = sorted(path_rates.items(), key=lambda item: -len(item[0]))
+        self.status_rates = status_rates
+        self.max_status_rate = max(status_rates.values(), default=0)
+        self._cache = {}
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            settings.ANALYTICS_API_LOG_SAMPLE_RATE,
+            settings.ANALYTICS_API_LOG_PATH_RATES,
+            settings.ANALYTICS_API_LOG_STATUS_RATES,
+        )
+
+    def path_rate(self, path):
+        rate = self._cache.get(path)
+        if rate is None:
+            rate = next(
+                (r for prefix, r in self.path_rates if path.startswith(prefix)),
+                self.default_rate,
+            )
+            if len(self._cache) < 10000:  # bounded: paths include object IDs
+                self._cache[path] = rate
+        return rate
+
+    def max_rate(self, path):
+        """Highest rate this path could be sampled at, whatever the status."""
+        return max(self.path_rate(path), self.max_status_rate)
+
+    def rate(self, path, status_code):
+        status_rate = self.status_rates.get(f"{status_code // 100}xx", 0)
+        return max(self.path_rate(path), status_rate)
+
+
+def sanitise(value):
+    """Recursively replace values under sensitive-looking keys."""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if SENSITIVE_KEY.search(str(key)) else sanitise(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [sanitise(item) for item in value]
+    return value
+
+
+def _body(raw):
+    if not raw:
+        return {}
+    try:
+        body = json.loads(raw)
+    except ValueError:
+        return {"_unparsed_bytes": len(raw)}
+    return sanitise(body) if isinstance(body, (dict, list)) else {"_value": body}
+
+
+def write_api_logs(docs):
+    """Shipper writer: finish the documents and bulk-insert them."""
+    from .models import APILog
+
+    for doc in docs:
+        if "raw_body" in doc:  # not yet finished (replays from the spool are)
+            doc["query_params"] = sanitise(doc["query_params"])
+            doc["request_body"] = _body(doc.pop("raw_body"))
+    insert_new(get_collection(APILog._meta.db_table), docs)
@@ -0,0 +1,238 @@
+"""
+Declared MongoDB indexes for the analytics collections, and query-plan
+checks for the reads that rely on them.
+
+``index_specs()`` is the single list of every index the analytics code
+needs.  ``ensure_indexes`` brings the database in line with it
+idempotently: missing indexes are created, a changed TTL is applied in
+place with ``collMod``, and an index whose keys or uniqueness changed is
+rebuilt.  The writers call it lazily for their own collections, and
+``manage.py ensure_mongo_indexes`` runs it for all of them on deploy.
+
+``explain_plans`` runs ``explain`` on the pipelines the views, rollups and
+suggest index actually issue, so a query that would fall back to a
+collection scan is caught before it reaches production data volumes.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from pymongo import ASCENDING, DESCENDING
+
+from .mongo import get_collection, get_db
+
+DAY = 86400
+
+
+def index_specs():
+    """``{collection: [(name, keys, options)]}``; TTLs are read from settings."""
+    return {
+        "search_logs": [
+            # Retention, and the time-range scans of the rollups
+            (
+                "ttl_search_log_timestamp",
+                [("timestamp", ASCENDING)],
+                {"expireAfterSeconds": settings.ANALYTICS_SEARCH_LOG_TTL_DAYS * DAY},
+            ),
+        ],
+        "route_counts": [
+            (
+                "uniq_route_bucket",
+                [
+                    ("granularity", ASCENDING),
+                    ("bucket", ASCENDING),
+                    ("source", ASCENDING),
+                    ("destination", ASCENDING),
+                ],
+                {"unique": True},
+            ),
+            (
+                "idx_route_bucket_count",
+                [("granularity", ASCENDING), ("bucket", ASCENDING), ("count", DESCENDING)],
+                {},
+            ),
+        ],
+        "route_sketches": [
+            ("idx_sketch_epoch", [("epoch", ASCENDING)], {}),
+            (
+                "ttl_sketch_updated_at",
+                [("updated_at", ASCENDING)],
+                {"expireAfterSeconds": 3 * settings.ANALYTICS_SKETCH_EPOCH_SECONDS},
+            ),
+        ],
+        "latency_histograms": [
+            (
+                "uniq_latency_endpoint_minute",
+                [("endpoint", ASCENDING), ("minute", ASCENDING)],
+                {"unique": True},
+            ),
+            (
+                "ttl_latency_minute",
+                [("minute", ASCENDING)],
+                {"expireAfterSeconds": settings.ANALYTICS_LATENCY_RETENTION_DAYS * DAY},
+            ),
+        ],
+        "api_logs": [
+            # Retention, and the admin's newest-first listing
+            (
+                "ttl_api_log_timestamp",
+                [("timestamp", ASCENDING)],
+                {"expireAfterSeconds": settings.ANALYTICS_API_LOG_TTL_DAYS * DAY},
+            ),
+            # The admin's status-code filter
+            (
+                "idx_api_log_status_timestamp",
+                [("status_code", ASCENDING), ("timestamp", DESCENDING)],
+                {},
+            ),
+        ],
+    }
+
+
+def _same_definition(current, keys, options):
+    return [tuple(key) for key in current["key"]] == list(keys) and bool(
+        current.get("unique")
+    ) == bool(options.get("unique"))
+
+
+def ensure_indexes(collections=None):
+    """
+    Create or update the declared indexes of *collections* (default: all).
+    Returns ``[(collection, index, action)]``, action being one of
+    ``"created"``, ``"ttl-updated"``, ``"rebuilt"`` or ``"ok"``.
+    """
+    specs = index_specs()
+    report = []
+    for collection_name in collections or specs:
+        collection = get_collection(collection_name)
+        existing = collection.index_information()
+        for name, keys, options in specs[collection_name]:
+            current = existing.get(name)
+            ttl = options.get("expireAfterSeconds")
+            if current is None:
+                collection.create_index(keys, name=name, **options)
+                action = "created"
+            elif not _same_definition(current, keys, options):
+                collection.drop_index(name)
+                collection.create_index(keys, name=name, **options)
+                action = "rebuilt"
+            elif current.get("expireAfterSeconds") != ttl:
+                if ttl is None:
+                    collection.drop_index(name)
+                    collection.create_index(keys, name=name, **options)
+                    action = "rebuilt"
+                else:
+                    get_db().command(
+                        "collMod",
+                        collection_name,
+                        index={"name": name, "expireAfterSeconds": ttl},
+                    )
+                    action = "ttl-updated"
+            else:
+                action = "ok"
+            report.append((collection_name, name, action))
+    return report
+
+
+# ── Query-plan checks ───────────────────────────────────────────
+
+
+def _explain_find(collection, query, sort=None, limit=0):
+    cursor = get_collection(collection).find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor.explain()
+
+
+def _explain_aggregate(collection, pipeline):
+    return get_db().command(
+        "explain",
+        {"aggregate": collection, "pipeline": pipeline, "cursor": {}},
+        verbosity="queryPlanner",
+    )
+
+
+def plan_checks():
+    """``{label: callable returning explain output}`` for each analytics read."""
+    from trains.suggest import POPULARITY_PIPELINE
+
+    from . import latency, routes, sketch
+
+    now = datetime.now(timezone.utc)
+    hour, day = routes.floor_hour(now), routes.floor_day(now)
+    top = [("count", DESCENDING)]
+    return {
+        "top routes (all time)": lambda: _explain_find(
+            routes.COLLECTION, {"granularity": "all", "bucket": None}, top, 5
+        ),
+        "top routes (date)": lambda: _explain_find(
+            routes.COLLECTION, {"granularity": "day", "bucket": day}, top, 5
+        ),
+        **{
+            f"top routes (window={window})": (
+                lambda window=window: _explain_aggregate(
+                    routes.COLLECTION,
+                    routes.window_pipeline(*routes._window_range(window, now), 5),
+                )
+            )
+            for window in routes.WINDOWS
+        },
+        "rollup: earliest search log": lambda: _explain_find(
+            "search_logs", {}, [("timestamp", ASCENDING)], 1
+        ),
+        "rollup: hour buckets": lambda: _explain_aggregate(
+            "search_logs", routes.hour_rollup_pipeline(hour - timedelta(hours=1), hour)
+        ),
+        "rollup: day buckets": lambda: _explain_aggregate(
+            routes.COLLECTION, routes.day_rollup_pipeline(day - timedelta(days=1), day)
+        ),
+        "rebuild: all-time totals": lambda: _explain_aggregate(
+            routes.COLLECTION, [{"$match": {"granularity": "day"}}]
+        ),
+        "station popularity": lambda: _explain_aggregate(
+            routes.COLLECTION, POPULARITY_PIPELINE
+        ),
+        "approximate top routes": lambda: _explain_find(
+            sketch.COLLECTION, {"epoch": {"$gte": sketch._current_epoch() - 1}}
+        ),
+        **{
+            f"latency ({label})": (
+                lambda endpoint=endpoint: _explain_aggregate(
+                    latency.COLLECTION, latency.summary_pipelines(endpoint)[0]
+                )
+            )
+            for label, endpoint in (
+                ("all endpoints", None),
+                ("one endpoint", "/api/trains/search/"),
+            )
+        },
+        "api logs (newest first)": lambda: _explain_find(
+            "api_logs", {}, [("timestamp", DESCENDING)], 50
+        ),
+        "api logs (by status)": lambda: _explain_find(
+            "api_logs", {"status_code": 500}, [("timestamp", DESCENDING)], 50
+        ),
+    }
+
+
+def plan_stages(explain):
+    """Every plan ``stage`` in an explain document, rejected plans excluded."""
+    if isinstance(explain, dict):
+        if isinstance(explain.get("stage"), str):
+            yield explain["stage"]
+        for key, value in explain.items():
+            if key != "rejectedPlans":
+                yield from plan_stages(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from plan_stages(value)
+
+
+def explain_plans():
+    """``[(label, stages)]`` for every check in :func:`plan_checks`."""
+    return [
+        (label, list(dict.fromkeys(plan_stages(explain()))))
+        for label, explain in plan_checks().items()
+    ]
@@ -0,0 +1,187 @@
+"""
+Mergeable per-endpoint latency histograms in ``latency_histograms``.
+
+Latencies are counted in log-spaced buckets — bucket *i* covers
+``(MIN_MS * GROWTH**(i-1), MIN_MS * GROWTH**i]`` with ``GROWTH = 2**(1/8)``
+— so a percentile read from the buckets overstates the true value by at
+most ~9%, whatever the range.  One document per (endpoint, UTC minute):
+
+    {"endpoint": "/api/trains/search/", "minute": <UTC minute start>,
+     "count": n, "sum_ms": s, "max_ms": m, "buckets": {"<i>": n_i, ...}}
+
+Observations are batched by a ``LogShipper`` and folded into ``$inc``
+upserts; percentiles for any window are computed by summing bucket counts
+across minutes, never by scanning raw logs.
+"""
+
+import collections
+import math
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateOne
+
+from . import indexes
+from .mongo import get_collection
+from .shipper import get_shipper
+
+COLLECTION = "latency_histograms"
+MIN_MS = 0.01
+GROWTH = 2 ** (1 / 8)
+PERCENTILES = (50, 90, 95, 99)
+
+# ?window= value → timedelta
+WINDOWS = {
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "1h": timedelta(hours=1),
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+}
+
+_indexes_ready = False
+
+
+def bucket_index(ms):
+    if ms <= MIN_MS:
+        return 0
+    return math.ceil(math.log(ms / MIN_MS, GROWTH))
+
+
+def bucket_upper(index):
+    return MIN_MS * GROWTH**index
+
+
+class LatencyHistogram:
+    """Sparse log-bucketed histogram; histograms merge by adding counts."""
+
+    def __init__(self):
+        self.buckets = collections.Counter()
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms, n=1):
+        self.buckets[bucket_index(ms)] += n
+        self.count += n
+        self.sum_ms += ms * n
+        self.max_ms = max(self.max_ms, ms)
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the *q*-th percentile."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return round(min(bucket_upper(index), self.max_ms), 3)
+        return round(self.max_ms, 3)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum_ms / self.count, 3) if self.count else None,
+            "max_ms": round(self.max_ms, 3),
+            **{f"p{q}_ms": self.percentile(q) for q in PERCENTILES},
+        }
+
+
+# ── Writing ─────────────────────────────────────────────────────
+
+
+def ensure_indexes():
+    global _indexes_ready
+    indexes.ensure_indexes([COLLECTION])
+    _indexes_ready = True
+
+
+def write_observations(batch):
+    """Shipper writer: fold ``(endpoint, ms, timestamp)`` tuples into ``$inc``s."""
+    minutes = collections.defaultdict(LatencyHistogram)
+    for endpoint, ms, timestamp in batch:
+        minute = timestamp.replace(second=0, microsecond=0)
+        minutes[(endpoint, minute)].add(ms)
+
+    if not _indexes_ready:
+        ensure_indexes()
+    get_collection(COLLECTION).bulk_write(
+        [
+            UpdateOne(
+                {"endpoint": endpoint, "minute": minute},
+                {
+                    "$inc": {
+                        "count": hist.count,
+                        "sum_ms": hist.sum_ms,
+                        **{f"buckets.{i}": n for i, n in hist.buckets.items()},
+                    },
+                    "$max": {"max_ms": hist.max_ms},
+                },
+                upsert=True,
+            )
+            for (endpoint, minute), hist in minutes.items()
+        ],
+        ordered=False,
+    )
+
+
+def record(endpoint, ms):
+    """Queue one observation; never blocks the request thread."""
+    get_shipper(COLLECTION, write=write_observations).submit(
+        (endpoint, ms, datetime.now(timezone.utc))
+    )
+
+
+# ── Reading ─────────────────────────────────────────────────────
+
+
+def summary_pipelines(endpoint=None, window="15m"):
+    """The totals and per-bucket aggregations behind :func:`percentiles`."""
+    match = {"minute": {"$gte": datetime.now(timezone.utc) - WINDOWS[window]}}
+    if endpoint:
+        match["endpoint"] = endpoint
+    totals = [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": "$endpoint",
+                "count": {"$sum": "$count"},
+                "sum_ms": {"$sum": "$sum_ms"},
+                "max_ms": {"$max": "$max_ms"},
+            }
+        },
+    ]
+    buckets = [
+        {"$match": match},
+        {"$project": {"endpoint": 1, "buckets": {"$objectToArray": "$buckets"}}},
+        {"$unwind": "$buckets"},
+        {
+            "$group": {
+                "_id": {"endpoint": "$endpoint", "bucket": "$buckets.k"},
+                "count": {"$sum": "$buckets.v"},
+            }
+        },
+    ]
+    return totals, buckets
+
+
+def percentiles(endpoint=None, window="15m"):
+    """Merged latency summary per endpoint over the last *window*."""
+    totals, buckets = summary_pipelines(endpoint, window)
+    histograms = collections.defaultdict(LatencyHistogram)
+    collection = get_collection(COLLECTION)
+    for row in collection.aggregate(totals):
+        hist = histograms[row["_id"]]
+        hist.count, hist.sum_ms, hist.max_ms = row["count"], row["sum_ms"], row["max_ms"]
+    for row in collection.aggregate(buckets):
+        histograms[row["_id"]["endpoint"]].buckets[int(row["_id"]["bucket"])] += row["count"]
+
+    return [
+        {"endpoint": name, **histograms[name].summary()} for name in sorted(histograms)
+    ]
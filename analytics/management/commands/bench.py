@@ -0,0 +1,378 @@
+"""
+Benchmark the hot API paths in-process and compare against a baseline.
+
+Each scenario sends ``--requests`` requests (after ``--warmup`` unmeasured
+ones) from ``--concurrency`` threads, each with its own Django test client
+and database connection, through the full middleware stack:
+
+    search      GET  /api/trains/search/ with filters from existing trains
+    booking     POST /api/bookings/, one seat at a time on one hot bench train
+    history     GET  /api/bookings/my/ for the bench users (offset and cursor)
+    top-routes  GET  /api/analytics/top-routes/ across windows and modes
+
+Requests carry JWTs of temporary bench users and come from varied client
+addresses, as real traffic does, so neither the per-IP anonymous rate
+limit of the public endpoints nor any per-user state skews the numbers
+(the throttle's cache lookups are still measured).  The report gives
+throughput, p50/p95/p99 latency, SQL queries per request and status codes
+per scenario as JSON.  With ``--baseline`` each scenario is compared
+against a saved report and the command fails if throughput, p95 latency
+or queries per request regressed by more than ``--tolerance``.  Every
+request is also checked against its view's ``QUERY_BUDGETS`` entry with
+``assert_query_budget``; the report counts the requests over budget, and
+``--check-budgets`` fails the command when there are any.  Bench rows
+(users, train, its stations and bookings) are deleted afterwards unless
+``--keep`` is given.
+
+Usage:
+    python manage.py bench
+    python manage.py bench --scenarios search,booking --concurrency 16 --requests 2000
+    python manage.py bench --save-baseline bench.json
+    python manage.py bench --baseline bench.json --tolerance 0.15
+    python manage.py bench --scenarios search,history --check-budgets
+"""
+
+import collections
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from accounts.tokens import RoleRefreshToken
+from bookings.models import Booking
+from config.query_budget import assert_query_budget, budget_for
+from trains.models import Station, Train
+
+SCENARIOS = ("search", "booking", "history", "top-routes")
+
+# Scenario → view, as labelled in /metrics and QUERY_BUDGETS
+VIEWS = {
+    "search": "trains.views.TrainSearchView",
+    "booking": "bookings.views.CreateBookingView",
+    "history": "bookings.views.MyBookingsView",
+    "top-routes": "analytics.views.TopRoutesView",
+}
+
+BENCH_EMAIL_DOMAIN = "bench.irtc.local"
+BENCH_TRAIN = "BENCHHOT"
+BENCH_STATIONS = ("Bench Central", "Bench Junction")
+
+# Metric → direction in which a change is a regression
+COMPARED = {"throughput_rps": -1, "p95_ms": 1, "queries_per_request": 1}
+
+
+def percentile(values, q):
+    """Nearest-rank *q*-th percentile of sorted *values*."""
+    if not values:
+        return None
+    return values[max(1, math.ceil(len(values) * q / 100)) - 1]
+
+
+def client_address(rng):
+    """A random private IPv4 address: one client among ~16 million."""
+    return f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+
+
+class Command(BaseCommand):
+    help = "Benchmark search, booking, history and top-routes requests in-process."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenarios",
+            default=",".join(SCENARIOS),
+            help="Comma-separated subset of: " + ", ".join(SCENARIOS),
+        )
+        parser.add_argument("--requests", type=int, default=500, help="Per scenario.")
+        parser.add_argument("--warmup", type=int, default=20, help="Per scenario.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--strategy",
+            default=None,
+            help="BOOKING_STRATEGY for the booking scenario (default: the setting).",
+        )
+        parser.add_argument(
+            "--no-search-cache",
+            action="store_true",
+            help="Disable the search result cache while benchmarking.",
+        )
+        parser.add_argument("--baseline", help="Compare against this saved report.")
+        parser.add_argument("--save-baseline", help="Write the report to this file.")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.1,
+            help="Allowed relative change before a metric counts as a regression.",
+        )
+        parser.add_argument(
+            "--check-budgets",
+            action="store_true",
+            help="Fail if any request exceeded its view's SQL query budget.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Leave the bench users, train and bookings in place.",
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options["scenarios"].split(",")]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+        overrides = {"ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"]}
+        if options["strategy"]:
+            overrides["BOOKING_STRATEGY"] = options["strategy"]
+        if options["no_search_cache"]:
+            overrides["SEARCH_CACHE_ENABLED"] = False
+
+        with override_settings(**overrides):
+            self._setup(options)
+            try:
+                report = {
+                    "settings": {
+                        "database": connection.vendor,
+                        "booking_strategy": settings.BOOKING_STRATEGY,
+                        "search_cache": settings.SEARCH_CACHE_ENABLED,
+                        "concurrency": options["concurrency"],
+                        "requests": options["requests"],
+                    },
+                    "scenarios": {
+                        name: self._run(name, options) for name in scenarios
+                    },
+                }
+            finally:
+                if not options["keep"]:
+                    self._teardown()
+
+        regressions = []
+        if options["check_budgets"]:
+            regressions += [
+                f"{name}: {result['over_budget']} request(s) over the query "
+                f"budget of {result['query_budget']}"
+                for name, result in report["scenarios"].items()
+                if result["over_budget"]
+            ]
+        if options["baseline"]:
+            with open(options["baseline"]) as handle:
+                baseline = json.load(handle)
+            report["comparison"], regressed = self._compare(
+                baseline, report, options["tolerance"]
+            )
+            report["regressions"] = regressed
+            regressions += regressed
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as handle:
+                json.dump(report, handle, indent=2)
+
+        self.stdout.write(json.dumps(report, indent=2))
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} failure(s): {'; '.join(regressions)}"
+            )
+
+    # ── Fixtures ──────────────────────────────────────────────
+
+    def _setup(self, options):
+        password = make_password(None)  # unusable; the bench authenticates by JWT
+        count = options["concurrency"]
+        User.objects.bulk_create(
+            [
+                User(email=f"bench-{i}@{BENCH_EMAIL_DOMAIN}", password=password)
+                for i in range(count)
+            ],
+            ignore_conflicts=True,
+        )
+        users = User.objects.filter(email__endswith="@" + BENCH_EMAIL_DOMAIN)
+        self.tokens = [
+            f"Bearer {RoleRefreshToken.for_user(user).access_token}"
+            for user in users.order_by("pk")[:count]
+        ]
+
+        now = timezone.now()
+        seats = options["requests"] + options["warmup"]
+        self.hot_train, _ = Train.objects.update_or_create(
+            train_number=BENCH_TRAIN,
+            defaults={
+                "name": "Bench Hot Train",
+                "source": BENCH_STATIONS[0],
+                "destination": BENCH_STATIONS[1],
+                "departure_time": now + timedelta(days=30),
+                "arrival_time": now + timedelta(days=30, hours=8),
+                "total_seats": seats,
+                "available_seats": seats,
+            },
+        )
+        if settings.BOOKING_STRATEGY == "sharded":
+            from trains.inventory import split_inventory
+
+            split_inventory(self.hot_train)
+
+        self.searches = list(
+            Train.objects.exclude(pk=self.hot_train.pk)
+            .order_by("?")
+            .values_list("source", "destination", "departure_date")[:200]
+        ) or [("New Delhi", "Mumbai Central", None)]
+
+    def _teardown(self):
+        Booking.objects.filter(train__train_number=BENCH_TRAIN).delete()
+        Booking.objects.filter(user__email__endswith="@" + BENCH_EMAIL_DOMAIN).delete()
+        Train.objects.filter(train_number=BENCH_TRAIN).delete()
+        # Created by Train.save(); unless real trains have started using them
+        Station.objects.filter(
+            name__in=BENCH_STATIONS, departures=None, arrivals=None
+        ).delete()
+        User.objects.filter(email__endswith="@" + BENCH_EMAIL_DOMAIN).delete()
+
+    # ── Requests ──────────────────────────────────────────────
+
+    def _search(self, rng):
+        source, destination, day = rng.choice(self.searches)
+        params = rng.choice(
+            [
+                {"source": source, "destination": destination},
+                {"source": source, "destination": destination, "date": day},
+                {"source": source},
+                {"destination": destination},
+                {"date": day},
+                {"source": source, "pagination": "cursor", "limit": 50},
+            ]
+        )
+        params = {key: value for key, value in params.items() if value is not None}
+        return "get", "/api/trains/search/", {"data": params}
+
+    def _booking(self, rng):
+        return (
+            "post",
+            "/api/bookings/",
+            {
+                "data": {"train": self.hot_train.pk, "seats_booked": 1},
+                "content_type": "application/json",
+            },
+        )
+
+    def _history(self, rng):
+        params = rng.choice([{}, {"pagination": "cursor"}, {"limit": 50}])
+        return "get", "/api/bookings/my/", {"data": params}
+
+    def _top_routes(self, rng):
+        params = rng.choice(
+            [
+                {},
+                {"limit": 10},
+                {"window": "24h"},
+                {"window": "7d"},
+                {"date": timezone.localdate().isoformat()},
+                {"mode": "approx"},
+            ]
+        )
+        return "get", "/api/analytics/top-routes/", {"data": params}
+
+    # ── Runner ────────────────────────────────────────────────
+
+    def _run(self, name, options):
+        build = {
+            "search": self._search,
+            "booking": self._booking,
+            "history": self._history,
+            "top-routes": self._top_routes,
+        }[name]
+        concurrency = options["concurrency"]
+        view = VIEWS[name]
+
+        def drive(limit, total, thread_results, index):
+            rng = random.Random(f"{options['seed']}:{name}:{index}")
+            client = Client(
+                HTTP_AUTHORIZATION=self.tokens[index % len(self.tokens)],
+                raise_request_exception=False,
+            )
+            try:
+                while next(total) < limit:
+                    method, path, kwargs = build(rng)
+                    kwargs["REMOTE_ADDR"] = client_address(rng)
+                    over_budget = False
+                    started = time.perf_counter()
+                    try:
+                        with assert_query_budget(view) as recorder:
+                            response = getattr(client, method)(path, **kwargs)
+                    except AssertionError:
+                        over_budget = True
+                    elapsed = (time.perf_counter() - started) * 1000
+                    thread_results.append(
+                        (elapsed, recorder.count, response.status_code, over_budget)
+                    )
+            finally:
+                connections.close_all()
+
+        results = []
+        for limit, keep in ((options["warmup"], False), (options["requests"], True)):
+            total = itertools.count()
+            per_thread = [[] for _ in range(concurrency)]
+            threads = [
+                threading.Thread(target=drive, args=(limit, total, per_thread[i], i))
+                for i in range(concurrency)
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - started
+            if keep:
+                results = [row for rows in per_thread for row in rows]
+
+        latencies = sorted(row[0] for row in results)
+        statuses = collections.Counter(str(row[2]) for row in results)
+        return {
+            "requests": len(results),
+            "throughput_rps": round(len(results) / wall, 1) if wall else None,
+            "p50_ms": round(percentile(latencies, 50), 2) if results else None,
+            "p95_ms": round(percentile(latencies, 95), 2) if results else None,
+            "p99_ms": round(percentile(latencies, 99), 2) if results else None,
+            "max_ms": round(latencies[-1], 2) if results else None,
+            "queries_per_request": (
+                round(sum(row[1] for row in results) / len(results), 2)
+                if results
+                else None
+            ),
+            "max_queries": max((row[1] for row in results), default=None),
+            "query_budget": budget_for(view),
+            "over_budget": sum(row[3] for row in results),
+            "statuses": dict(sorted(statuses.items())),
+            "errors": sum(n for status, n in statuses.items() if int(status) >= 500),
+        }
+
+    # ── Baseline comparison ───────────────────────────────────
+
+    def _compare(self, baseline, report, tolerance):
+        comparison, regressions = {}, []
+        for name, current in report["scenarios"].items():
+            before = baseline.get("scenarios", {}).get(name)
+            if not before:
+                continue
+            comparison[name] = {}
+            for metric, worse in COMPARED.items():
+                old, new = before.get(metric), current.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old
+                comparison[name][metric] = {
+                    "baseline": old,
+                    "current": new,
+                    "change": round(change, 4),
+                }
+                if change * worse > tolerance:
+                    regressions.append(f"{name} {metric} {old} -> {new}")
+        return comparison, regressions
@@ -0,0 +1,150 @@
+"""
+Compare the Space-Saving route sketch against exact counting on a
+synthetic, Zipf-distributed search stream.
+
+The stream is split across ``--workers`` sketches (as gunicorn workers
+would see it) which are then merged.  Reports ingest speed, query time,
+precision/recall of the top ``--top`` routes and the observed vs.
+guaranteed error, against an exact ``Counter`` and — unless ``--no-mongo``
+— the exact ``$group`` aggregation over the same logs in a scratch
+MongoDB collection (dropped afterwards).
+
+Usage:
+    python manage.py bench_heavy_hitters --searches 1000000 --routes 20000
+    python manage.py bench_heavy_hitters --capacity 200 --skew 1.2 --no-mongo
+"""
+
+import bisect
+import collections
+import itertools
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from analytics.sketch import SpaceSaving
+
+SCRATCH_COLLECTION = "bench_search_logs"
+
+
+def zipf_stream(searches, routes, skew, rng):
+    """*searches* route indices with P(rank r) proportional to 1 / r**skew."""
+    weights = [1 / (rank**skew) for rank in range(1, routes + 1)]
+    cumulative = list(itertools.accumulate(weights))
+    total = cumulative[-1]
+    return [
+        bisect.bisect_left(cumulative, rng.random() * total) for _ in range(searches)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Benchmark approximate heavy hitters against exact route counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--searches", type=int, default=500_000)
+        parser.add_argument("--routes", type=int, default=10_000)
+        parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent.")
+        parser.add_argument("--capacity", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=3)
+        parser.add_argument("--top", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--no-mongo",
+            action="store_true",
+            help="Skip the MongoDB aggregation baseline.",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        routes = [(f"Station {i}", f"Station {i + 1}") for i in range(options["routes"])]
+        stream = [
+            routes[i]
+            for i in zipf_stream(options["searches"], options["routes"], options["skew"], rng)
+        ]
+        top = options["top"]
+
+        # ── Sketch ingest (round-robin across simulated workers) ──
+        sketches = [SpaceSaving(options["capacity"]) for _ in range(options["workers"])]
+        t0 = time.perf_counter()
+        for i, route in enumerate(stream):
+            sketches[i % len(sketches)].offer(route)
+        ingest = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        merged = SpaceSaving.merge(sketches)
+        approx = merged.top(top)
+        query_ms = (time.perf_counter() - t0) * 1000
+
+        # ── Exact baselines ──
+        t0 = time.perf_counter()
+        exact = collections.Counter(stream)
+        exact_top = exact.most_common(top)
+        counter_ms = (time.perf_counter() - t0) * 1000
+
+        results = {
+            "searches": len(stream),
+            "distinct_routes": len(exact),
+            "capacity": options["capacity"],
+            "workers": options["workers"],
+            "sketch_ingest_per_sec": round(len(stream) / ingest) if ingest else None,
+            "sketch_query_ms": round(query_ms, 3),
+            "exact_counter_ms": round(counter_ms, 3),
+        }
+        if not options["no_mongo"]:
+            results["mongo_aggregation_ms"] = self._mongo_baseline(stream, top)
+
+        approx_keys = {key for key, _, _ in approx}
+        exact_keys = {key for key, _ in exact_top}
+        hits = len(approx_keys & exact_keys)
+        errors = [count - exact[key] for key, count, _ in approx]
+        results.update(
+            {
+                "top": top,
+                "precision": round(hits / len(approx_keys), 4) if approx_keys else None,
+                "recall": round(hits / len(exact_keys), 4) if exact_keys else None,
+                "max_overestimate": max(errors, default=0),
+                "max_reported_error": max((error for _, _, error in approx), default=0),
+                "guaranteed_error_bound": round(len(stream) / options["capacity"], 2),
+                "bounds_hold": all(
+                    count - error <= exact[key] <= count for key, count, error in approx
+                ),
+            }
+        )
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def _mongo_baseline(self, stream, top):
+        from analytics.mongo import get_collection
+
+        collection = get_collection(SCRATCH_COLLECTION)
+        collection.drop()
+        now = datetime.now(timezone.utc)
+        try:
+            for start in range(0, len(stream), 10_000):
+                collection.insert_many(
+                    [
+                        {"source": source, "destination": destination, "timestamp": now}
+                        for source, destination in stream[start : start + 10_000]
+                    ],
+                    ordered=False,
+                )
+            t0 = time.perf_counter()
+            list(
+                collection.aggregate(
+                    [
+                        {
+                            "$group": {
+                                "_id": {"source": "$source", "destination": "$destination"},
+                                "count": {"$sum": 1},
+                            }
+                        },
+                        {"$sort": {"count": -1}},
+                        {"$limit": top},
+                    ],
+                    allowDiskUse=True,
+                )
+            )
+            return round((time.perf_counter() - t0) * 1000, 3)
+        finally:
+            collection.drop()
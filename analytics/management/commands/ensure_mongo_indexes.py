@@ -0,0 +1,47 @@
+"""
+Create (or update) the MongoDB indexes declared in ``analytics.indexes``.
+
+Idempotent: existing indexes are left alone, changed TTLs are applied in
+place.  With ``--explain`` every analytics query is explained afterwards
+and the command fails if any of them would scan a whole collection.
+
+Usage:
+    python manage.py ensure_mongo_indexes
+    python manage.py ensure_mongo_indexes --explain
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.indexes import ensure_indexes, explain_plans
+
+
+class Command(BaseCommand):
+    help = "Create the analytics MongoDB indexes and optionally check query plans."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help="Explain the analytics queries and fail on any COLLSCAN.",
+        )
+
+    def handle(self, *args, **options):
+        for collection, name, action in ensure_indexes():
+            self.stdout.write(f"{collection}.{name}: {action}")
+
+        if not options["explain"]:
+            return
+
+        scans = []
+        for label, stages in explain_plans():
+            if "COLLSCAN" in stages:
+                scans.append(label)
+                self.stdout.write(self.style.ERROR(f"COLLSCAN  {label}: {' > '.join(stages)}"))
+            else:
+                self.stdout.write(f"ok        {label}: {' > '.join(stages)}")
+        if scans:
+            raise CommandError(
+                f"{len(scans)} analytics quer{'y' if len(scans) == 1 else 'ies'} "
+                f"would scan a whole collection: {', '.join(scans)}"
+            )
+        self.stdout.write(self.style.SUCCESS("All analytics queries use an index"))
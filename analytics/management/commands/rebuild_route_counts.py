@@ -0,0 +1,20 @@
+"""
+Recompute the ``route_counts`` collection from the raw ``search_logs``.
+
+Usage:
+    python manage.py rebuild_route_counts
+"""
+
+from django.core.management.base import BaseCommand
+
+from analytics.routes import rebuild_route_counts
+
+
+class Command(BaseCommand):
+    help = "Rebuild the pre-aggregated route counters from search_logs."
+
+    def handle(self, *args, **options):
+        total = rebuild_route_counts()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt route_counts: {total} counter document(s)")
+        )
@@ -0,0 +1,54 @@
+"""
+Incrementally roll raw ``search_logs`` up into hourly and daily route counters.
+
+Only hours closed since the last run's watermark are recomputed, so this is
+cheap to run often and must run at least once per log retention period.
+
+Usage:
+    python manage.py rollup_routes                   # run once
+    python manage.py rollup_routes --interval 300    # loop every 5 minutes
+    python manage.py rollup_routes --since 2026-03-01T00:00:00+00:00
+"""
+
+import time
+from datetime import timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from analytics.routes import rollup_routes
+
+
+class Command(BaseCommand):
+    help = "Roll search_logs up into route_counts from the stored watermark."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Repeat every N seconds instead of running once.",
+        )
+        parser.add_argument(
+            "--since",
+            help="Recompute from this ISO timestamp instead of the watermark.",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None or since.tzinfo is None:
+                raise CommandError("--since must be an ISO timestamp with a UTC offset")
+            since = since.astimezone(timezone.utc)
+
+        interval = options["interval"]
+        while True:
+            hours, days = rollup_routes(since=since)
+            self.stdout.write(
+                f"Rolled up {hours} hourly and {days} daily route counter(s)"
+            )
+            if not interval:
+                return
+            since = None
+            time.sleep(interval)
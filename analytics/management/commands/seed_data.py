@@ -1,18 +1,33 @@
 """
 Seed the database with sample trains and generate MongoDB search logs.
 
+Without size options this inserts the six sample trains and ten search
+logs.  With any of ``--trains/--users/--bookings/--logs`` it generates a
+deterministic (``--seed``), skewed data set for load testing instead:
+routes between catalogue stations are ranked by a Zipf distribution that
+decides how many trains serve a route and how often it is searched,
+departures are spread over the past month and the next six months, and
+bookings go Zipf-wise to trains, so hot trains sell out.  Rows are written
+with chunked ``bulk_create`` / ``insert_many`` and generated one chunk at
+a time, so memory does not grow with ``--bookings`` or ``--logs``.
+
 Usage (inside Docker):
     python manage.py seed_data
     python manage.py seed_data --flush   # clear existing data first
+    python manage.py seed_data --trains 5000 --users 100000 \
+        --bookings 1000000 --logs 10000000 --seed 7
 """
 
+import itertools
 import random
 import time
-from datetime import timedelta
+from array import array
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
 
 from django.conf import settings
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand
-from django.test import RequestFactory
 from django.utils import timezone
 
 SAMPLE_TRAINS = [
@@ -74,6 +89,46 @@ SEARCH_QUERIES = [
 ]
 
 
+STATION_NAMES = [
+    "New Delhi", "Mumbai Central", "Howrah", "Chennai Central", "Bangalore",
+    "Secunderabad", "Ahmedabad", "Pune", "Jaipur", "Lucknow", "Kanpur Central",
+    "Patna", "Bhopal", "Nagpur", "Indore", "Vadodara", "Surat", "Varanasi",
+    "Prayagraj", "Agra Cantt", "Amritsar", "Chandigarh", "Jammu Tawi",
+    "Guwahati", "Bhubaneswar", "Visakhapatnam", "Vijayawada", "Madurai",
+    "Coimbatore", "Ernakulam", "Thiruvananthapuram", "Mangalore", "Goa Madgaon",
+    "Ranchi", "Raipur", "Jabalpur", "Gwalior", "Jodhpur", "Udaipur City",
+    "Dehradun", "Haridwar", "Kota", "Ajmer", "Bikaner", "Gorakhpur",
+    "Dhanbad", "Asansol", "Siliguri", "Mysore", "Hubli", "Tirupati",
+    "Nashik Road", "Aurangabad", "Solapur", "Kolhapur", "Rajkot",
+    "Jhansi", "Bareilly", "Moradabad", "Kolkata",
+]
+TRAIN_KINDS = [
+    "Rajdhani Express", "Shatabdi Express", "Duronto Express", "Vande Bharat",
+    "Garib Rath", "Jan Shatabdi", "Humsafar Express", "Superfast Express",
+    "Intercity Express", "Mail",
+]
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Ananya", "Vikram", "Sneha", "Arjun", "Kavya"]
+LAST_NAMES = ["Sharma", "Iyer", "Patel", "Reddy", "Singh", "Das", "Nair", "Gupta"]
+
+SEAT_CHOICES = (1, 2, 3, 4, 5, 6)
+SEAT_WEIGHTS = (40, 30, 12, 10, 5, 3)
+
+SEED_TRAIN_PREFIX = "SD"  # + 8 digits = the 10-character train_number
+SEED_EMAIL_DOMAIN = "seed.irtc.local"
+SEED_PASSWORD = "SeedPass@123"
+
+
+def zipf_weights(n, skew):
+    """Cumulative weights with P(rank r) proportional to 1 / r**skew."""
+    return list(itertools.accumulate(1 / (rank**skew) for rank in range(1, n + 1)))
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
 class Command(BaseCommand):
     help = "Seed trains and generate MongoDB search logs for demonstration."
 
@@ -83,10 +138,25 @@ class Command(BaseCommand):
             action="store_true",
             help="Delete existing seed data before inserting.",
         )
+        parser.add_argument("--trains", type=int, help="Generated trains.")
+        parser.add_argument("--users", type=int, help="Generated users.")
+        parser.add_argument("--bookings", type=int, help="Generated bookings.")
+        parser.add_argument("--logs", type=int, help="Generated search logs.")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed.")
+        parser.add_argument(
+            "--skew", type=float, default=1.1, help="Zipf exponent of route popularity."
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000, help="Rows per bulk insert."
+        )
 
     def handle(self, *args, **options):
-        self._seed_trains(flush=options["flush"])
-        self._generate_search_logs(flush=options["flush"])
+        sizes = [options[name] for name in ("trains", "users", "bookings", "logs")]
+        if any(size is not None for size in sizes):
+            self._generate(options)
+        else:
+            self._seed_trains(flush=options["flush"])
+            self._generate_search_logs(flush=options["flush"])
         self.stdout.write(self.style.SUCCESS("\n✅ Seeding complete!"))
 
     # ── Trains ────────────────────────────────────────────────────
@@ -129,6 +199,8 @@ class Command(BaseCommand):
 
         from pymongo import MongoClient
 
+        from analytics.routes import count_routes, rebuild_route_counts
+
         client = MongoClient(settings.MONGO_URI)
         db = client[settings.DATABASES["mongo"]["NAME"]]
         collection = db["search_logs"]
@@ -155,6 +227,307 @@ class Command(BaseCommand):
             docs.append(doc)
 
         collection.insert_many(docs)
+        if flush:
+            rebuild_route_counts()
+        else:
+            count_routes(docs)
         self.stdout.write(
             f"  📊  Search logs: {len(docs)} documents inserted into MongoDB"
         )
+
+    # ── Generated data set (load testing) ─────────────────────────
+
+    def _generate(self, options):
+        self.rng = random.Random(options["seed"])
+        self.seed = options["seed"]
+        self.skew = options["skew"]
+        self.chunk_size = options["chunk_size"]
+        if options["flush"]:
+            self._flush_generated()
+
+        started = time.monotonic()
+        self._routes()
+        trains = self._train_specs(options["trains"] or 0)
+        booked = self._allocate_bookings(trains, options["bookings"] or 0)
+        train_ids = self._insert_trains(trains, booked)
+        user_ids = self._insert_users(options["users"] or 0)
+        self._insert_bookings(trains, train_ids, user_ids, options["bookings"] or 0)
+        self._insert_logs(trains, user_ids, options["logs"] or 0)
+        self.stdout.write(f"  ⏱️  {time.monotonic() - started:.1f}s")
+
+    def _delete_in_chunks(self, queryset):
+        """Delete *queryset* a chunk of PKs at a time, keeping cascades small."""
+        deleted = 0
+        while pks := list(queryset.values_list("pk", flat=True)[: self.chunk_size]):
+            deleted += queryset.model.objects.filter(pk__in=pks).delete()[0]
+        return deleted
+
+    def _flush_generated(self):
+        from accounts.models import User
+        from analytics.mongo import get_collection
+        from analytics.routes import COLLECTION, STATE_COLLECTION
+        from bookings.models import Booking
+        from trains.models import Train
+
+        seeded_users = User.objects.filter(email__endswith="@" + SEED_EMAIL_DOMAIN)
+        seeded_trains = Train.objects.filter(train_number__startswith=SEED_TRAIN_PREFIX)
+        bookings = self._delete_in_chunks(
+            Booking.objects.filter(train__in=seeded_trains)
+        ) + self._delete_in_chunks(Booking.objects.filter(user__in=seeded_users))
+        trains = self._delete_in_chunks(seeded_trains)
+        users = self._delete_in_chunks(seeded_users)
+        self.stdout.write(
+            f"  Flushed {trains} train, {users} user and {bookings} booking row(s)"
+        )
+        for name in ("search_logs", COLLECTION, STATE_COLLECTION):
+            get_collection(name).delete_many({})
+        self.stdout.write("  Flushed search logs and route counters")
+
+    def _routes(self):
+        """Catalogue stations and every ordered pair, ranked for the Zipf draws."""
+        from trains.models import Station, StationToken, station_tokens
+        from trains.suggest import note_stations_changed
+
+        existing = set(Station.objects.values_list("name", flat=True))
+        missing = [name for name in STATION_NAMES if name not in existing]
+        if missing:
+            Station.objects.bulk_create(
+                [Station(name=name) for name in missing], ignore_conflicts=True
+            )
+        stations = dict(
+            Station.objects.filter(name__in=STATION_NAMES).values_list("name", "pk")
+        )
+        new = Station.objects.filter(name__in=missing)
+        StationToken.objects.bulk_create(
+            [
+                StationToken(station=station, token=token)
+                for station in new
+                for token in station_tokens(station.name, station.aliases, station.code)
+            ],
+            ignore_conflicts=True,
+        )
+        if missing:
+            note_stations_changed([stations[name] for name in missing])
+
+        self.stations = stations
+        self.route_list = [
+            (source, destination)
+            for source in STATION_NAMES
+            for destination in STATION_NAMES
+            if source != destination
+        ]
+        self.rng.shuffle(self.route_list)  # rank 1 = most popular
+        self.route_weights = zipf_weights(len(self.route_list), self.skew)
+
+    def _train_specs(self, count):
+        """``[(route index, departure_time, total_seats)]`` for *count* trains."""
+        today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        routes = self.rng.choices(
+            range(len(self.route_list)), cum_weights=self.route_weights, k=count
+        )
+        return [
+            (
+                route,
+                today
+                + timedelta(
+                    days=self.rng.randint(-30, 180),
+                    minutes=self.rng.randrange(0, 24 * 60, 5),
+                ),
+                self.rng.choice((400, 500, 600, 800, 1000, 1200)),
+            )
+            for route in routes
+        ]
+
+    def _placements(self, trains, count):
+        """
+        ``(train index, seats, status)`` for up to *count* bookings.  A
+        train is drawn with its route's Zipf weight; a booking that does
+        not fit goes to the next train with room for any booking.  Uses its
+        own generator, so every call yields the same sequence: once to size
+        the trains, once to write the bookings.
+        """
+        from bookings.models import BookingStatus
+
+        rng = random.Random(self.seed + 1)
+        weights = list(
+            itertools.accumulate(1 / (route + 1) ** self.skew for route, _, _ in trains)
+        )
+        booked = array("l", bytes(8 * len(trains)))
+        # Union-find "next open train": trains with < MAX_SEATS left are skipped
+        next_open = array("l", range(len(trains) + 1))
+
+        def find(i):
+            root = i
+            while next_open[root] != root:
+                root = next_open[root]
+            while next_open[i] != root:
+                next_open[i], i = root, next_open[i]
+            return root
+
+        for _ in range(count if trains else 0):
+            index = rng.choices(range(len(trains)), cum_weights=weights)[0]
+            seats = rng.choices(SEAT_CHOICES, weights=SEAT_WEIGHTS)[0]
+            cancelled = rng.random() < 0.05
+            if trains[index][2] - booked[index] < seats:
+                index = find(index)
+                if index == len(trains):
+                    index = find(0)
+                    if index == len(trains):
+                        return  # every train is sold out
+            if not cancelled:
+                booked[index] += seats
+                if trains[index][2] - booked[index] < max(SEAT_CHOICES):
+                    next_open[index] = index + 1
+            yield (
+                index,
+                seats,
+                BookingStatus.CANCELLED if cancelled else BookingStatus.CONFIRMED,
+            )
+
+    def _allocate_bookings(self, trains, count):
+        """Confirmed seats per train, so trains are created with the right availability."""
+        from bookings.models import BookingStatus
+
+        booked = array("l", bytes(8 * len(trains)))
+        placed = 0
+        for index, seats, status in self._placements(trains, count):
+            if status == BookingStatus.CONFIRMED:
+                booked[index] += seats
+            placed += 1
+        if placed < count:
+            self.stdout.write(
+                self.style.WARNING(f"  Only {placed} bookings fit in the generated trains")
+            )
+        return booked
+
+    def _insert_trains(self, trains, booked):
+        from trains.models import Train
+
+        start = Train.objects.filter(train_number__startswith=SEED_TRAIN_PREFIX).count()
+
+        def rows():
+            for i, (route, departure, seats) in enumerate(trains):
+                source, destination = self.route_list[route]
+                yield Train(
+                    train_number=f"{SEED_TRAIN_PREFIX}{start + i:08d}",
+                    name=f"{source.split()[0]} {self.rng.choice(TRAIN_KINDS)}",
+                    source=source,
+                    destination=destination,
+                    source_station_id=self.stations[source],
+                    destination_station_id=self.stations[destination],
+                    departure_time=departure,
+                    arrival_time=departure
+                    + timedelta(minutes=self.rng.randrange(120, 36 * 60, 5)),
+                    total_seats=seats,
+                    available_seats=seats - booked[i],
+                )
+
+        for chunk in chunked(rows(), self.chunk_size):
+            Train.objects.bulk_create(chunk)  # fills departure_date
+
+        numbers = Train.objects.filter(
+            train_number__gte=f"{SEED_TRAIN_PREFIX}{start:08d}",
+            train_number__startswith=SEED_TRAIN_PREFIX,
+        ).values_list("train_number", "pk")
+        by_number = dict(numbers.iterator(chunk_size=self.chunk_size))
+        train_ids = array(
+            "l",
+            (by_number[f"{SEED_TRAIN_PREFIX}{start + i:08d}"] for i in range(len(trains))),
+        )
+        if trains:
+            self.stdout.write(f"  🚆  Trains: {len(trains)} created")
+        return train_ids
+
+    def _insert_users(self, count):
+        from accounts.models import User
+
+        start = User.objects.filter(email__endswith="@" + SEED_EMAIL_DOMAIN).count()
+        password = make_password(SEED_PASSWORD)  # hashing is the slow part: once
+
+        def rows():
+            for i in range(start, start + count):
+                yield User(
+                    email=f"user{i:07d}@{SEED_EMAIL_DOMAIN}",
+                    password=password,
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                )
+
+        for chunk in chunked(rows(), self.chunk_size):
+            User.objects.bulk_create(chunk)
+
+        user_ids = array(
+            "l",
+            User.objects.filter(email__endswith="@" + SEED_EMAIL_DOMAIN)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+            .iterator(chunk_size=self.chunk_size),
+        )
+        if count:
+            self.stdout.write(f"  👤  Users: {count} created (password {SEED_PASSWORD!r})")
+        return user_ids
+
+    def _insert_bookings(self, trains, train_ids, user_ids, count):
+        from bookings.models import Booking
+
+        if not count or not trains:
+            return
+        if not user_ids:
+            self.stdout.write(self.style.WARNING("  No users to book for: skipping bookings"))
+            return
+
+        def rows():
+            for index, seats, status in self._placements(trains, count):
+                yield Booking(
+                    user_id=user_ids[self.rng.randrange(len(user_ids))],
+                    train_id=train_ids[index],
+                    seats_booked=seats,
+                    status=status,
+                    pnr=Booking._generate_pnr(),
+                )
+
+        written = 0
+        for chunk in chunked(rows(), self.chunk_size):
+            Booking.objects.bulk_create(chunk)
+            written += len(chunk)
+        self.stdout.write(f"  🎫  Bookings: {written} created")
+
+    def _insert_logs(self, trains, user_ids, count):
+        """Zipf-distributed searches over the last month, counted as they go."""
+        from analytics.mongo import get_collection
+        from analytics.routes import count_routes
+
+        if not count:
+            return
+        collection = get_collection("search_logs")
+        now = datetime.now(dt_timezone.utc)
+        span = min(30, settings.ANALYTICS_SEARCH_LOG_TTL_DAYS) * 86400
+        dates = sorted(
+            {timezone.localtime(departure).date().isoformat() for _, departure, _ in trains}
+        ) or [timezone.localdate().isoformat()]
+
+        written = 0
+        for chunk in chunked(range(count), self.chunk_size):
+            routes = self.rng.choices(
+                self.route_list, cum_weights=self.route_weights, k=len(chunk)
+            )
+            docs = [
+                {
+                    "endpoint": "/api/trains/search/",
+                    "source": source,
+                    "destination": destination,
+                    "date": self.rng.choice(dates) if self.rng.random() < 0.6 else "",
+                    "user_id": (
+                        user_ids[self.rng.randrange(len(user_ids))]
+                        if user_ids and self.rng.random() < 0.5
+                        else None
+                    ),
+                    "execution_time_ms": round(self.rng.lognormvariate(2.5, 0.5), 2),
+                    "timestamp": now - timedelta(seconds=self.rng.random() * span),
+                }
+                for source, destination in routes
+            ]
+            collection.insert_many(docs, ordered=False)
+            count_routes(docs)
+            written += len(docs)
+        self.stdout.write(f"  📊  Search logs: {written} documents inserted into MongoDB")
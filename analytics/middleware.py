@@ -1,34 +1,34 @@
-import logging
-import threading
+import random
 import time
 from datetime import datetime, timezone
 
-logger = logging.getLogger(__name__)
+from django.conf import settings
+
+from . import latency, sketch
+from .apilog import Sampler, write_api_logs
+from .models import APILog
+from .routes import write_search_logs
+from .shipper import get_shipper
 
 
 class SearchAnalyticsMiddleware:
     """
     Logs GET /api/trains/search/ requests to MongoDB via pymongo.
+
+    Documents are handed to the per-process ``LogShipper`` for
+    ``search_logs``, which writes them in batches from one background
+    thread (see ``analytics.shipper``) and folds each batch into the
+    ``route_counts`` counters (see ``analytics.routes``).  The route is
+    also counted in this worker's heavy-hitters sketch (see
+    ``analytics.sketch``); with ``ANALYTICS_SEARCH_LOG_RAW = False`` only
+    the sketch is kept.
     """
 
     TARGET_PATH = "/api/trains/search/"
+    COLLECTION = "search_logs"
 
     def __init__(self, get_response):
         self.get_response = get_response
-        self._collection = None
-
-    # ── Lazy-init pymongo collection (one MongoClient per process) ──
-
-    @property
-    def collection(self):
-        if self._collection is None:
-            from pymongo import MongoClient
-            from django.conf import settings
-
-            client = MongoClient(settings.MONGO_URI)
-            db = client[settings.DATABASES["mongo"]["NAME"]]
-            self._collection = db["search_logs"]
-        return self._collection
 
     # ── Middleware entry point ──────────────────────────────────────
 
@@ -41,11 +41,18 @@ class SearchAnalyticsMiddleware:
         response = self.get_response(request)
         elapsed_ms = round((time.monotonic() - start) * 1000, 2)
 
+        source = request.GET.get("source", "")
+        destination = request.GET.get("destination", "")
+        if settings.ANALYTICS_SKETCH_ENABLED:
+            sketch.record(source, destination)
+        if not settings.ANALYTICS_SEARCH_LOG_RAW:
+            return response
+
         # Build the log document
         doc = {
             "endpoint": self.TARGET_PATH,
-            "source": request.GET.get("source", ""),
-            "destination": request.GET.get("destination", ""),
+            "source": source,
+            "destination": destination,
             "date": request.GET.get("date", ""),
             "user_id": (
                 request.user.pk
@@ -56,20 +63,106 @@ class SearchAnalyticsMiddleware:
             "timestamp": datetime.now(timezone.utc),
         }
 
-        # Fire-and-forget: write to MongoDB in a daemon thread
-        threading.Thread(
-            target=self._safe_insert,
-            args=(doc,),
-            daemon=True,
-        ).start()
+        # Fire-and-forget: queued for the batched background writer
+        get_shipper(self.COLLECTION, write=write_search_logs).submit(doc)
 
         return response
 
-    # ── Threaded insert with error swallowing ──────────────────────
 
-    def _safe_insert(self, doc: dict) -> None:
-        """Insert a document into MongoDB; never let logging failures propagate."""
+class APILogMiddleware:
+    """
+    Logs a sample of ``/api/`` requests into the ``APILog`` collection
+    (``api_logs``) in MongoDB.
+
+    The sampling draw happens before the view runs, so the request body is
+    only read (JSON, up to ``ANALYTICS_API_LOG_MAX_BODY`` bytes) when the
+    request could still be kept once its status is known.  Documents go
+    through a ``LogShipper``; parsing and sanitising happen in its writer
+    thread (see ``analytics.apilog``).
+    """
+
+    PATH_PREFIX = "/api/"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sampler = Sampler.from_settings()
+        self.max_body = settings.ANALYTICS_API_LOG_MAX_BODY
+        self.collection = APILog._meta.db_table
+
+    def _fits(self, content_length):
+        """Whether a body of *content_length* bytes may be logged."""
         try:
-            self.collection.insert_one(doc)
-        except Exception:
-            logger.exception("Failed to log search request to MongoDB")
+            length = int(content_length or 0)
+        except (TypeError, ValueError):
+            return False  # malformed header: leave the body to the view
+        return 0 <= length <= self.max_body
+
+    def __call__(self, request):
+        path = request.path
+        if not path.startswith(self.PATH_PREFIX):
+            return self.get_response(request)
+
+        draw = random.random()
+        if draw >= self.sampler.max_rate(path):
+            return self.get_response(request)
+
+        raw_body = b""
+        if (
+            request.method in ("POST", "PUT", "PATCH")
+            and request.content_type == "application/json"
+            and self._fits(request.META.get("CONTENT_LENGTH"))
+        ):
+            raw_body = request.body  # cached, so the view can still parse it
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        if draw >= self.sampler.rate(path, response.status_code):
+            return response
+
+        user = getattr(request, "user", None)
+        get_shipper(self.collection, write=write_api_logs).submit(
+            {
+                "method": request.method,
+                "path": path,
+                "status_code": response.status_code,
+                "user_id": user.pk if user is not None and user.is_authenticated else None,
+                "ip_address": request.META.get("REMOTE_ADDR"),
+                "query_params": {
+                    key: values[0] if len(values) == 1 else values
+                    for key, values in request.GET.lists()
+                },
+                "raw_body": raw_body,
+                "response_time_ms": elapsed_ms,
+                "user_agent": request.META.get("HTTP_USER_AGENT", "")[:500],
+                "timestamp": datetime.now(timezone.utc),
+            }
+        )
+        return response
+
+
+class LatencyHistogramMiddleware:
+    """
+    Times every resolved ``/api/`` request and records it in the
+    per-endpoint, per-minute latency histograms (see ``analytics.latency``).
+    Endpoints are URL patterns (``/api/trains/<int:pk>/``), not raw paths.
+    """
+
+    PATH_PREFIX = "/api/"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith(self.PATH_PREFIX):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        if match is not None and match.route:
+            latency.record("/" + match.route, elapsed_ms)
+        return response
@@ -0,0 +1,54 @@
+"""
+Shared pymongo access for the analytics collections.
+
+One ``MongoClient`` per process (pymongo clients are thread-safe and pool
+their own connections), created lazily on first use.
+"""
+
+from datetime import timezone
+
+from django.conf import settings
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+
+from config.metrics import MongoCommandListener
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = MongoClient(
+            settings.MONGO_URI,
+            serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            tz_aware=True,
+            tzinfo=timezone.utc,
+            event_listeners=[MongoCommandListener()],
+        )
+    return _client
+
+
+def get_db():
+    return get_client()[settings.DATABASES["mongo"]["NAME"]]
+
+
+def get_collection(name):
+    return get_db()[name]
+
+
+def insert_new(collection, docs):
+    """
+    ``insert_many(ordered=False)`` that treats duplicate ``_id`` values as
+    already written, so a batch replayed from the spool is not stored
+    twice.  Returns the documents that were actually inserted.
+    """
+    try:
+        collection.insert_many(docs, ordered=False)
+    except BulkWriteError as exc:
+        errors = exc.details.get("writeErrors", [])
+        duplicates = {error["index"] for error in errors if error.get("code") == 11000}
+        if exc.details.get("writeConcernErrors") or len(duplicates) != len(errors):
+            raise
+        return [doc for i, doc in enumerate(docs) if i not in duplicates]
+    return docs
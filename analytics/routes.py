@@ -0,0 +1,380 @@
+"""
+Pre-aggregated route counters in the ``route_counts`` collection.
+
+Every batch of search logs written by the shipper is also folded into
+``$inc`` upserts on one document per (granularity, bucket, route):
+
+    {"granularity": "hour", "bucket": <UTC hour start>, "source": ..., "destination": ..., "count": n}
+    {"granularity": "day",  "bucket": <UTC midnight>,   ...}
+    {"granularity": "all",  "bucket": None,             ...}
+
+so ``/api/analytics/top-routes/`` reads a handful of documents through the
+``(granularity, bucket, count)`` index instead of grouping ``search_logs``.
+
+Raw logs expire after ``ANALYTICS_SEARCH_LOG_TTL_DAYS`` (TTL index); the
+counters are kept.  ``rollup_routes`` re-derives the hourly and daily
+buckets of *closed* periods from the raw logs with ``$set`` (correcting
+any drift from failed live flushes), resuming from a watermark stored in
+``rollup_state`` so history is never recomputed.
+"""
+
+import collections
+import logging
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from . import indexes
+from .mongo import get_collection, insert_new
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "route_counts"
+STATE_COLLECTION = "rollup_state"
+GRANULARITIES = ("hour", "day", "all")
+
+# ?window= value → (bucket granularity, number of buckets incl. the current one)
+WINDOWS = {
+    "1h": ("hour", 1),
+    "24h": ("hour", 24),
+    "7d": ("day", 7),
+    "30d": ("day", 30),
+}
+
+_indexes_ready = False
+
+
+def ensure_indexes():
+    """Create the counter indexes and the ``search_logs`` TTL index."""
+    global _indexes_ready
+    indexes.ensure_indexes([COLLECTION, "search_logs"])
+    _indexes_ready = True
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def floor_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(moment):
+    return floor_hour(moment).replace(hour=0)
+
+
+def buckets(timestamp):
+    """``[(granularity, bucket)]`` a log written at *timestamp* counts towards."""
+    hour = floor_hour(timestamp)
+    return [("hour", hour), ("day", hour.replace(hour=0)), ("all", None)]
+
+
+# ── Live counting ───────────────────────────────────────────────
+
+
+def count_routes(docs):
+    """Fold search-log *docs* into the counters with one unordered bulk write."""
+    counts = collections.Counter()
+    for doc in docs:
+        source, destination = doc.get("source", ""), doc.get("destination", "")
+        if not source or not destination:
+            continue
+        for granularity, bucket in buckets(doc["timestamp"]):
+            counts[(granularity, bucket, source, destination)] += 1
+    if not counts:
+        return 0
+
+    if not _indexes_ready:
+        ensure_indexes()
+    get_collection(COLLECTION).bulk_write(
+        [
+            UpdateOne(
+                {
+                    "granularity": granularity,
+                    "bucket": bucket,
+                    "source": source,
+                    "destination": destination,
+                },
+                {"$inc": {"count": n}},
+                upsert=True,
+            )
+            for (granularity, bucket, source, destination), n in counts.items()
+        ],
+        ordered=False,
+    )
+    return len(counts)
+
+
+def write_search_logs(docs):
+    """
+    Shipper writer for ``search_logs``: store the raw logs, then count
+    them.  Every log is counted, not only the ones this call inserted: a
+    batch is only spooled when this raised, before its counts were
+    applied, so logs a failed attempt did store still need counting when
+    the batch is replayed.
+    """
+    insert_new(get_collection("search_logs"), docs)
+    count_routes(docs)
+
+
+# ── Queries ─────────────────────────────────────────────────────
+
+
+def _window_range(window, now=None):
+    granularity, size = WINDOWS[window]
+    now = now or _now()
+    if granularity == "hour":
+        return granularity, floor_hour(now) - timedelta(hours=size - 1)
+    return granularity, floor_day(now) - timedelta(days=size - 1)
+
+
+def window_pipeline(granularity, start, limit):
+    """Sum the *granularity* buckets from *start* on, per route, top *limit*."""
+    return [
+        {"$match": {"granularity": granularity, "bucket": {"$gte": start}}},
+        {
+            "$group": {
+                "_id": {"source": "$source", "destination": "$destination"},
+                "count": {"$sum": "$count"},
+            }
+        },
+        {"$sort": {"count": -1}},
+        {"$limit": limit},
+        {
+            "$project": {
+                "_id": 0,
+                "source": "$_id.source",
+                "destination": "$_id.destination",
+                "count": 1,
+            }
+        },
+    ]
+
+
+def top_routes(limit=5, window=None, date=None):
+    """
+    The *limit* most-searched routes: all time by default, over the last
+    *window* (a ``WINDOWS`` key, aligned to whole hours/days and including
+    the current one), or on one UTC *date*.
+    """
+    collection = get_collection(COLLECTION)
+    projection = {"_id": 0, "source": 1, "destination": 1, "count": 1}
+
+    if window is None:
+        # A single bucket: read straight off the (granularity, bucket, count) index
+        if date is None:
+            match = {"granularity": "all", "bucket": None}
+        else:
+            day = datetime(date.year, date.month, date.day, tzinfo=timezone.utc)
+            match = {"granularity": "day", "bucket": day}
+        rows = collection.find(match, projection).sort("count", DESCENDING).limit(limit)
+    else:
+        granularity, start = _window_range(window)
+        rows = collection.aggregate(window_pipeline(granularity, start, limit))
+    return [
+        {
+            "source": row["source"],
+            "destination": row["destination"],
+            "search_count": row["count"],
+        }
+        for row in rows
+    ]
+
+
+# ── Rollups ─────────────────────────────────────────────────────
+
+
+def _set_counts(rows, granularity):
+    ops = [
+        UpdateOne(
+            {
+                "granularity": granularity,
+                "bucket": row["_id"]["bucket"],
+                "source": row["_id"]["source"],
+                "destination": row["_id"]["destination"],
+            },
+            {"$set": {"count": row["count"]}},
+            upsert=True,
+        )
+        for row in rows
+    ]
+    if ops:
+        get_collection(COLLECTION).bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def _earliest_log_hour():
+    first = get_collection("search_logs").find_one(
+        {}, {"timestamp": 1}, sort=[("timestamp", ASCENDING)]
+    )
+    return floor_hour(first["timestamp"]) if first else None
+
+
+def hour_rollup_pipeline(since, until):
+    """Per-(hour, route) search counts of the raw logs in ``[since, until)``."""
+    return [
+        {
+            "$match": {
+                "timestamp": {"$gte": since, "$lt": until},
+                "source": {"$ne": ""},
+                "destination": {"$ne": ""},
+            }
+        },
+        {
+            "$group": {
+                "_id": {
+                    "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": "hour"}},
+                    "source": "$source",
+                    "destination": "$destination",
+                },
+                "count": {"$sum": 1},
+            }
+        },
+    ]
+
+
+def day_rollup_pipeline(first_day, days_end):
+    """Per-(day, route) sums of the hour buckets in ``[first_day, days_end)``."""
+    return [
+        {
+            "$match": {
+                "granularity": "hour",
+                "bucket": {"$gte": first_day, "$lt": days_end},
+            }
+        },
+        {
+            "$group": {
+                "_id": {
+                    "bucket": {"$dateTrunc": {"date": "$bucket", "unit": "day"}},
+                    "source": "$source",
+                    "destination": "$destination",
+                },
+                "count": {"$sum": "$count"},
+            }
+        },
+    ]
+
+
+def rollup_routes(since=None, now=None):
+    """
+    Recompute hour buckets for every closed hour between the watermark (or
+    *since*) and ``now - ANALYTICS_ROLLUP_LAG_SECONDS``, and day buckets
+    for every day that closed in that span, then advance the watermark.
+    Returns ``(hour buckets written, day buckets written)``.
+    """
+    ensure_indexes()
+    state = get_collection(STATE_COLLECTION)
+    now = now or _now()
+    until = floor_hour(now - timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG_SECONDS))
+
+    if since is None:
+        doc = state.find_one({"_id": COLLECTION})
+        since = doc["watermark"] if doc else _earliest_log_hour()
+    if since is None or since >= until:
+        return 0, 0
+    since = floor_hour(since)
+
+    hours = _set_counts(
+        get_collection("search_logs").aggregate(
+            hour_rollup_pipeline(since, until),
+            allowDiskUse=True,
+        ),
+        "hour",
+    )
+
+    # Days that ended inside (since, until] are now complete in hour buckets
+    first_day, days_end = floor_day(since), floor_day(until)
+    days = 0
+    if days_end > first_day:
+        days = _set_counts(
+            get_collection(COLLECTION).aggregate(
+                day_rollup_pipeline(first_day, days_end)
+            ),
+            "day",
+        )
+
+    state.update_one(
+        {"_id": COLLECTION}, {"$set": {"watermark": until}}, upsert=True
+    )
+    logger.info("Rolled up route counts from %s to %s", since, until)
+    return hours, days
+
+
+def _route_sums(match, value="$count"):
+    """``{(source, destination): sum of value}`` over the counters in *match*."""
+    rows = get_collection(COLLECTION).aggregate(
+        [
+            {"$match": match},
+            {
+                "$group": {
+                    "_id": {"source": "$source", "destination": "$destination"},
+                    "count": {"$sum": value},
+                }
+            },
+        ],
+        allowDiskUse=True,
+    )
+    return {
+        (row["_id"]["source"], row["_id"]["destination"]): row["count"]
+        for row in rows
+    }
+
+
+def rebuild_route_counts():
+    """
+    Re-derive the hour and day buckets for all retained logs, then correct
+    the all-time counters to the sum of the day buckets.  Buckets older
+    than the log retention are left as they are.
+
+    Live writes keep ``$inc``-ing the all-time counters and the open day
+    meanwhile, so the counters are never ``$set``: the closed days, which
+    live writes no longer touch, are summed first; then each all-time
+    counter is read together with its open-day count (the two move in
+    step) and ``$inc``-ed by the difference.  Searches counted during the
+    rebuild are kept.
+    """
+    since = _earliest_log_hour()
+    hours = days = 0
+    if since is not None:
+        hours, days = rollup_routes(since=since)
+
+    open_day = floor_day(_now())
+    closed = _route_sums({"granularity": "day", "bucket": {"$lt": open_day}})
+    # All-time count minus the open day's count: what the closed days add up to
+    current = _route_sums(
+        {
+            "$or": [
+                {"granularity": "all"},
+                {"granularity": "day", "bucket": {"$gte": open_day}},
+            ]
+        },
+        value={
+            "$cond": [
+                {"$eq": ["$granularity", "all"]},
+                "$count",
+                {"$multiply": ["$count", -1]},
+            ]
+        },
+    )
+
+    ops = []
+    for route in closed.keys() | current.keys():
+        delta = closed.get(route, 0) - current.get(route, 0)
+        if delta:
+            source, destination = route
+            ops.append(
+                UpdateOne(
+                    {
+                        "granularity": "all",
+                        "bucket": None,
+                        "source": source,
+                        "destination": destination,
+                    },
+                    {"$inc": {"count": delta}},
+                    upsert=True,
+                )
+            )
+    if ops:
+        get_collection(COLLECTION).bulk_write(ops, ordered=False)
+    return hours + days + len(ops)
@@ -0,0 +1,276 @@
+"""
+Batched, bounded background writer for analytics documents.
+
+Each process keeps one ``LogShipper`` per MongoDB collection.  Request
+threads only append to an in-memory queue (``submit`` never blocks); a
+single long-lived daemon thread drains it with ``insert_many`` whenever
+``ANALYTICS_LOG_BATCH_SIZE`` documents are waiting or
+``ANALYTICS_LOG_FLUSH_INTERVAL`` seconds have passed.
+
+When MongoDB falls behind and the queue reaches
+``ANALYTICS_LOG_QUEUE_SIZE``, ``ANALYTICS_LOG_DROP_POLICY`` decides what
+is lost: ``"oldest"`` evicts the head of the queue, ``"new"`` rejects the
+incoming document.  Remaining documents are flushed at interpreter exit
+(gunicorn workers exit normally on shutdown and restart).
+
+With ``ANALYTICS_SPOOL_ENABLED``, a batch MongoDB rejects is written to a
+durable local spool instead (see ``analytics.spool``) and the shipper
+stops calling MongoDB for ``ANALYTICS_SPOOL_RETRY_INTERVAL`` seconds, so
+an outage costs one failed write rather than one per batch.  After that
+the writer tries MongoDB again and, once it succeeds, replays the spool
+between live batches.
+"""
+
+import atexit
+import collections
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from .spool import Spool
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "oldest"
+DROP_NEW = "new"
+
+
+class LogShipper:
+    """Bounded queue plus one writer thread calling ``write(docs)``."""
+
+    def __init__(
+        self,
+        name,
+        write,
+        max_queue=10000,
+        batch_size=500,
+        flush_interval=1.0,
+        drop_policy=DROP_OLDEST,
+        spool=None,
+        retry_interval=5.0,
+    ):
+        if drop_policy not in (DROP_OLDEST, DROP_NEW):
+            raise ValueError(f"Unknown drop policy {drop_policy!r}")
+        self.name = name
+        self.write = write
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.spool = spool
+        self.retry_interval = retry_interval
+
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        self._retry_at = 0.0  # monotonic time before which MongoDB is skipped
+        self._backlog = spool is not None  # spooled documents may be waiting
+
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.spooled = 0
+        self.replayed = 0
+
+    # ── Producer side ─────────────────────────────────────────
+
+    def submit(self, doc):
+        """Queue *doc* for writing; returns ``False`` if it was dropped."""
+        with self._cond:
+            self._ensure_thread()
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                if self.drop_policy == DROP_NEW:
+                    return False
+                self._queue.popleft()
+            self._queue.append(doc)
+            self.queued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def _ensure_thread(self):
+        # Called with self._cond held.  A forked worker inherits the queue
+        # but not the thread, so start a fresh one per process.
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        if self._pid != os.getpid():
+            self._queue.clear()
+        self._pid = os.getpid()
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"log-shipper-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    # ── Writer side ───────────────────────────────────────────
+
+    def _take_batch(self):
+        return [
+            self._queue.popleft()
+            for _ in range(min(self.batch_size, len(self._queue)))
+        ]
+
+    def _healthy(self):
+        return time.monotonic() >= self._retry_at
+
+    def _write(self, batch):
+        with self._write_lock:
+            if self.spool is not None and not self._healthy():
+                self._spool(batch)
+                return
+            try:
+                self.write(batch)
+            except Exception:
+                if self.spool is None:
+                    self.failed += len(batch)
+                    logger.exception(
+                        "Failed to ship %d %s documents", len(batch), self.name
+                    )
+                    return
+                logger.exception(
+                    "Failed to ship %d %s documents; spooling for %ss",
+                    len(batch),
+                    self.name,
+                    self.retry_interval,
+                )
+                self._retry_at = time.monotonic() + self.retry_interval
+                self._spool(batch)
+            else:
+                self.flushed += len(batch)
+
+    def _spool(self, batch):
+        # Called with self._write_lock held
+        try:
+            self.spool.append(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Failed to spool %d %s documents", len(batch), self.name)
+        else:
+            self.spooled += len(batch)
+            self._backlog = True
+
+    def _replay(self):
+        """Replay one spooled segment once MongoDB is taking writes again."""
+        with self._write_lock:
+            if not self._backlog or not self._healthy():
+                return
+            self.spool.seal()
+            try:
+                replayed = self.spool.replay(self.write, self.batch_size)
+            except Exception:
+                self._retry_at = time.monotonic() + self.retry_interval
+                logger.exception("Failed to replay spooled %s documents", self.name)
+                return
+            self.replayed += replayed
+            self._backlog = bool(replayed)  # segments others hold are theirs
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._queue) < self.batch_size and not self._stopping:
+                    if self._backlog and self._healthy():
+                        break  # replay the spool between live batches
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+                stopping = self._stopping
+            if batch:
+                self._write(batch)
+            if self.spool is not None:
+                self._replay()
+            if stopping and not batch:
+                return
+
+    def flush(self):
+        """Synchronously write everything queued so far."""
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self, timeout=5.0):
+        """Stop the writer thread after it drains the queue."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread if self._pid == os.getpid() else None
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+        if self.spool is not None:
+            self.spool.seal()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "queued": self.queued,
+                "flushed": self.flushed,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "pending": len(self._queue),
+                "spooled": self.spooled,
+                "replayed": self.replayed,
+            }
+
+
+# ── Per-process registry ────────────────────────────────────────
+
+_shippers = {}
+_registry_lock = threading.Lock()
+
+
+def get_shipper(collection_name, write=None):
+    """
+    The shared ``LogShipper`` for MongoDB *collection_name*.  *write*
+    (``write(docs)``) replaces the default ``insert_many``; it only takes
+    effect for the call that creates the shipper.
+    """
+    shipper = _shippers.get(collection_name)
+    if shipper is not None:
+        return shipper
+    with _registry_lock:
+        if collection_name not in _shippers:
+            if write is None:
+                from .mongo import get_collection, insert_new
+
+                def write(docs):
+                    insert_new(get_collection(collection_name), docs)
+
+            spool = None
+            if settings.ANALYTICS_SPOOL_ENABLED:
+                spool = Spool(
+                    settings.ANALYTICS_SPOOL_DIR,
+                    collection_name,
+                    segment_bytes=settings.ANALYTICS_SPOOL_SEGMENT_BYTES,
+                    max_bytes=settings.ANALYTICS_SPOOL_MAX_BYTES,
+                )
+            _shippers[collection_name] = LogShipper(
+                collection_name,
+                write,
+                max_queue=settings.ANALYTICS_LOG_QUEUE_SIZE,
+                batch_size=settings.ANALYTICS_LOG_BATCH_SIZE,
+                flush_interval=settings.ANALYTICS_LOG_FLUSH_INTERVAL,
+                drop_policy=settings.ANALYTICS_LOG_DROP_POLICY,
+                spool=spool,
+                retry_interval=settings.ANALYTICS_SPOOL_RETRY_INTERVAL,
+            )
+        return _shippers[collection_name]
+
+
+@atexit.register
+def close_all():
+    for shipper in list(_shippers.values()):
+        shipper.close()
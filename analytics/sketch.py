@@ -0,0 +1,253 @@
+"""
+Approximate heavy hitters for search routes (Space-Saving).
+
+Each worker process keeps a ``SpaceSaving`` summary of at most
+``ANALYTICS_SKETCH_CAPACITY`` routes for the current epoch
+(``ANALYTICS_SKETCH_EPOCH_SECONDS``).  ``record`` is O(log k) and never
+touches the network; a daemon thread upserts the summary into the
+``route_sketches`` collection every ``ANALYTICS_SKETCH_PUSH_INTERVAL``
+seconds.  ``approx_top_routes`` merges the sketches of the current and
+previous epoch across all workers and returns the top routes in O(k) per
+worker.
+
+Error bounds (Metwally et al.; merged per Agarwal et al., "Mergeable
+Summaries"): for every reported route the true count lies in
+``[search_count - error, search_count]``, and ``error <= N / capacity``
+where N is the number of searches in the merged sketches.  Any route with
+more than ``N / capacity`` searches is guaranteed to be present.
+"""
+
+import atexit
+import heapq
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "route_sketches"
+
+
+class SpaceSaving:
+    """Space-Saving counter summary over hashable keys; thread-safe."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}  # key -> [count, error]
+        self.total = 0
+        self._heap = []  # lazy min-heap of (count, key); stale entries skipped
+        self._lock = threading.Lock()
+
+    def _min_entry(self):
+        while True:
+            count, key = self._heap[0]
+            entry = self.counts.get(key)
+            if entry is not None and entry[0] == count:
+                return count, key
+            heapq.heappop(self._heap)
+
+    def _push(self, count, key):
+        heapq.heappush(self._heap, (count, key))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(entry[0], k) for k, entry in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def offer(self, key, n=1):
+        with self._lock:
+            self.total += n
+            entry = self.counts.get(key)
+            if entry is not None:
+                entry[0] += n
+            elif len(self.counts) < self.capacity:
+                entry = self.counts[key] = [n, 0]
+            else:
+                # Replace the smallest counter; its count becomes our error
+                floor, evicted = self._min_entry()
+                heapq.heappop(self._heap)
+                del self.counts[evicted]
+                entry = self.counts[key] = [floor + n, floor]
+            self._push(entry[0], key)
+
+    def min_count(self):
+        """Largest count an unmonitored key could have (0 until full)."""
+        with self._lock:
+            if len(self.counts) < self.capacity:
+                return 0
+            return self._min_entry()[0]
+
+    def top(self, k):
+        """``[(key, count, error)]`` for the *k* largest counters."""
+        with self._lock:
+            best = heapq.nlargest(k, self.counts.items(), key=lambda item: item[1][0])
+        return [(key, count, error) for key, (count, error) in best]
+
+    # ── Merging and storage ───────────────────────────────────
+
+    @classmethod
+    def merge(cls, sketches, capacity=None):
+        """
+        Combine *sketches* into one summary of *capacity* counters.  A key
+        missing from a full sketch may have occurred up to that sketch's
+        minimum count times, which is added to both its count and error.
+        """
+        sketches = list(sketches)
+        capacity = capacity or max((s.capacity for s in sketches), default=1)
+        merged = cls(capacity)
+        base = 0
+        deltas = {}
+        for sketch in sketches:
+            floor = sketch.min_count()
+            base += floor
+            merged.total += sketch.total
+            with sketch._lock:
+                for key, (count, error) in sketch.counts.items():
+                    delta = deltas.setdefault(key, [0, 0])
+                    delta[0] += count - floor
+                    delta[1] += error - floor
+        best = heapq.nlargest(capacity, deltas.items(), key=lambda item: item[1][0])
+        merged.counts = {
+            key: [base + count, base + error] for key, (count, error) in best
+        }
+        merged._heap = [(entry[0], key) for key, entry in merged.counts.items()]
+        heapq.heapify(merged._heap)
+        return merged
+
+    def to_items(self):
+        with self._lock:
+            return [[*key, count, error] for key, (count, error) in self.counts.items()]
+
+    @classmethod
+    def from_doc(cls, doc):
+        sketch = cls(doc["capacity"])
+        sketch.total = doc["total"]
+        sketch.counts = {
+            (source, destination): [count, error]
+            for source, destination, count, error in doc["items"]
+        }
+        sketch._heap = [(entry[0], key) for key, entry in sketch.counts.items()]
+        heapq.heapify(sketch._heap)
+        return sketch
+
+
+# ── Per-process tracker ─────────────────────────────────────────
+
+_indexes_ready = False
+_lock = threading.Lock()
+_pid = None
+_epoch = None
+_sketch = None
+_closed = []  # finished epochs not yet pushed
+
+
+def _current_epoch():
+    return int(time.time() // settings.ANALYTICS_SKETCH_EPOCH_SECONDS)
+
+
+def _worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _start_pusher():
+    def run():
+        while True:
+            time.sleep(settings.ANALYTICS_SKETCH_PUSH_INTERVAL)
+            push()
+
+    threading.Thread(target=run, name="route-sketch-pusher", daemon=True).start()
+
+
+def record(source, destination):
+    """Count one search for ``(source, destination)`` in this worker's sketch."""
+    global _pid, _epoch, _sketch
+    if not source or not destination:
+        return
+    epoch = _current_epoch()
+    with _lock:
+        if _pid != os.getpid():  # first use, or forked child
+            _pid, _epoch, _closed[:] = os.getpid(), epoch, []
+            _sketch = SpaceSaving(settings.ANALYTICS_SKETCH_CAPACITY)
+            _start_pusher()
+        elif epoch != _epoch:
+            _closed.append((_epoch, _sketch))
+            _epoch, _sketch = epoch, SpaceSaving(settings.ANALYTICS_SKETCH_CAPACITY)
+        sketch = _sketch
+    sketch.offer((source, destination))
+
+
+def ensure_indexes():
+    """Epoch lookup index; sketches expire three epochs after their last push."""
+    global _indexes_ready
+    from . import indexes
+
+    indexes.ensure_indexes([COLLECTION])
+    _indexes_ready = True
+
+
+def push():
+    """Upsert this worker's sketches into ``route_sketches``."""
+    from pymongo import ReplaceOne
+
+    from .mongo import get_collection
+
+    with _lock:
+        if _pid != os.getpid() or _sketch is None:
+            return
+        pending = [*_closed, (_epoch, _sketch)]
+        _closed.clear()
+
+    now = datetime.now(timezone.utc)
+    ops = [
+        ReplaceOne(
+            {"_id": f"{_worker_id()}:{epoch}"},
+            {
+                "epoch": epoch,
+                "updated_at": now,
+                "capacity": sketch.capacity,
+                "total": sketch.total,
+                "items": sketch.to_items(),
+            },
+            upsert=True,
+        )
+        for epoch, sketch in pending
+        if sketch.total
+    ]
+    if not ops:
+        return
+    try:
+        if not _indexes_ready:
+            ensure_indexes()
+        get_collection(COLLECTION).bulk_write(ops, ordered=False)
+    except Exception:
+        logger.exception("Failed to push route sketch to MongoDB")
+        with _lock:  # retry finished epochs on the next push
+            _closed[:0] = [item for item in pending[:-1]]
+
+
+atexit.register(push)
+
+
+def approx_top_routes(limit=5):
+    """
+    Approximate all-worker top routes over the current and previous epoch,
+    with per-route ``error`` (max overestimate of ``search_count``).
+    """
+    from .mongo import get_collection
+
+    docs = get_collection(COLLECTION).find(
+        {"epoch": {"$gte": _current_epoch() - 1}}, {"_id": 0}
+    )
+    merged = SpaceSaving.merge(SpaceSaving.from_doc(doc) for doc in docs)
+    return [
+        {
+            "source": source,
+            "destination": destination,
+            "search_count": count,
+            "error": error,
+        }
+        for (source, destination), count, error in merged.top(limit)
+    ]
@@ -0,0 +1,218 @@
+"""
+Durable local spool for analytics batches MongoDB could not take.
+
+When a ``LogShipper`` write fails, the batch is appended to a segmented
+NDJSON spool under ``ANALYTICS_SPOOL_DIR`` — MongoDB Extended JSON via
+``bson.json_util``, so datetimes, ``ObjectId`` values and bytes round-trip —
+with a single ``fsync`` per batch.  Once MongoDB accepts writes again the
+shipper's thread replays the spool in batches between live writes.
+
+Files, per collection:
+
+    .<collection>.<host>.<pid>.<n>.tmp      being created
+    <collection>.<host>.<pid>.<n>.open      being appended to
+    <collection>.<host>.<pid>.<n>.ndjson    sealed, waiting for replay
+
+The appending process holds an exclusive ``flock`` on its open segment
+(taken before the file gets its visible name) and seals it by renaming
+when it reaches ``ANALYTICS_SPOOL_SEGMENT_BYTES`` or MongoDB recovers.
+A replayer also works under the segment's ``flock``, so each segment is
+replayed by one worker at a time; an open segment whose lock can be taken
+belonged to a process that has exited and is sealed by whoever finds it.
+Replay is at-least-once: documents keep the ``_id`` pymongo assigned, and
+duplicates from a replay interrupted by a crash are skipped on insert
+(see ``analytics.mongo.insert_new``).
+"""
+
+import fcntl
+import itertools
+import logging
+import os
+import socket
+import threading
+from datetime import timezone
+
+from bson import json_util
+
+logger = logging.getLogger(__name__)
+
+JSON_OPTIONS = json_util.JSONOptions(
+    json_mode=json_util.JSONMode.CANONICAL, tz_aware=True, tzinfo=timezone.utc
+)
+OPEN, SEALED, TMP = ".open", ".ndjson", ".tmp"
+
+
+class SpoolFull(Exception):
+    """The spool already holds ``max_bytes``; the batch was not written."""
+
+
+class Spool:
+    """Append-only segmented NDJSON spool for one collection."""
+
+    def __init__(self, directory, name, segment_bytes=16 << 20, max_bytes=1 << 30):
+        self.directory = directory
+        self.name = name
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._path = None
+        self._counter = itertools.count()
+
+    # ── Appending ─────────────────────────────────────────────
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stem = f"{self.name}.{socket.gethostname()}.{os.getpid()}.{next(self._counter)}"
+        tmp = os.path.join(self.directory, f".{stem}{TMP}")
+        path = os.path.join(self.directory, stem + OPEN)
+        handle = open(tmp, "ab")
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        os.rename(tmp, path)  # the lock moves with the inode
+        self._file, self._path = handle, path
+
+    def _seal(self):
+        # Called with self._lock held.  Rename before closing: closing
+        # releases the flock, and a replayer could take the segment first.
+        if self._file is None:
+            return
+        handle, path = self._file, self._path
+        self._file = self._path = None
+        try:
+            if os.fstat(handle.fileno()).st_size:
+                os.rename(path, path[: -len(OPEN)] + SEALED)
+            else:
+                os.unlink(path)
+        finally:
+            handle.close()
+
+    def size(self):
+        """Bytes currently spooled for this collection (all processes)."""
+        total = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(self.name + "."):
+                    try:
+                        total += entry.stat().st_size
+                    except FileNotFoundError:
+                        pass
+        return total
+
+    def append(self, docs):
+        """Durably append *docs*: one write and one ``fsync`` for the batch."""
+        data = b"".join(
+            json_util.dumps(doc, json_options=JSON_OPTIONS).encode() + b"\n"
+            for doc in docs
+        )
+        with self._lock:
+            if self._pid != os.getpid():  # first use, or forked child
+                self._pid, self._file, self._path = os.getpid(), None, None
+            if self._file is None:
+                self._open_segment()
+            if self.size() + len(data) > self.max_bytes:
+                raise SpoolFull(f"{self.name} spool is full ({self.max_bytes} bytes)")
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if self._file.tell() >= self.segment_bytes:
+                self._seal()
+
+    def seal(self):
+        """Make this process's open segment available for replay."""
+        with self._lock:
+            if self._pid == os.getpid():
+                self._seal()
+
+    # ── Replaying ─────────────────────────────────────────────
+
+    def _segments(self):
+        try:
+            names = sorted(
+                name
+                for name in os.listdir(self.directory)
+                if name.startswith(self.name + ".") and name.endswith((OPEN, SEALED))
+            )
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _lock_segment(self, path):
+        """Open and lock *path* without waiting; ``None`` if it is busy or gone."""
+        try:
+            handle = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+        try:
+            current = os.stat(path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current != os.fstat(handle.fileno()).st_ino:
+            handle.close()  # replayed (or requeued) while we were opening it
+            return None
+        return handle
+
+    def replay(self, write, batch_size):
+        """
+        Replay one segment through ``write(docs)`` in batches of
+        *batch_size*.  Returns the number of documents written.  If
+        *write* raises, what is left of the segment stays spooled and the
+        exception propagates.
+        """
+        with self._lock:
+            own = self._path if self._pid == os.getpid() else None
+        for path in self._segments():
+            if path == own:
+                continue
+            handle = self._lock_segment(path)
+            if handle is None:
+                continue
+            try:
+                if path.endswith(OPEN):  # its writer has exited
+                    sealed = path[: -len(OPEN)] + SEALED
+                    os.rename(path, sealed)
+                    path = sealed
+                return self._replay_segment(handle, path, write, batch_size)
+            finally:
+                handle.close()
+        return 0
+
+    def _decode(self, lines, path):
+        docs = []
+        for line in lines:
+            try:
+                docs.append(json_util.loads(line, json_options=JSON_OPTIONS))
+            except ValueError:
+                # Only the tail of a segment whose writer crashed mid-append
+                logger.warning("Skipping a truncated line in %s", path)
+        return docs
+
+    def _replay_segment(self, handle, path, write, batch_size):
+        lines = [line for line in handle if line.strip()]
+        written = 0
+        for start in range(0, len(lines), batch_size):
+            chunk = self._decode(lines[start : start + batch_size], path)
+            try:
+                if chunk:
+                    write(chunk)
+            except Exception:
+                self._requeue(path, lines[start:])
+                raise
+            written += len(chunk)
+        os.unlink(path)
+        logger.info("Replayed %d spooled %s documents from %s", written, self.name, path)
+        return written
+
+    def _requeue(self, path, lines):
+        """Replace the segment at *path* with its unreplayed *lines*."""
+        remainder = path + TMP
+        with open(remainder, "wb") as out:
+            out.writelines(lines)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(remainder, path)
@@ -1,7 +1,8 @@
 from django.urls import path
 
-from .views import TopRoutesView
+from .views import LatencyView, TopRoutesView
 
 urlpatterns = [
     path("top-routes/", TopRoutesView.as_view(), name="top-routes"),
+    path("latency/", LatencyView.as_view(), name="latency"),
 ]
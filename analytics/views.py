@@ -1,15 +1,28 @@
+import hashlib
+import json
 import logging
 
 from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from drf_spectacular.utils import extend_schema, inline_serializer
-from pymongo import MongoClient
 from rest_framework import serializers, status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from accounts.authentication import StatelessJWTAuthentication
+from accounts.permissions import IsAdminUserRole
+from config.shared_cache import shared_cache
+
+from . import latency
+from .routes import WINDOWS, top_routes
+from .sketch import approx_top_routes
+
 logger = logging.getLogger(__name__)
 
+TOP_ROUTES_KEY = "analytics:top-routes"
+
 
 class TopRouteSerializer(serializers.Serializer):
     """Serializer strictly for Swagger documentation of the top-routes response."""
@@ -17,28 +30,98 @@ class TopRouteSerializer(serializers.Serializer):
     source = serializers.CharField()
     destination = serializers.CharField()
     search_count = serializers.IntegerField()
+    error = serializers.IntegerField(
+        required=False,
+        help_text="mode=approx only: search_count may overstate the true count by up to this much.",
+    )
 
 
-# ── Lazy pymongo collection accessor ─────────────────────────────
+class TopRoutesQuerySerializer(serializers.Serializer):
+    """Validates the top-routes query string."""
 
-_client = None
+    window = serializers.ChoiceField(
+        choices=list(WINDOWS),
+        required=False,
+        help_text="Only count searches in the last 1h, 24h, 7d or 30d.",
+    )
+    date = serializers.DateField(
+        required=False,
+        help_text="Only count searches on this UTC day (YYYY-MM-DD).",
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        default=5,
+        min_value=1,
+        max_value=100,
+        help_text="Number of routes to return (default 5, max 100).",
+    )
+    mode = serializers.ChoiceField(
+        choices=["exact", "approx"],
+        required=False,
+        default="exact",
+        help_text="`approx` serves recent heavy hitters from the in-memory sketches.",
+    )
+
+    def validate(self, attrs):
+        if attrs.get("window") and attrs.get("date"):
+            raise serializers.ValidationError(
+                {"date": "Use either 'window' or 'date', not both."}
+            )
+        if attrs["mode"] == "approx" and (attrs.get("window") or attrs.get("date")):
+            raise serializers.ValidationError(
+                {"mode": "'approx' covers recent searches only; drop 'window'/'date'."}
+            )
+        return attrs
 
 
-def _get_collection():
-    """Return the ``search_logs`` collection, reusing a single MongoClient."""
-    global _client
-    if _client is None:
-        _client = MongoClient(settings.MONGO_URI)
-    db = _client[settings.DATABASES["mongo"]["NAME"]]
-    return db["search_logs"]
+def top_routes_entry(params):
+    """
+    ``{"etag": ..., "results": [...]}`` for validated query *params*.
+
+    The result is kept in the shared cache for
+    ``ANALYTICS_TOP_ROUTES_CACHE_TTL`` seconds; its digest is the ETag, so
+    a revalidation within that window never reaches MongoDB.
+    """
+    window, date, limit = params.get("window"), params.get("date"), params["limit"]
+    mode = params["mode"]
+    key = f"{TOP_ROUTES_KEY}:{mode}:{window or ''}:{date or ''}:{limit}"
+    cache = shared_cache()
+    entry = cache.get(key)
+    if entry is None:
+        if mode == "approx":
+            results = approx_top_routes(limit=limit)
+        else:
+            results = top_routes(limit=limit, window=window, date=date)
+        etag = hashlib.sha1(
+            json.dumps(results, sort_keys=True, default=str).encode()
+        ).hexdigest()[:20]
+        entry = {"etag": etag, "results": results}
+        cache.set(key, entry, settings.ANALYTICS_TOP_ROUTES_CACHE_TTL)
+    return entry
+
+
+def top_routes_etag(request, *args, **kwargs):
+    query = TopRoutesQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return None
+    try:
+        return top_routes_entry(query.validated_data)["etag"]
+    except Exception:
+        return None  # the view reports the outage
 
 
 class TopRoutesView(APIView):
     """
-    GET /api/analytics/top-routes/
+    GET /api/analytics/top-routes/?window=24h&limit=10
+    GET /api/analytics/top-routes/?date=2026-03-15
 
-    Returns the top 5 most-searched (source, destination) pairs
-    using a MongoDB aggregation pipeline on the ``search_logs`` collection.
+    Returns the most-searched (source, destination) pairs — all time by
+    default, over a recent window, or on one UTC day — read from the
+    pre-aggregated ``route_counts`` buckets (maintained as search logs are
+    written; see ``analytics.routes``).  ``?mode=approx`` instead merges
+    the per-worker Space-Saving sketches (see ``analytics.sketch``) and
+    adds an ``error`` bound to each route.  The result is cached briefly
+    and served with an ETag for conditional GET.
 
     Response format:
         [
@@ -54,9 +137,17 @@ class TopRoutesView(APIView):
         tags=["Analytics"],
         summary="Top searched routes",
         description=(
-            "Returns the top 5 most-searched (source, destination) pairs "
-            "using a MongoDB aggregation pipeline on the search_logs collection."
+            "Returns the most-searched (source, destination) pairs from the "
+            "pre-aggregated route_counts collection in MongoDB: all time by "
+            "default, over the last `window` (aligned to whole hours/days, "
+            "including the current one) or on one UTC `date`. "
+            "`mode=approx` answers from the merged per-worker heavy-hitters "
+            "sketches (current and previous epoch): the true count of each route "
+            "lies in `[search_count - error, search_count]`. "
+            "Send the previous `ETag` in `If-None-Match` to get "
+            "`304 Not Modified` while the cached result is unchanged."
         ),
+        parameters=[TopRoutesQuerySerializer],
         responses={
             200: TopRouteSerializer(many=True),
             503: inline_serializer(
@@ -65,49 +156,92 @@ class TopRoutesView(APIView):
             ),
         },
     )
+    @method_decorator(condition(etag_func=top_routes_etag))
     def get(self, request):
-        collection = _get_collection()
-
-        pipeline = [
-            # Only consider logs that have both source and destination
-            {
-                "$match": {
-                    "source": {"$ne": ""},
-                    "destination": {"$ne": ""},
-                }
-            },
-            # Group by (source, destination) pair and count
-            {
-                "$group": {
-                    "_id": {
-                        "source": "$source",
-                        "destination": "$destination",
-                    },
-                    "count": {"$sum": 1},
-                }
-            },
-            # Sort by count descending
-            {"$sort": {"count": -1}},
-            # Limit to top 5
-            {"$limit": 5},
-            # Reshape the output
-            {
-                "$project": {
-                    "_id": 0,
-                    "source": "$_id.source",
-                    "destination": "$_id.destination",
-                    "search_count": "$count",
-                }
-            },
-        ]
-
+        query = TopRoutesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
         try:
-            results = list(collection.aggregate(pipeline))
+            results = top_routes_entry(query.validated_data)["results"]
         except Exception:
-            logger.exception("MongoDB aggregation failed for top-routes")
+            logger.exception("MongoDB query failed for top-routes")
             return Response(
                 {"error": "Analytics service is temporarily unavailable."},
                 status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
         return Response(results)
+
+
+class LatencySummarySerializer(serializers.Serializer):
+    """Serializer strictly for Swagger documentation of the latency response."""
+
+    endpoint = serializers.CharField()
+    count = serializers.IntegerField()
+    mean_ms = serializers.FloatField()
+    max_ms = serializers.FloatField()
+    p50_ms = serializers.FloatField()
+    p90_ms = serializers.FloatField()
+    p95_ms = serializers.FloatField()
+    p99_ms = serializers.FloatField()
+
+
+class LatencyQuerySerializer(serializers.Serializer):
+    """Validates the latency query string."""
+
+    endpoint = serializers.CharField(
+        required=False,
+        help_text="URL pattern, e.g. `/api/trains/search/` or `/api/trains/<int:pk>/`.",
+    )
+    window = serializers.ChoiceField(
+        choices=list(latency.WINDOWS),
+        required=False,
+        default="15m",
+        help_text="Look-back window (default 15m).",
+    )
+
+
+class LatencyView(APIView):
+    """
+    GET /api/analytics/latency/?endpoint=/api/trains/search/&window=1h
+
+    Admin-only endpoint — p50/p90/p95/p99 latency per endpoint, computed by
+    merging the per-minute log-bucketed histograms in ``latency_histograms``
+    (see ``analytics.latency``).  Percentiles are bucket upper bounds, at
+    most ~9% above the true value.
+    """
+
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = [IsAdminUserRole]
+
+    @extend_schema(
+        tags=["Analytics"],
+        summary="Endpoint latency percentiles",
+        description=(
+            "Returns request count, mean, max and p50/p90/p95/p99 latency per "
+            "endpoint over the last `window`, merged from per-minute histograms. "
+            "Percentiles overstate the true value by at most ~9%. Admin only."
+        ),
+        parameters=[LatencyQuerySerializer],
+        responses={
+            200: LatencySummarySerializer(many=True),
+            503: inline_serializer(
+                name="LatencyUnavailable",
+                fields={"error": serializers.CharField()},
+            ),
+        },
+    )
+    def get(self, request):
+        query = LatencyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        try:
+            results = latency.percentiles(
+                endpoint=query.validated_data.get("endpoint"),
+                window=query.validated_data["window"],
+            )
+        except Exception:
+            logger.exception("MongoDB query failed for latency percentiles")
+            return Response(
+                {"error": "Analytics service is temporarily unavailable."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        return Response(results)
@@ -0,0 +1,249 @@
+"""
+Per-train booking group commit (``BOOKING_STRATEGY = "batched"``).
+
+Each API request enqueues a ``BookingRequest`` row and waits a short
+window for others to arrive.  Whichever request then manages to lock the
+train row (``SELECT … FOR UPDATE SKIP LOCKED``) becomes the batch leader:
+it applies every pending request for that train first-come-first-served
+in one transaction — one lock acquisition, one ``trains`` UPDATE (or, on
+a sharded train, UPDATEs of its locked ``SeatShard`` rows) and one
+``bulk_create`` of ``Booking`` rows — and records each outcome on its
+request row.  Everyone else polls their own row for the result.
+
+Because the queue lives in the database, batches span all gunicorn
+workers and hosts.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from config import metrics as prometheus
+from trains.inventory import has_shards, lock_shards, take_seats
+from trains.models import Train
+
+from .exceptions import BookingQueueTimeout, departed_error, sold_out_error
+from .models import Booking, BookingRequest, BookingRequestStatus
+from .versions import bump_users
+
+logger = logging.getLogger(__name__)
+
+
+# ── Metrics (per process) ───────────────────────────────────────
+
+
+class BatchMetrics:
+    """Thread-safe counters for batch sizes and request wait times."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.batches = 0
+            self.batched_requests = 0
+            self.max_batch_size = 0
+            self.requests = 0
+            self.wait_ms_total = 0.0
+            self.wait_ms_max = 0.0
+            self.timeouts = 0
+
+    def record_batch(self, size):
+        with self._lock:
+            self.batches += 1
+            self.batched_requests += size
+            self.max_batch_size = max(self.max_batch_size, size)
+        prometheus.BATCH_SIZE.observe(size)
+
+    def record_wait(self, wait_ms):
+        with self._lock:
+            self.requests += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        prometheus.BATCH_WAIT.observe(wait_ms / 1000)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+        prometheus.BATCH_TIMEOUTS.inc()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "avg_batch_size": (
+                    round(self.batched_requests / self.batches, 2)
+                    if self.batches
+                    else 0
+                ),
+                "max_batch_size": self.max_batch_size,
+                "requests": self.requests,
+                "avg_wait_ms": (
+                    round(self.wait_ms_total / self.requests, 2)
+                    if self.requests
+                    else 0
+                ),
+                "max_wait_ms": round(self.wait_ms_max, 2),
+                "timeouts": self.timeouts,
+            }
+
+
+metrics = BatchMetrics()
+
+
+# ── Batch leader ────────────────────────────────────────────────
+
+
+def apply_pending(train_id):
+    """
+    Apply all pending requests for *train_id* if the train row can be
+    locked without waiting.  Returns the batch size, or ``None`` when
+    another worker currently holds the lock.
+    """
+    with transaction.atomic():
+        train = (
+            Train.objects.select_for_update(skip_locked=True)
+            .annotate(sharded=has_shards())
+            .filter(pk=train_id)
+            .first()
+        )
+        if train is None:
+            return None
+
+        pending = list(
+            BookingRequest.objects.filter(
+                train_id=train_id, status=BookingRequestStatus.PENDING
+            ).order_by("id")[: settings.BOOKING_BATCH_MAX_SIZE]
+        )
+        if not pending:
+            return 0
+
+        departed = train.departure_time <= timezone.now()
+        # A sharded train's seats live in its shards (see bookings.strategies)
+        shards = lock_shards(train_id) if train.sharded else None
+        if shards is None:
+            available = train.available_seats
+        else:
+            available = sum(shard.available_seats for shard in shards)
+        before = available
+        bookings = []
+
+        for req in pending:
+            if departed:
+                req.status = BookingRequestStatus.REJECTED
+                req.error = departed_error().detail
+            elif req.seats_requested > available:
+                req.status = BookingRequestStatus.REJECTED
+                req.error = sold_out_error(available, req.seats_requested).detail
+            else:
+                available -= req.seats_requested
+                req.status = BookingRequestStatus.CONFIRMED
+                booking = Booking(
+                    user_id=req.user_id,
+                    train_id=train_id,
+                    seats_booked=req.seats_requested,
+                    pnr=Booking._generate_pnr(),
+                )
+                bookings.append((req, booking))
+
+        if bookings:
+            if shards is None:
+                train.available_seats = available
+                train.save(update_fields=["available_seats"])
+            else:
+                take_seats(shards, before - available)
+
+            Booking.objects.bulk_create([booking for _, booking in bookings])
+            # MySQL does not return PKs from bulk inserts; resolve them by PNR
+            pks = dict(
+                Booking.objects.filter(
+                    pnr__in=[booking.pnr for _, booking in bookings]
+                ).values_list("pnr", "pk")
+            )
+            for req, booking in bookings:
+                req.booking_id = pks[booking.pnr]
+            bump_users(req.user_id for req, _ in bookings)
+
+        BookingRequest.objects.bulk_update(
+            pending, ["status", "error", "booking"]
+        )
+
+    metrics.record_batch(len(pending))
+    logger.debug("Applied booking batch of %d for train %s", len(pending), train_id)
+    return len(pending)
+
+
+# ── Strategy entry point ────────────────────────────────────────
+
+
+def _withdraw(req):
+    """Delete *req* unless a leader has decided it; returns whether it did."""
+    return bool(
+        BookingRequest.objects.filter(
+            pk=req.pk, status=BookingRequestStatus.PENDING
+        ).delete()[0]
+    )
+
+
+def book_with_batching(user, train, seats_requested):
+    """
+    Enqueue the request, take part in (or wait for) the next batch for
+    this train, and return the resulting ``Booking``.
+    """
+    window = settings.BOOKING_BATCH_WINDOW_MS / 1000
+    deadline = time.monotonic() + settings.BOOKING_BATCH_TIMEOUT
+    started = time.monotonic()
+
+    req = BookingRequest.objects.create(
+        user_id=user.pk,
+        train_id=train.pk,
+        seats_requested=seats_requested,
+    )
+
+    try:
+        time.sleep(window)  # let concurrent requests join the batch
+        while True:
+            try:
+                apply_pending(train.pk)
+            except OperationalError:
+                # Lock wait timeout or deadlock: the batch rolled back, and
+                # this or another request's next attempt will retry it
+                logger.warning(
+                    "Booking batch for train %s failed", train.pk, exc_info=True
+                )
+
+            req.refresh_from_db(fields=["status", "error", "booking"])
+            if req.status != BookingRequestStatus.PENDING:
+                break
+
+            if time.monotonic() >= deadline:
+                # Withdraw the request unless a leader got to it meanwhile
+                if _withdraw(req):
+                    metrics.record_timeout()
+                    raise BookingQueueTimeout()
+                req.refresh_from_db(fields=["status", "error", "booking"])
+                break
+
+            time.sleep(window)
+    except BookingQueueTimeout:
+        raise
+    except Exception:
+        # The client is about to get an error: never leave the request
+        # queued for a later batch to confirm behind its back
+        if _withdraw(req):
+            raise
+        req.refresh_from_db(fields=["status", "error", "booking"])
+    finally:
+        metrics.record_wait((time.monotonic() - started) * 1000)
+
+    BookingRequest.objects.filter(pk=req.pk).delete()
+
+    if req.status == BookingRequestStatus.REJECTED:
+        raise serializers.ValidationError(req.error)
+    return Booking.objects.get(pk=req.booking_id)
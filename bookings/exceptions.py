@@ -0,0 +1,36 @@
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+
+def departed_error():
+    return serializers.ValidationError(
+        {"train": "Cannot book a train that has already departed."}
+    )
+
+
+def sold_out_error(available, requested):
+    return serializers.ValidationError(
+        {
+            "seats_booked": (
+                f"Only {available} seat(s) available, but {requested} requested."
+            )
+        }
+    )
+
+
+def rejection_reason(exc):
+    """``"departed"``, ``"sold_out"`` or ``"rejected"`` for a strategy's ValidationError."""
+    detail = exc.detail if isinstance(exc.detail, dict) else {}
+    if "train" in detail:
+        return "departed"
+    if "seats_booked" in detail:
+        return "sold_out"
+    return "rejected"
+
+
+class BookingQueueTimeout(APIException):
+    """The batched booking coordinator did not process the request in time."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Booking service is busy. Please retry."
+    default_code = "booking_queue_timeout"
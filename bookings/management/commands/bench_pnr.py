@@ -0,0 +1,113 @@
+"""
+Compare ``bookings`` insert throughput for the legacy uuid4 PNRs and the
+time-ordered generator.
+
+Each scheme inserts ``--rows`` bookings in ``--batch``-sized bulk inserts
+on top of whatever the table already holds, reports rows/second for the
+first and last tenth of the run (index growth shows up as a slowdown),
+then deletes the rows it created.
+
+Usage:
+    python manage.py bench_pnr --rows 1000000 --batch 2000
+    python manage.py bench_pnr --schemes legacy --keep
+"""
+
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import User
+from bookings.models import Booking
+from bookings.pnr import generate_pnr, legacy_pnr
+from trains.models import Train
+
+SCHEMES = {
+    "legacy": legacy_pnr,
+    "ordered": generate_pnr,
+}
+
+BENCH_EMAIL = "bench-pnr@irtc.local"
+BENCH_TRAIN = "BENCHPNR"
+
+
+class Command(BaseCommand):
+    help = "Benchmark bookings insert throughput for each PNR scheme."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200_000)
+        parser.add_argument("--batch", type=int, default=1000)
+        parser.add_argument(
+            "--schemes",
+            default="legacy,ordered",
+            help="Comma-separated subset of: " + ", ".join(SCHEMES),
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Leave the inserted rows in place (to grow the table).",
+        )
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(email=BENCH_EMAIL)
+        now = timezone.now()
+        train, _ = Train.objects.get_or_create(
+            train_number=BENCH_TRAIN,
+            defaults={
+                "name": "PNR Benchmark",
+                "source": "Bench",
+                "destination": "Bench",
+                "departure_time": now + timedelta(days=365),
+                "arrival_time": now + timedelta(days=366),
+                "total_seats": 0,
+                "available_seats": 0,
+            },
+        )
+
+        self.stdout.write(f"Existing bookings: {Booking.objects.count()}")
+        results = {}
+        for name in options["schemes"].split(","):
+            results[name] = self._run(
+                SCHEMES[name.strip()], user, train, options["rows"], options["batch"]
+            )
+            if not options["keep"]:
+                Booking.objects.filter(train=train).delete()
+
+        if not options["keep"]:
+            train.delete()
+            user.delete()
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def _run(self, pnr_fn, user, train, rows, batch):
+        timings = []
+        done = 0
+        started = time.perf_counter()
+        while done < rows:
+            size = min(batch, rows - done)
+            objs = [
+                Booking(user=user, train=train, seats_booked=1, pnr=pnr_fn())
+                for _ in range(size)
+            ]
+            t0 = time.perf_counter()
+            Booking.objects.bulk_create(objs)
+            timings.append((size, time.perf_counter() - t0))
+            done += size
+        total = time.perf_counter() - started
+
+        tenth = max(1, len(timings) // 10)
+
+        def rate(chunk):
+            rows_in = sum(n for n, _ in chunk)
+            secs = sum(s for _, s in chunk)
+            return round(rows_in / secs) if secs else None
+
+        return {
+            "rows": rows,
+            "seconds": round(total, 3),
+            "rows_per_sec": round(rows / total) if total else None,
+            "first_tenth_rows_per_sec": rate(timings[:tenth]),
+            "last_tenth_rows_per_sec": rate(timings[-tenth:]),
+        }
@@ -0,0 +1,450 @@
+"""
+Hammer a few trains with concurrent bookings and verify seat accounting.
+
+``--processes`` forked processes each run ``--threads`` threads, and every
+thread makes ``--attempts`` booking attempts through the configured
+strategy (``bookings.strategies.get_booking_strategy``) with random seat
+counts on randomly chosen stress trains:
+
+    hot trains   ``--trains`` trains with ``--seats`` seats each, oversubscribed
+    departing    departs ``--depart-after`` seconds into the run
+    departed     already departed; every attempt must be rejected
+
+Attempts that fail with a deadlock, a lock wait timeout or a batched
+queue timeout are retried up to ``--retries`` times.  Afterwards, for
+every train:
+
+    total_seats - sum(confirmed seats_booked) == available_seats
+    available_seats >= 0                    (every shard, when sharded)
+    seats confirmed to workers == seats confirmed in the database
+    no booking confirmed for an attempt started after departure
+
+Sharded trains are checked against the sum of their shards, then again
+after ``reconcile_inventory``.  The report gives attempts and confirmed
+bookings per second, attempt latency, rejection, retry and deadlock
+counts, and — on MySQL — InnoDB row-lock waits and time over the run.
+The command fails if any invariant is violated.  Stress rows are deleted
+afterwards unless ``--keep`` is given.
+
+Usage:
+    python manage.py stress_bookings
+    python manage.py stress_bookings --strategy sharded --processes 8 --threads 16
+    python manage.py stress_bookings --strategy batched --trains 1 --seats 5000
+"""
+
+import collections
+import json
+import math
+import multiprocessing
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import serializers
+
+from accounts.models import User
+from bookings.exceptions import BookingQueueTimeout, rejection_reason
+from bookings.models import Booking, BookingRequest, BookingStatus
+from bookings.strategies import STRATEGIES, get_booking_strategy
+from trains.inventory import reconcile_inventory, split_inventory
+from trains.models import SeatShard, Train
+
+STRESS_EMAIL_DOMAIN = "stress.irtc.local"
+STRESS_TRAIN_PREFIX = "STRESS"
+
+# MySQL error codes worth retrying
+DEADLOCK = 1213
+LOCK_WAIT_TIMEOUT = 1205
+
+
+def percentile(values, q):
+    """Nearest-rank *q*-th percentile of sorted *values*."""
+    if not values:
+        return None
+    return values[max(1, math.ceil(len(values) * q / 100)) - 1]
+
+
+def classify_error(exc):
+    """The retryable kind of *exc* (deadlock, lock or queue timeout), else ``None``."""
+    if isinstance(exc, BookingQueueTimeout):
+        return "queue_timeout"
+    if not isinstance(exc, OperationalError):
+        return None
+    code = exc.args[0] if exc.args else None
+    if code == DEADLOCK:
+        return "deadlock"
+    if code == LOCK_WAIT_TIMEOUT or "database is locked" in str(exc):
+        return "lock_timeout"
+    return None
+
+
+def innodb_lock_counters():
+    """Server-wide InnoDB row-lock and deadlock counters, or ``None`` off MySQL."""
+    if connection.vendor != "mysql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW GLOBAL STATUS LIKE 'Innodb_row_lock_%%'")
+        counters = {name.lower(): int(value) for name, value in cursor.fetchall()}
+        try:
+            cursor.execute(
+                "SELECT `COUNT` FROM information_schema.INNODB_METRICS "
+                "WHERE NAME = 'lock_deadlocks'"
+            )
+            row = cursor.fetchone()
+            counters["deadlocks"] = int(row[0]) if row else None
+        except Exception:
+            counters["deadlocks"] = None
+    return counters
+
+
+# ── Workers ─────────────────────────────────────────────────────
+
+
+def run_thread(plan, index, results):
+    """Make one thread's booking attempts and append its tallies to *results*."""
+    rng = random.Random(f"{plan['seed']}:{index}")
+    book = get_booking_strategy(plan["strategy"])
+    tally = {
+        "outcomes": collections.Counter(),
+        "errors": collections.Counter(),
+        "latencies": [],
+        "confirmed": collections.Counter(),  # train pk → seats
+        "late": [],
+    }
+    try:
+        user = User.objects.get(pk=plan["user_ids"][index % len(plan["user_ids"])])
+        trains = list(Train.objects.filter(pk__in=plan["train_ids"]).order_by("pk"))
+        for _ in range(plan["attempts"]):
+            train = rng.choice(trains)
+            seats = rng.randint(1, plan["max_seats"])
+            for attempt in range(plan["retries"] + 1):
+                started_at = timezone.now()
+                started = time.perf_counter()
+                try:
+                    booking = book(user, train, seats)
+                except serializers.ValidationError as exc:
+                    outcome = rejection_reason(exc)
+                except Exception as exc:
+                    kind = classify_error(exc)
+                    if kind is None:
+                        tally["errors"][f"{type(exc).__name__}: {exc}"[:200]] += 1
+                        outcome = "error"
+                    else:
+                        tally["errors"][kind] += 1
+                        if attempt < plan["retries"]:
+                            tally["outcomes"]["retried"] += 1
+                            time.sleep(rng.uniform(0, 0.01 * (attempt + 1)))
+                            continue
+                        outcome = "gave_up"
+                else:
+                    outcome = "confirmed"
+                    tally["confirmed"][train.pk] += booking.seats_booked
+                    if started_at >= train.departure_time:
+                        tally["late"].append(booking.pnr)
+                finally:
+                    tally["latencies"].append((time.perf_counter() - started) * 1000)
+                tally["outcomes"][outcome] += 1
+                break
+    finally:
+        connections.close_all()
+        results.append(tally)
+
+
+def run_process(plan, offset, queue):
+    """Run ``plan["threads"]`` workers in this process and report to *queue*."""
+    results = []
+    threads = [
+        threading.Thread(target=run_thread, args=(plan, offset + i, results))
+        for i in range(plan["threads"])
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.put(results)
+
+
+class Command(BaseCommand):
+    help = "Stress a booking strategy concurrently and check seat invariants."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--strategy",
+            default=None,
+            help="One of: " + ", ".join(STRATEGIES) + " (default: BOOKING_STRATEGY).",
+        )
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument("--threads", type=int, default=8, help="Per process.")
+        parser.add_argument("--attempts", type=int, default=50, help="Per thread.")
+        parser.add_argument("--trains", type=int, default=2, help="Hot trains.")
+        parser.add_argument("--seats", type=int, default=500, help="Per hot train.")
+        parser.add_argument("--max-seats", type=int, default=6, help="Per attempt.")
+        parser.add_argument(
+            "--depart-after",
+            type=float,
+            default=1.0,
+            help="Seconds into the run at which the departing train leaves.",
+        )
+        parser.add_argument("--retries", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Leave the stress users, trains and bookings in place.",
+        )
+
+    def handle(self, *args, **options):
+        strategy = options["strategy"] or settings.BOOKING_STRATEGY
+        try:
+            get_booking_strategy(strategy)
+        except ValueError as exc:
+            raise CommandError(str(exc)) from None
+
+        with override_settings(BOOKING_STRATEGY=strategy):
+            self._teardown()
+            trains, users = self._setup(options, strategy)
+            try:
+                run = self._run(options, strategy, trains, users)
+                checks, violations = self._check(trains, strategy, run)
+            finally:
+                if not options["keep"]:
+                    self._teardown()
+
+        report = {
+            "settings": {
+                "database": connection.vendor,
+                "booking_strategy": strategy,
+                "processes": options["processes"],
+                "threads": options["threads"],
+                "attempts": (
+                    options["processes"] * options["threads"] * options["attempts"]
+                ),
+            },
+            **run["report"],
+            "trains": checks,
+            "violations": violations,
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+        if violations:
+            raise CommandError(
+                f"{len(violations)} invariant violation(s): {'; '.join(violations)}"
+            )
+
+    # ── Fixtures ──────────────────────────────────────────────
+
+    def _setup(self, options, strategy):
+        now = timezone.now()
+        specs = [
+            (f"{STRESS_TRAIN_PREFIX}{i}", "Stress Hot Train", timedelta(days=30))
+            for i in range(options["trains"])
+        ]
+        specs += [
+            (
+                f"{STRESS_TRAIN_PREFIX}DEP",
+                "Stress Departing Train",
+                timedelta(seconds=options["depart_after"]),
+            ),
+            (
+                f"{STRESS_TRAIN_PREFIX}GONE",
+                "Stress Departed Train",
+                timedelta(hours=-1),
+            ),
+        ]
+        seats = options["seats"]
+        Train.objects.bulk_create(
+            [
+                Train(
+                    train_number=number,
+                    name=name,
+                    source="Stress Central",
+                    destination="Stress Junction",
+                    departure_time=now + offset,
+                    arrival_time=now + offset + timedelta(hours=8),
+                    total_seats=seats,
+                    available_seats=seats,
+                )
+                for number, name, offset in specs
+            ]
+        )
+        trains = list(
+            Train.objects.filter(train_number__startswith=STRESS_TRAIN_PREFIX)
+            .order_by("pk")
+        )
+        if strategy == "sharded":
+            for train in trains:
+                split_inventory(train)
+
+        password = make_password(None)  # unusable; workers call strategies directly
+        count = options["processes"] * options["threads"]
+        User.objects.bulk_create(
+            [
+                User(email=f"stress-{i}@{STRESS_EMAIL_DOMAIN}", password=password)
+                for i in range(count)
+            ]
+        )
+        users = list(
+            User.objects.filter(email__endswith="@" + STRESS_EMAIL_DOMAIN)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        return trains, users
+
+    def _teardown(self):
+        stress = {"train__train_number__startswith": STRESS_TRAIN_PREFIX}
+        BookingRequest.objects.filter(**stress).delete()
+        Booking.objects.filter(**stress).delete()
+        Train.objects.filter(train_number__startswith=STRESS_TRAIN_PREFIX).delete()
+        User.objects.filter(email__endswith="@" + STRESS_EMAIL_DOMAIN).delete()
+
+    # ── Run ───────────────────────────────────────────────────
+
+    def _run(self, options, strategy, trains, users):
+        plan = {
+            "strategy": strategy,
+            "seed": options["seed"],
+            "threads": options["threads"],
+            "attempts": options["attempts"],
+            "max_seats": options["max_seats"],
+            "retries": options["retries"],
+            "train_ids": [train.pk for train in trains],
+            "user_ids": users,
+        }
+        before = innodb_lock_counters()
+        connections.close_all()  # children must not share the parent's sockets
+
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        processes = [
+            context.Process(
+                target=run_process, args=(plan, i * options["threads"], queue)
+            )
+            for i in range(options["processes"])
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        tallies = []
+        for _ in processes:
+            tallies.extend(queue.get())  # drain before join, or large results block
+        for process in processes:
+            process.join()
+        wall = time.perf_counter() - started
+
+        after = innodb_lock_counters()
+        failed = [p.exitcode for p in processes if p.exitcode]
+        if failed:
+            raise CommandError(f"{len(failed)} worker process(es) crashed: {failed}")
+
+        outcomes = sum((t["outcomes"] for t in tallies), collections.Counter())
+        errors = sum((t["errors"] for t in tallies), collections.Counter())
+        confirmed = sum((t["confirmed"] for t in tallies), collections.Counter())
+        latencies = sorted(ms for t in tallies for ms in t["latencies"])
+        attempts = sum(n for outcome, n in outcomes.items() if outcome != "retried")
+
+        report = {
+            "seconds": round(wall, 3),
+            "attempts_per_sec": round(attempts / wall, 1) if wall else None,
+            "bookings_per_sec": (
+                round(outcomes["confirmed"] / wall, 1) if wall else None
+            ),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50), 2) if latencies else None,
+                "p95": round(percentile(latencies, 95), 2) if latencies else None,
+                "p99": round(percentile(latencies, 99), 2) if latencies else None,
+                "max": round(latencies[-1], 2) if latencies else None,
+            },
+            "outcomes": dict(sorted(outcomes.items())),
+            "errors": dict(sorted(errors.items())),
+            "deadlocks": errors["deadlock"],
+            "retries": outcomes["retried"],
+        }
+        if before is not None and after is not None:
+            delta = {
+                name: after[name] - before[name]
+                for name in after
+                if after[name] is not None and before.get(name) is not None
+            }
+            report["innodb"] = {
+                "row_lock_waits": delta["innodb_row_lock_waits"],
+                "row_lock_time_ms": delta["innodb_row_lock_time"],
+                "row_lock_time_max_ms": after["innodb_row_lock_time_max"],
+                "deadlocks": delta.get("deadlocks"),
+            }
+        if strategy == "batched":
+            from bookings.batching import metrics as batch_metrics
+
+            report["batching"] = batch_metrics.snapshot()  # this process only
+        return {
+            "report": report,
+            "confirmed": confirmed,
+            "late": [pnr for t in tallies for pnr in t["late"]],
+        }
+
+    # ── Invariants ────────────────────────────────────────────
+
+    def _check(self, trains, strategy, run):
+        violations = []
+        booked = dict(
+            Booking.objects.filter(
+                train__in=trains, status=BookingStatus.CONFIRMED
+            )
+            .values_list("train")
+            .annotate(seats=Sum("seats_booked"))
+        )
+        shards = dict(
+            SeatShard.objects.filter(train__in=trains)
+            .values_list("train")
+            .annotate(seats=Sum("available_seats"))
+        )
+        negative = set(
+            SeatShard.objects.filter(train__in=trains, available_seats__lt=0)
+            .values_list("train", flat=True)
+        )
+        sharded = strategy == "sharded" and bool(shards)
+        if sharded:
+            reconcile_inventory([train.pk for train in trains])
+
+        checks = {}
+        for train in Train.objects.filter(pk__in=[t.pk for t in trains]).order_by("pk"):
+            sold = booked.get(train.pk, 0)
+            expected = train.total_seats - sold
+            checks[train.train_number] = {
+                "total_seats": train.total_seats,
+                "confirmed_seats": sold,
+                "available_seats": train.available_seats,
+                **({"shard_seats": shards.get(train.pk)} if sharded else {}),
+            }
+            name = train.train_number
+            if sharded and shards.get(train.pk) != expected:
+                violations.append(
+                    f"{name}: shards hold {shards.get(train.pk)}, expected {expected}"
+                )
+            if train.available_seats != expected:
+                violations.append(
+                    f"{name}: available_seats {train.available_seats}, expected {expected}"
+                )
+            if train.available_seats < 0 or train.pk in negative:
+                violations.append(f"{name}: negative seat count")
+            if run["confirmed"].get(train.pk, 0) != sold:
+                violations.append(
+                    f"{name}: workers confirmed {run['confirmed'].get(train.pk, 0)} seat(s), "
+                    f"database holds {sold}"
+                )
+
+        if run["late"]:
+            violations.append(
+                f"{len(run['late'])} booking(s) confirmed after departure "
+                f"(e.g. PNR {run['late'][0]})"
+            )
+        leftover = BookingRequest.objects.filter(train__in=trains).count()
+        if leftover:
+            violations.append(f"{leftover} booking request(s) left in the queue")
+        return checks, violations
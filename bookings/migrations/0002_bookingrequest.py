@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-16 23:32
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+        ('trains', '0002_seatshard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats_requested', models.PositiveIntegerField(help_text='Number of seats requested', validators=[django.core.validators.MinValueValidator(1)])),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('REJECTED', 'Rejected')], default='PENDING', help_text='Outcome of the request once its batch has been applied', max_length=10)),
+                ('error', models.JSONField(blank=True, help_text='Validation error payload for a rejected request', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='When the request was enqueued')),
+                ('booking', models.OneToOneField(blank=True, help_text='The booking created for a confirmed request', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='bookings.booking')),
+                ('train', models.ForeignKey(help_text='The train the seats are requested on', on_delete=django.db.models.deletion.CASCADE, related_name='booking_requests', to='trains.train')),
+                ('user', models.ForeignKey(help_text='The passenger who requested the booking', on_delete=django.db.models.deletion.CASCADE, related_name='booking_requests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'booking_requests',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['train', 'status', 'id'], name='idx_bookreq_train_status')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-16 23:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_bookingrequest'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='idx_booking_pnr',
+        ),
+    ]
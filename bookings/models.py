@@ -1,10 +1,9 @@
-import uuid
-
 from django.conf import settings
-from django.db import IntegrityError
 from django.core.validators import MinValueValidator
 from django.db import models
 
+from .pnr import generate_pnr
+
 
 class BookingStatus(models.TextChoices):
     """Possible states of a booking."""
@@ -56,39 +55,96 @@ class Booking(models.Model):
         db_table = "bookings"
         indexes = [
             models.Index(fields=["user", "booking_time"], name="idx_booking_user_time"),
-            models.Index(fields=["pnr"], name="idx_booking_pnr"),
             models.Index(fields=["train", "status"], name="idx_booking_train_status"),
             models.Index(fields=["status"], name="idx_booking_status"),
         ]
         ordering = ["-booking_time"]
 
-    _PNR_MAX_RETRIES = 10
-
     def save(self, *args, **kwargs):
         if not self.pnr:
             self.pnr = self._generate_pnr()
-
-        # Retry loop to handle the (unlikely but possible) PNR collision
-        for attempt in range(self._PNR_MAX_RETRIES):
-            try:
-                super().save(*args, **kwargs)
-                return
-            except IntegrityError as exc:
-                if (
-                    "pnr" not in str(exc).lower()
-                    or attempt == self._PNR_MAX_RETRIES - 1
-                ):
-                    raise
-                self.pnr = self._generate_pnr()
-                self.pk = None  # force INSERT on retry
+        super().save(*args, **kwargs)
 
     @staticmethod
     def _generate_pnr():
-        """Generate a 10-character uppercase PNR."""
-        return uuid.uuid4().hex[:10].upper()
+        """Generate a 10-character, time-ordered uppercase PNR (see ``bookings.pnr``)."""
+        return generate_pnr()
 
     def __str__(self):
         return (
             f"PNR {self.pnr} — {self.user.email} | "
             f"{self.train.train_number} | {self.seats_booked} seat(s) | {self.status}"
         )
+
+
+class BookingRequestStatus(models.TextChoices):
+    """Lifecycle of a queued booking request (``batched`` strategy)."""
+
+    PENDING = "PENDING", "Pending"
+    CONFIRMED = "CONFIRMED", "Confirmed"
+    REJECTED = "REJECTED", "Rejected"
+
+
+class BookingRequest(models.Model):
+    """
+    A booking waiting to be applied by the per-train batch coordinator.
+
+    Rows are short-lived: the API request that enqueued one deletes it
+    as soon as it has read the outcome.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="booking_requests",
+        help_text="The passenger who requested the booking",
+    )
+    train = models.ForeignKey(
+        "trains.Train",
+        on_delete=models.CASCADE,
+        related_name="booking_requests",
+        help_text="The train the seats are requested on",
+    )
+    seats_requested = models.PositiveIntegerField(
+        validators=[MinValueValidator(1)],
+        help_text="Number of seats requested",
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=BookingRequestStatus.choices,
+        default=BookingRequestStatus.PENDING,
+        help_text="Outcome of the request once its batch has been applied",
+    )
+    booking = models.OneToOneField(
+        Booking,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="The booking created for a confirmed request",
+    )
+    error = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Validation error payload for a rejected request",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="When the request was enqueued",
+    )
+
+    class Meta:
+        db_table = "booking_requests"
+        indexes = [
+            models.Index(
+                fields=["train", "status", "id"],
+                name="idx_bookreq_train_status",
+            ),
+        ]
+        ordering = ["id"]
+
+    def __str__(self):
+        return (
+            f"Request #{self.pk} — train {self.train_id} | "
+            f"{self.seats_requested} seat(s) | {self.status}"
+        )
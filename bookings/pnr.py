@@ -0,0 +1,165 @@
+"""
+Time-ordered, collision-free PNR generation.
+
+A PNR is a 50-bit integer rendered as 10 Crockford base32 characters
+(digits and uppercase letters, no I/L/O/U).  The bit layout is
+Snowflake-style, most significant first:
+
+    31 bits  seconds since PNR_EPOCH        (~68 years)
+     4 bits  node id (settings.PNR_NODE_ID) (16 hosts / containers)
+     5 bits  worker slot on this node       (32 processes per node)
+    10 bits  per-worker sequence            (1024 PNRs per second)
+
+Because the timestamp leads and the alphabet sorts in value order, new
+PNRs land at the right-hand edge of the ``pnr`` B-tree instead of at
+random pages.  Uniqueness comes from construction rather than retries:
+each process claims a worker slot with an exclusive ``flock`` on a file in
+``settings.PNR_SLOT_DIR``, and when a worker exhausts its sequence within
+a second it borrows the next second instead of sleeping.
+
+The slot file also records the highest second its holder has issued PNRs
+in, written before the first PNR of each new second.  A process that
+later claims the slot resumes after that second, so it cannot repeat a
+(second, sequence) pair of a predecessor that borrowed ahead of the clock
+or died within the same second.
+
+``PNR_NODE_ID`` must be set (0-15, distinct per host/container) unless
+``DEBUG`` is on, where it defaults to 0.
+"""
+
+import fcntl
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+PNR_LENGTH = 10
+PNR_EPOCH = int(datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp())
+
+TIME_BITS = 31
+NODE_BITS = 4
+SLOT_BITS = 5
+SEQUENCE_BITS = 10
+
+MAX_NODES = 1 << NODE_BITS
+MAX_SLOTS = 1 << SLOT_BITS
+MAX_SEQUENCE = 1 << SEQUENCE_BITS
+
+
+def encode(value):
+    """Encode a non-negative integer < 2**50 as 10 base32 characters."""
+    chars = []
+    for _ in range(PNR_LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def decode(pnr):
+    """Inverse of :func:`encode`."""
+    value = 0
+    for char in pnr:
+        value = value * 32 + ALPHABET.index(char)
+    return value
+
+
+def legacy_pnr():
+    """The original scheme: 10 random hex characters from a uuid4."""
+    return uuid.uuid4().hex[:10].upper()
+
+
+class PNRGenerator:
+    """Per-process Snowflake-style generator; safe to share between threads."""
+
+    def __init__(self, node_id, slot_dir):
+        if not 0 <= node_id < MAX_NODES:
+            raise ImproperlyConfigured(f"PNR_NODE_ID must be in [0, {MAX_NODES})")
+        self.node_id = node_id
+        self.slot_dir = slot_dir
+        self._lock = threading.Lock()
+        self._pid = None
+        self._slot = None
+        self._slot_fd = None
+        self._last_second = 0
+        self._sequence = 0
+
+    def _claim_slot(self):
+        """
+        Take an exclusive lock on the first free slot file for this node and
+        resume after the last second its previous holder issued PNRs in.
+        """
+        os.makedirs(self.slot_dir, exist_ok=True)
+        for slot in range(MAX_SLOTS):
+            path = os.path.join(self.slot_dir, f"pnr-slot-{slot}.lock")
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                continue
+            # The lock is released by the OS when this process exits
+            self._slot, self._slot_fd = slot, fd
+            try:
+                last = int(os.pread(fd, 32, 0).split()[0])
+            except (IndexError, ValueError):
+                last = 0  # new slot file
+            # Nothing is known about the sequence used in that second: skip it
+            self._last_second, self._sequence = last, MAX_SEQUENCE
+            return
+        raise RuntimeError(
+            f"All {MAX_SLOTS} PNR worker slots in {self.slot_dir} are taken"
+        )
+
+    def _advance(self, second):
+        """Move to *second*, recording it in the slot file first."""
+        os.pwrite(self._slot_fd, f"{second:>12}\n".encode(), 0)
+        self._last_second, self._sequence = second, 0
+
+    def __call__(self):
+        with self._lock:
+            if self._pid != os.getpid():  # first use, or forked child
+                self._pid = os.getpid()
+                self._claim_slot()
+
+            now = int(time.time()) - PNR_EPOCH
+            if now > self._last_second:
+                self._advance(now)
+            elif self._sequence >= MAX_SEQUENCE:
+                # Sequence exhausted (or the clock stepped back): borrow ahead
+                self._advance(self._last_second + 1)
+
+            value = (
+                (
+                    ((self._last_second << NODE_BITS) | self.node_id)
+                    << SLOT_BITS
+                    | self._slot
+                )
+                << SEQUENCE_BITS
+            ) | self._sequence
+            self._sequence += 1
+
+        return encode(value)
+
+
+_generator = None
+
+
+def generate_pnr():
+    """Return a new 10-character, time-ordered uppercase PNR."""
+    global _generator
+    if _generator is None:
+        node_id = settings.PNR_NODE_ID
+        if node_id is None:
+            if not settings.DEBUG:
+                raise ImproperlyConfigured(
+                    "Set PNR_NODE_ID to a node id (0-15) that is unique per "
+                    "host/container"
+                )
+            node_id = 0
+        _generator = PNRGenerator(node_id, settings.PNR_SLOT_DIR)
+    return _generator()
@@ -1,16 +1,20 @@
-from django.db import transaction
-from django.utils import timezone
+from django.conf import settings
 from rest_framework import serializers
 
+from config import metrics
 from trains.models import Train
 from trains.serializers import TrainSerializer
 
+from .exceptions import BookingQueueTimeout, rejection_reason
 from .models import Booking
+from .strategies import get_booking_strategy
 
 
 class CreateBookingSerializer(serializers.ModelSerializer):
     """
     Accepts a train PK and seat count.
+    Seat allocation is delegated to the configured booking strategy
+    (see ``bookings.strategies``).
     """
 
     train = serializers.PrimaryKeyRelatedField(queryset=Train.objects.all())
@@ -21,37 +25,22 @@ class CreateBookingSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "pnr", "status", "booking_time"]
 
     def create(self, validated_data):
-        train = validated_data["train"]
-        seats_requested = validated_data["seats_booked"]
-        user = validated_data["user"]
-
-        with transaction.atomic():
-            locked_train = Train.objects.select_for_update().get(pk=train.pk)
-
-            if locked_train.departure_time <= timezone.now():
-                raise serializers.ValidationError(
-                    {"train": "Cannot book a train that has already departed."}
-                )
-
-            if locked_train.available_seats < seats_requested:
-                raise serializers.ValidationError(
-                    {
-                        "seats_booked": (
-                            f"Only {locked_train.available_seats} seat(s) "
-                            f"available, but {seats_requested} requested."
-                        )
-                    }
-                )
-
-            locked_train.available_seats -= seats_requested
-            locked_train.save(update_fields=["available_seats"])
-
-            booking = Booking.objects.create(
-                user=user,
-                train=locked_train,
-                seats_booked=seats_requested,
+        book = get_booking_strategy()
+        try:
+            booking = book(
+                validated_data["user"],
+                validated_data["train"],
+                validated_data["seats_booked"],
             )
-
+        except serializers.ValidationError as exc:
+            metrics.BOOKINGS.labels(
+                settings.BOOKING_STRATEGY, rejection_reason(exc)
+            ).inc()
+            raise
+        except BookingQueueTimeout:
+            metrics.BOOKINGS.labels(settings.BOOKING_STRATEGY, "timeout").inc()
+            raise
+        metrics.BOOKINGS.labels(settings.BOOKING_STRATEGY, "confirmed").inc()
         return booking
 
 
@@ -0,0 +1,208 @@
+"""
+Seat-allocation strategies used by ``CreateBookingSerializer``.
+
+Each strategy takes ``(user, train, seats_requested)``, reserves the seats,
+creates the ``Booking`` row and returns it.  Business-rule failures are
+raised as ``serializers.ValidationError`` with the same payloads the API
+has always returned, so clients cannot tell which strategy served them.
+
+The active strategy is selected with ``settings.BOOKING_STRATEGY``:
+
+    locking       — ``select_for_update()`` on the train row (default)
+    conditional   — single guarded ``UPDATE … WHERE available_seats >= n``
+    sharded       — guarded ``UPDATE`` on one of the train's ``SeatShard`` rows
+    batched       — per-train group commit (see ``bookings.batching``)
+
+A train with ``SeatShard`` rows keeps its inventory in those rows, and
+every strategy books it there, so the setting can be switched while
+shards exist.
+"""
+
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from trains import cache as search_cache
+from trains.inventory import has_shards, lock_shards, take_seats
+from trains.models import SeatShard, Train
+
+from .batching import book_with_batching
+from .exceptions import departed_error, sold_out_error
+from .models import Booking
+
+
+# ── Strategies ──────────────────────────────────────────────────
+
+
+def book_with_row_lock(user, train, seats_requested):
+    """
+    Lock the train row, validate in Python, then decrement and save.
+
+    Every booking on the same train serialises on the InnoDB row lock.  On
+    a sharded train the seats are taken from its locked ``SeatShard`` rows
+    instead, since ``Train.available_seats`` is only their reconciled sum.
+    """
+    with transaction.atomic():
+        locked_train = (
+            Train.objects.select_for_update()
+            .annotate(sharded=has_shards())
+            .get(pk=train.pk)
+        )
+
+        if locked_train.departure_time <= timezone.now():
+            raise departed_error()
+
+        if locked_train.sharded:
+            shards = lock_shards(locked_train.pk)
+            available = sum(shard.available_seats for shard in shards)
+            if available < seats_requested:
+                raise sold_out_error(available, seats_requested)
+            take_seats(shards, seats_requested)
+        else:
+            if locked_train.available_seats < seats_requested:
+                raise sold_out_error(locked_train.available_seats, seats_requested)
+
+            locked_train.available_seats -= seats_requested
+            locked_train.save(update_fields=["available_seats"])
+
+        booking = Booking.objects.create(
+            user_id=user.pk,
+            train=locked_train,
+            seats_booked=seats_requested,
+        )
+
+    return booking
+
+
+def book_with_conditional_update(user, train, seats_requested):
+    """
+    Decrement seats with one guarded ``UPDATE`` and insert the booking only
+    if it matched a row.
+
+        UPDATE trains
+           SET available_seats = available_seats - n
+         WHERE id = ? AND available_seats >= n AND departure_time > now()
+
+    The row lock is held only for the duration of the statement and the
+    insert, never across a read-modify-write round trip.  When no row
+    matches, the train is re-read (without a lock) to tell the client why.
+    The statement also requires the train to have no ``SeatShard`` rows;
+    sharded trains are booked by ``book_with_sharded_inventory``.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        updated = Train.objects.filter(
+            ~has_shards(),
+            pk=train.pk,
+            available_seats__gte=seats_requested,
+            departure_time__gt=now,
+        ).update(available_seats=F("available_seats") - seats_requested)
+
+        if updated:
+            search_cache.invalidate_train(train)
+            return Booking.objects.create(
+                user_id=user.pk,
+                train_id=train.pk,
+                seats_booked=seats_requested,
+            )
+
+    current = (
+        Train.objects.only("departure_time", "available_seats")
+        .annotate(sharded=has_shards())
+        .get(pk=train.pk)
+    )
+    if current.departure_time <= now:
+        raise departed_error()
+    if current.sharded:
+        return book_with_sharded_inventory(user, train, seats_requested)
+    raise sold_out_error(current.available_seats, seats_requested)
+
+
+def book_with_sharded_inventory(user, train, seats_requested):
+    """
+    Decrement one of the train's ``SeatShard`` counters instead of the
+    ``trains`` row, so bookings on a hot train commit in parallel.
+
+    1. Try the shards that (by an unlocked snapshot) hold enough seats, in
+       random order, each with a guarded ``UPDATE … WHERE available_seats >= n``.
+    2. If none can cover the request on its own, lock all of the train's
+       shards in shard order and drain seats across several of them.
+
+    Both steps require the train not to have departed, in the ``UPDATE``
+    itself and after the shards are locked.  ``Train.available_seats`` is
+    not touched here; it is refreshed by ``manage.py reconcile_inventory``.
+    Trains without shards fall back to the conditional strategy.
+    """
+    snapshot = list(
+        SeatShard.objects.filter(train_id=train.pk).values_list(
+            "pk", "available_seats"
+        )
+    )
+    if not snapshot:
+        return book_with_conditional_update(user, train, seats_requested)
+
+    now = timezone.now()
+    if train.departure_time <= now:
+        raise departed_error()
+
+    candidates = [pk for pk, available in snapshot if available >= seats_requested]
+    random.shuffle(candidates)
+    not_departed = Exists(
+        Train.objects.filter(pk=OuterRef("train_id"), departure_time__gt=now)
+    )
+
+    for shard_pk in candidates:
+        with transaction.atomic():
+            updated = SeatShard.objects.filter(
+                not_departed,
+                pk=shard_pk,
+                available_seats__gte=seats_requested,
+            ).update(available_seats=F("available_seats") - seats_requested)
+
+            if updated:
+                return Booking.objects.create(
+                    user_id=user.pk,
+                    train_id=train.pk,
+                    seats_booked=seats_requested,
+                )
+
+    # Slow path: no single shard is large enough (or we lost every race).
+    with transaction.atomic():
+        shards = lock_shards(train.pk)
+        if not Train.objects.filter(pk=train.pk, departure_time__gt=now).exists():
+            raise departed_error()
+        total = sum(shard.available_seats for shard in shards)
+        if total < seats_requested:
+            raise sold_out_error(total, seats_requested)
+
+        take_seats(shards, seats_requested)
+
+        return Booking.objects.create(
+            user_id=user.pk,
+            train_id=train.pk,
+            seats_booked=seats_requested,
+        )
+
+
+STRATEGIES = {
+    "locking": book_with_row_lock,
+    "conditional": book_with_conditional_update,
+    "sharded": book_with_sharded_inventory,
+    "batched": book_with_batching,
+}
+
+
+def get_booking_strategy(name=None):
+    """Return the strategy callable for *name* (defaults to the setting)."""
+    name = name or getattr(settings, "BOOKING_STRATEGY", "locking")
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown BOOKING_STRATEGY {name!r}; "
+            f"expected one of: {', '.join(sorted(STRATEGIES))}"
+        ) from None
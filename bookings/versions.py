@@ -0,0 +1,47 @@
+"""
+Per-user booking-history versions for conditional GET on ``/api/bookings/my/``.
+
+Each user has an opaque version token in the shared cache that changes
+whenever one of their bookings is created, changed or deleted.  The ETag
+combines it with a ``BOOKING_HISTORY_ETAG_TTL`` time bucket so the nested
+train details (e.g. ``available_seats``) are never served stale for longer
+than that.
+"""
+
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+
+from config.shared_cache import shared_cache
+
+
+def _key(user_id):
+    return f"bookings:ver:{user_id}"
+
+
+def bump_users(user_ids):
+    """Give each user a new history version once the transaction commits."""
+    user_ids = set(user_ids)
+
+    def bump():
+        shared_cache().set_many(
+            {_key(user_id): uuid.uuid4().hex[:12] for user_id in user_ids}, None
+        )
+
+    transaction.on_commit(bump)
+
+
+def history_etag(request, *args, **kwargs):
+    user_id = request.user.pk
+    cache = shared_cache()
+    version = cache.get(_key(user_id))
+    if version is None:
+        version = uuid.uuid4().hex[:12]
+        cache.add(_key(user_id), version, None)
+        version = cache.get(_key(user_id), version)
+    bucket = int(time.time() // settings.BOOKING_HISTORY_ETAG_TTL)
+    raw = f"{user_id}:{version}:{bucket}:{request.get_full_path()}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
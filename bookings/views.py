@@ -1,10 +1,15 @@
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework.generics import CreateAPIView, ListAPIView
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from drf_spectacular.utils import extend_schema, extend_schema_view
 
+from accounts.authentication import StatelessJWTAuthentication
+from config.pagination import HybridPagination
+
 from .models import Booking
 from .serializers import BookingDetailSerializer, CreateBookingSerializer
+from .versions import history_etag
 
 
 @extend_schema_view(
@@ -13,7 +18,8 @@ from .serializers import BookingDetailSerializer, CreateBookingSerializer
         summary="Book train seats",
         description=(
             "Book seats on a train. Requires JWT authentication.\n"
-            "Uses `select_for_update()` internally to prevent race conditions."
+            "Seats are reserved atomically using the configured "
+            "`BOOKING_STRATEGY` (row lock or guarded conditional UPDATE)."
         ),
     )
 )
@@ -25,31 +31,45 @@ class CreateBookingView(CreateAPIView):
     """
 
     serializer_class = CreateBookingSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
+class BookingHistoryPagination(HybridPagination):
+    """Limit/offset by default; ``?pagination=cursor`` seeks on (booking_time, id) descending."""
+
+    ordering = ("-booking_time", "-id")
+
+
 @extend_schema_view(
     get=extend_schema(
         tags=["Bookings"],
         summary="My Bookings",
-        description="Returns the authenticated user's bookings (newest first) with nested train details.",
+        description=(
+            "Returns the authenticated user's bookings (newest first) with nested train details.\n"
+            "Use `?pagination=cursor` for keyset pagination that stays fast on deep pages.\n"
+            "Send the previous `ETag` in `If-None-Match` to get `304 Not Modified` "
+            "when nothing changed."
+        ),
     )
 )
+@method_decorator(condition(etag_func=history_etag), name="get")
 class MyBookingsView(ListAPIView):
     """
     GET /api/bookings/my/
 
     Returns the authenticated user's bookings (newest first)
-    with nested train details.
+    with nested train details.  Supports conditional GET: the ETag is
+    derived from a per-user booking version (see ``bookings.versions``).
     """
 
     serializer_class = BookingDetailSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = BookingHistoryPagination
 
     def get_queryset(self):
         if getattr(self, "swagger_fake_view", False):
@@ -57,7 +77,7 @@ class MyBookingsView(ListAPIView):
             return Booking.objects.none()
 
         return (
-            Booking.objects.filter(user=self.request.user)
+            Booking.objects.filter(user_id=self.request.user.pk)
             .select_related("train")
-            .order_by("-booking_time")
+            .order_by("-booking_time", "-id")
         )
@@ -0,0 +1,8 @@
+"""Gunicorn settings used by ``entrypoint.sh``."""
+
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges from the multiprocess metrics
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,198 @@
+"""
+Prometheus metrics and the ``/metrics`` endpoint.
+
+Under gunicorn every worker is a separate process, so metrics use
+``prometheus_client`` multiprocess mode: when ``PROMETHEUS_MULTIPROC_DIR``
+is set (``entrypoint.sh`` does this) each worker writes its samples to
+memory-mapped files in that directory and ``/metrics`` merges them on
+scrape.  Without it (``runserver``, management commands) the default
+in-process registry is used.
+
+Instrumented here:
+
+* requests and latency per DRF view (``MetricsMiddleware``);
+* SQL query count and time per request, via ``connection.execute_wrapper``;
+* MongoDB command latency (``MongoCommandListener``, registered on the
+  shared client in ``analytics.mongo``);
+* booking outcomes, search-cache lookups and group-commit batches, recorded
+  by the modules that own them.
+"""
+
+import hmac
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+REQUESTS = Counter(
+    "irtc_http_requests_total",
+    "HTTP requests by view, method and status code.",
+    ["view", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "irtc_http_request_duration_seconds",
+    "HTTP request latency by view and method.",
+    ["view", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+SQL_QUERIES = Histogram(
+    "irtc_sql_queries_per_request",
+    "SQL queries executed while handling one request.",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+SQL_TIME = Histogram(
+    "irtc_sql_time_per_request_seconds",
+    "Total SQL execution time while handling one request.",
+    ["view"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_LATENCY = Histogram(
+    "irtc_mongo_command_duration_seconds",
+    "MongoDB command latency by command and outcome.",
+    ["command", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+BOOKINGS = Counter(
+    "irtc_booking_outcomes_total",
+    "Booking attempts by strategy and outcome.",
+    ["strategy", "outcome"],
+)
+SEARCH_CACHE = Counter(
+    "irtc_search_cache_lookups_total",
+    "Train search cache lookups by result (hit or miss).",
+    ["result"],
+)
+SEARCH_CACHE_INVALIDATIONS = Counter(
+    "irtc_search_cache_invalidations_total",
+    "Search cache scopes invalidated.",
+)
+BATCH_SIZE = Histogram(
+    "irtc_booking_batch_size",
+    "Requests applied per booking group commit.",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+BATCH_WAIT = Histogram(
+    "irtc_booking_batch_wait_seconds",
+    "Time a batched booking request waited for its outcome.",
+    buckets=LATENCY_BUCKETS,
+)
+BATCH_TIMEOUTS = Counter(
+    "irtc_booking_batch_timeouts_total",
+    "Batched booking requests that gave up waiting.",
+)
+
+
+# ── Request / SQL instrumentation ───────────────────────────────
+
+
+class _QueryTimer:
+    """``execute_wrapper`` callable that counts and times SQL statements."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    func = getattr(match.func, "view_class", match.func)
+    return f"{func.__module__}.{func.__name__}"
+
+
+class MetricsMiddleware:
+    """Request count, latency and per-request SQL usage, labelled by view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == "/metrics":
+            return self.get_response(request)
+
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        with connections["default"].execute_wrapper(timer):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        view = view_label(request)
+        REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+        REQUEST_LATENCY.labels(view, request.method).observe(elapsed)
+        SQL_QUERIES.labels(view).observe(timer.count)
+        SQL_TIME.labels(view).observe(timer.seconds)
+        return response
+
+
+# ── MongoDB instrumentation ─────────────────────────────────────
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Observe the duration of every MongoDB command on the client."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(event.command_name, "ok").observe(
+            event.duration_micros / 1e6
+        )
+
+    def failed(self, event):
+        MONGO_LATENCY.labels(event.command_name, "error").observe(
+            event.duration_micros / 1e6
+        )
+
+
+# ── Exposition ──────────────────────────────────────────────────
+
+
+def metrics_view(request):
+    """
+    GET /metrics
+
+    Prometheus text exposition, merged across gunicorn workers.  The
+    scraper must send ``METRICS_TOKEN`` as a bearer token; only with
+    ``DEBUG`` may the token be left empty, opening the endpoint.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        raise ImproperlyConfigured("Set METRICS_TOKEN to protect /metrics")
+    if token:
+        supplied = request.META.get("HTTP_AUTHORIZATION", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return HttpResponseForbidden()
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,253 @@
+"""
+Keyset (cursor) pagination that can stand in for ``LimitOffsetPagination``.
+
+``KeysetPagination`` pages on a composite sort key such as
+``("departure_time", "id")`` and encodes the last row's key in an opaque
+``cursor`` token, so page N costs one index range scan no matter how deep
+it is.  The total ``count`` is only computed on request (``?count=true``).
+
+``HybridPagination`` keeps existing clients working: requests use
+limit/offset unless they pass ``?pagination=cursor`` or a ``cursor`` token
+(or the view sets ``default_mode = "cursor"``).
+"""
+
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    LimitOffsetPagination,
+    _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Seek-method pagination ordered by ``ordering`` (all fields ascending,
+    or all descending with a ``-`` prefix; the last field must be unique).
+    """
+
+    ordering = ("id",)
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    # ── Token encoding ────────────────────────────────────────
+
+    def encode_cursor(self, obj, reverse):
+        values = []
+        for name in self._field_names:
+            value = getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        payload = json.dumps({"k": values, "r": int(reverse)}, separators=(",", ":"))
+        token = base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, token
+        )
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            raw_values, reverse = payload["k"], bool(payload["r"])
+            if len(raw_values) != len(self._field_names):
+                raise ValueError
+            values = [
+                self._model._meta.get_field(name).to_python(value)
+                for name, value in zip(self._field_names, raw_values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    # ── Pagination ────────────────────────────────────────────
+
+    @property
+    def _descending(self):
+        return self.ordering[0].startswith("-")
+
+    @property
+    def _field_names(self):
+        return [name.lstrip("-") for name in self.ordering]
+
+    def get_limit(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.limit_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def _seek_filter(self, values, forward):
+        """``(a, b) > (va, vb)`` expanded into index-friendly OR terms."""
+        greater = forward != self._descending
+        op = "gt" if greater else "lt"
+        condition = Q()
+        for i, name in enumerate(self._field_names):
+            term = Q(**{f"{name}__{op}": values[i]})
+            for prev_name, prev_value in zip(self._field_names[:i], values[:i]):
+                term &= Q(**{prev_name: prev_value})
+            condition |= term
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self._model = queryset.model
+        self.base_url = remove_query_param(
+            request.build_absolute_uri(), self.cursor_query_param
+        )
+        self.limit = self.get_limit(request)
+        position, reverse = self.decode_cursor(request)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, "").lower() in (
+            "1",
+            "true",
+            "yes",
+        ):
+            self.count = queryset.count()
+
+        forward = not reverse
+        ordering = list(self.ordering)
+        if reverse:
+            ordering = [
+                name[1:] if name.startswith("-") else f"-{name}" for name in ordering
+            ]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(position, forward))
+
+        rows = list(queryset[: self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[: self.limit]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        if not rows:
+            self.next_url = self.previous_url = None
+            return rows
+
+        if forward:
+            self.next_url = self.encode_cursor(rows[-1], False) if has_more else None
+            self.previous_url = (
+                self.encode_cursor(rows[0], True) if position is not None else None
+            )
+        else:
+            self.next_url = self.encode_cursor(rows[-1], False)
+            self.previous_url = self.encode_cursor(rows[0], True) if has_more else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.count,
+                "next": self.next_url,
+                "previous": self.previous_url,
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer", "nullable": True, "example": 123},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Opaque cursor returned in `next` / `previous`.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.limit_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to `true` to include the total `count` (extra query).",
+                "schema": {"type": "boolean"},
+            },
+        ]
+
+
+class HybridPagination(BasePagination):
+    """
+    Limit/offset by default, keyset when the request asks for it with
+    ``?pagination=cursor`` (or carries a ``cursor`` token).
+    Subclasses set the keyset ``ordering``.
+    """
+
+    ordering = ("id",)
+    default_mode = "offset"
+    mode_query_param = "pagination"
+
+    def __init__(self):
+        self.offset_paginator = LimitOffsetPagination()
+        self.keyset_paginator = KeysetPagination()
+        self.keyset_paginator.ordering = self.ordering
+        self.paginator = self.offset_paginator
+
+    def _wants_keyset(self, request):
+        mode = request.query_params.get(self.mode_query_param, self.default_mode)
+        return (
+            mode == "cursor"
+            or self.keyset_paginator.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = (
+            self.keyset_paginator
+            if self._wants_keyset(request)
+            else self.offset_paginator
+        )
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.keyset_paginator.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        params = {
+            param["name"]: param
+            for paginator in (self.offset_paginator, self.keyset_paginator)
+            for param in paginator.get_schema_operation_parameters(view)
+        }
+        params[self.mode_query_param] = {
+            "name": self.mode_query_param,
+            "required": False,
+            "in": "query",
+            "description": "`offset` (default) or `cursor` for keyset pagination.",
+            "schema": {"type": "string", "enum": ["offset", "cursor"]},
+        }
+        return list(params.values())
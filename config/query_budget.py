@@ -0,0 +1,143 @@
+"""
+Per-request SQL query budgets and N+1 detection.
+
+``QueryBudgetMiddleware`` counts every SQL statement a request executes on
+the ``default`` database and groups them by *fingerprint* — the statement
+with literals, placeholders and ``IN (...)`` lists collapsed — so
+``SELECT … WHERE id = 1`` and ``… id = 2`` count as the same shape.  A
+request violates its budget when it runs more queries than
+``QUERY_BUDGETS[view]`` (else ``QUERY_BUDGET_DEFAULT``), or repeats one
+shape at least ``QUERY_BUDGET_REPEAT_THRESHOLD`` times (the N+1 pattern).
+
+``QUERY_BUDGET_MODE`` chooses what happens: ``"off"``, ``"log"`` (a
+warning with the worst offenders) or ``"raise"`` (``QueryBudgetExceeded``,
+for CI and staging).  Views are named as in ``/metrics``, e.g.
+``"bookings.views.MyBookingsView"``.
+
+In tests, wrap a request in ``assert_query_budget`` to enforce the same
+limits (or explicit ones)::
+
+    with assert_query_budget("bookings.views.MyBookingsView"):
+        client.get("/api/bookings/my/")
+"""
+
+import collections
+import contextlib
+import logging
+import re
+
+from django.conf import settings
+from django.db import connections
+
+from config.metrics import view_label
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalise *sql* so statements differing only in values compare equal."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more (or more repetitive) SQL than its budget allows."""
+
+
+class QueryRecorder:
+    """``execute_wrapper`` callable counting statements per fingerprint."""
+
+    def __init__(self):
+        self.count = 0
+        self.shapes = collections.Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        self.shapes[fingerprint(sql)] += 1
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        return [(sql, n) for sql, n in self.shapes.most_common() if n >= threshold]
+
+
+def budget_for(view):
+    return settings.QUERY_BUDGETS.get(view, settings.QUERY_BUDGET_DEFAULT)
+
+
+def violations(recorder, max_queries, repeat_threshold):
+    """Human-readable budget problems found in *recorder* (empty if none)."""
+    problems = []
+    if max_queries is not None and recorder.count > max_queries:
+        problems.append(f"{recorder.count} queries (budget {max_queries})")
+    if repeat_threshold:
+        problems.extend(
+            f"{n}× repeated: {sql[:200]}"
+            for sql, n in recorder.repeated(repeat_threshold)
+        )
+    return problems
+
+
+class QueryBudgetMiddleware:
+    """Enforce ``QUERY_BUDGETS`` per view; adds an ``X-Query-Count`` header."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.mode = settings.QUERY_BUDGET_MODE
+
+    def __call__(self, request):
+        if self.mode == "off":
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with connections["default"].execute_wrapper(recorder):
+            response = self.get_response(request)
+        response["X-Query-Count"] = str(recorder.count)
+
+        view = view_label(request)
+        problems = violations(
+            recorder, budget_for(view), settings.QUERY_BUDGET_REPEAT_THRESHOLD
+        )
+        if problems:
+            message = (
+                f"Query budget exceeded in {view} "
+                f"({request.method} {request.path}): " + "; ".join(problems)
+            )
+            if self.mode == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+@contextlib.contextmanager
+def assert_query_budget(
+    view=None, max_queries=None, repeat_threshold=None, using="default"
+):
+    """
+    Test helper: fail with ``AssertionError`` if the wrapped block exceeds
+    *max_queries* (default: the configured budget for *view*) or repeats a
+    query shape *repeat_threshold* times (default:
+    ``QUERY_BUDGET_REPEAT_THRESHOLD``).  Yields the ``QueryRecorder``.
+    """
+    if max_queries is None and view is not None:
+        max_queries = budget_for(view)
+    if repeat_threshold is None:
+        repeat_threshold = settings.QUERY_BUDGET_REPEAT_THRESHOLD
+
+    recorder = QueryRecorder()
+    with connections[using].execute_wrapper(recorder):
+        yield recorder
+
+    problems = violations(recorder, max_queries, repeat_threshold)
+    if problems:
+        where = f" in {view}" if view else ""
+        raise AssertionError(
+            f"Query budget exceeded{where}: " + "; ".join(problems)
+        )
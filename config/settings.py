@@ -1,5 +1,6 @@
 from datetime import timedelta
 
+import json
 import os
 from pathlib import Path
 
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
 # Middleware
 # ──────────────────────────────────────────────
 MIDDLEWARE = [
+    "config.metrics.MetricsMiddleware",
+    "config.query_budget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -54,6 +57,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     # Custom
+    "analytics.middleware.LatencyHistogramMiddleware",
+    "analytics.middleware.APILogMiddleware",
     "analytics.middleware.SearchAnalyticsMiddleware",
 ]
 
@@ -111,9 +116,70 @@ DATABASES = {
 MONGO_URI = (
     f"mongodb://{os.getenv('MONGO_HOST', 'mongo')}:{os.getenv('MONGO_PORT', '27017')}"
 )
+# Fail fast instead of pymongo's 30 s default when MongoDB is unreachable
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(
+    os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")
+)
 
 DATABASE_ROUTERS = ["config.db_router.DatabaseRouter"]
 
+# ──────────────────────────────────────────────
+# Caches
+# ──────────────────────────────────────────────
+# "default" is per-process; "shared" is visible to every gunicorn worker
+# on the host (SHARED_CACHE_BACKEND=file) or per-process (=locmem).
+SHARED_CACHE_BACKEND = os.getenv("SHARED_CACHE_BACKEND", "file")
+# Alias for state every worker must agree on: token versions, booking
+# history versions, suggest generations (see config.shared_cache)
+SHARED_CACHE_ALIAS = os.getenv("SHARED_CACHE_ALIAS", "shared")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": (
+        {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("SHARED_CACHE_DIR", "/tmp/irtc-cache"),
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+        if SHARED_CACHE_BACKEND == "file"
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "shared",
+        }
+    ),
+}
+
+# ──────────────────────────────────────────────
+# Train search
+# ──────────────────────────────────────────────
+# "station"   — resolve source/destination through the indexed Station catalogue
+# "substring" — original LIKE '%term%' match on the free-text columns
+TRAIN_SEARCH_MODE = os.getenv("TRAIN_SEARCH_MODE", "station")
+# In station mode, fall back to substring matching when no station matches
+TRAIN_SEARCH_SUBSTRING_FALLBACK = os.getenv(
+    "TRAIN_SEARCH_SUBSTRING_FALLBACK", "True"
+).lower() in ("true", "1", "yes")
+
+# Station autocomplete index (see trains.suggest): how often a worker checks
+# for changes made by other workers, how long popularity weights live, and
+# how many index entries a query ranks at most
+STATION_SUGGEST_CHECK_INTERVAL = float(
+    os.getenv("STATION_SUGGEST_CHECK_INTERVAL", "1")
+)
+STATION_SUGGEST_WEIGHTS_TTL = float(os.getenv("STATION_SUGGEST_WEIGHTS_TTL", "300"))
+STATION_SUGGEST_MAX_MATCHES = int(os.getenv("STATION_SUGGEST_MAX_MATCHES", "500"))
+
+# Train search result cache (see trains.cache)
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "True").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+SEARCH_CACHE_ALIAS = os.getenv("SEARCH_CACHE_ALIAS", "shared")
+SEARCH_CACHE_TIMEOUT = int(os.getenv("SEARCH_CACHE_TIMEOUT", "60"))
+
 # ──────────────────────────────────────────────
 # Custom Auth Model
 # ──────────────────────────────────────────────
@@ -162,7 +228,7 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 20,
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.StatelessJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_FILTER_BACKENDS": [
@@ -218,4 +284,175 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # Restamps role / is_active claims and refuses revoked tokens (accounts.tokens)
+    "TOKEN_REFRESH_SERIALIZER": "accounts.serializers.RoleTokenRefreshSerializer",
+}
+
+# Per-process cache of full User rows for token-authenticated requests
+# (accounts.authentication): seconds an entry is reused, and max entries
+JWT_USER_CACHE_TTL = int(os.getenv("JWT_USER_CACHE_TTL", "30"))
+JWT_USER_CACHE_SIZE = int(os.getenv("JWT_USER_CACHE_SIZE", "10000"))
+# Seconds a user's token_version (revocation) is served from the shared
+# cache; with per-process caches this bounds how long revocation takes
+JWT_TOKEN_VERSION_CACHE_TTL = int(os.getenv("JWT_TOKEN_VERSION_CACHE_TTL", "30"))
+
+# Per-process Bloom filter of blacklisted refresh-token JTIs (accounts.blacklist):
+# incremental sync / full rebuild intervals (seconds), sizing and error rate
+JWT_BLACKLIST_FILTER_ENABLED = os.getenv(
+    "JWT_BLACKLIST_FILTER_ENABLED", "True"
+).lower() in ("true", "1", "yes")
+JWT_BLACKLIST_SYNC_INTERVAL = float(os.getenv("JWT_BLACKLIST_SYNC_INTERVAL", "5"))
+# Each sync re-reads ids seen this long ago (ids may commit out of order)
+JWT_BLACKLIST_SYNC_OVERLAP = float(os.getenv("JWT_BLACKLIST_SYNC_OVERLAP", "10"))
+JWT_BLACKLIST_REBUILD_INTERVAL = float(
+    os.getenv("JWT_BLACKLIST_REBUILD_INTERVAL", "3600")
+)
+JWT_BLACKLIST_FILTER_CAPACITY = int(
+    os.getenv("JWT_BLACKLIST_FILTER_CAPACITY", "1000000")
+)
+JWT_BLACKLIST_FILTER_ERROR_RATE = float(
+    os.getenv("JWT_BLACKLIST_FILTER_ERROR_RATE", "0.001")
+)
+# Marker files for JTIs blacklisted since the other workers last synced
+JWT_BLACKLIST_MARKER_DIR = os.getenv(
+    "JWT_BLACKLIST_MARKER_DIR", "/tmp/irtc-jwt-blacklist"
+)
+
+# ──────────────────────────────────────────────
+# Bookings
+# ──────────────────────────────────────────────
+# Seat-allocation strategy used by CreateBookingSerializer:
+#   "locking"     — select_for_update() on the train row
+#   "conditional" — single guarded UPDATE, no read-modify-write lock
+#   "sharded"     — guarded UPDATE on one of the train's SeatShard rows
+#   "batched"     — per-train group commit through the booking_requests queue
+BOOKING_STRATEGY = os.getenv("BOOKING_STRATEGY", "locking")
+
+# Default number of SeatShard counter rows per train (sharded strategy)
+BOOKING_INVENTORY_SHARDS = int(os.getenv("BOOKING_INVENTORY_SHARDS", "16"))
+
+# PNR generation: each host/container needs a distinct node id (0-15),
+# required unless DEBUG (where it defaults to 0); worker processes on a
+# node claim slots via lock files in PNR_SLOT_DIR
+PNR_NODE_ID = int(os.environ["PNR_NODE_ID"]) if os.getenv("PNR_NODE_ID") else None
+PNR_SLOT_DIR = os.getenv("PNR_SLOT_DIR", "/tmp/irtc-pnr")
+
+# Group commit (batched strategy): collection window, batch cap, and how
+# long a request may wait for its batch before giving up with a 503
+BOOKING_BATCH_WINDOW_MS = float(os.getenv("BOOKING_BATCH_WINDOW_MS", "5"))
+BOOKING_BATCH_MAX_SIZE = int(os.getenv("BOOKING_BATCH_MAX_SIZE", "500"))
+BOOKING_BATCH_TIMEOUT = float(os.getenv("BOOKING_BATCH_TIMEOUT", "5"))
+
+# Booking-history ETags also rotate every this many seconds, bounding how
+# stale the nested train details (available_seats) can be after a 304
+BOOKING_HISTORY_ETAG_TTL = int(os.getenv("BOOKING_HISTORY_ETAG_TTL", "60"))
+
+# ──────────────────────────────────────────────
+# Analytics
+# ──────────────────────────────────────────────
+# Seconds the top-routes result (and its ETag) is reused
+ANALYTICS_TOP_ROUTES_CACHE_TTL = int(
+    os.getenv("ANALYTICS_TOP_ROUTES_CACHE_TTL", "30")
+)
+
+# Background log shipper (per process): queue bound, insert_many batch size,
+# max seconds between flushes, and what to drop when the queue is full
+# ("oldest" or "new")
+ANALYTICS_LOG_QUEUE_SIZE = int(os.getenv("ANALYTICS_LOG_QUEUE_SIZE", "10000"))
+ANALYTICS_LOG_BATCH_SIZE = int(os.getenv("ANALYTICS_LOG_BATCH_SIZE", "500"))
+ANALYTICS_LOG_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_LOG_FLUSH_INTERVAL", "1"))
+ANALYTICS_LOG_DROP_POLICY = os.getenv("ANALYTICS_LOG_DROP_POLICY", "oldest")
+
+# Durable local spool for batches MongoDB rejects: segment files in
+# ANALYTICS_SPOOL_DIR are replayed once MongoDB is back; after a failure
+# MongoDB is not retried for ANALYTICS_SPOOL_RETRY_INTERVAL seconds
+ANALYTICS_SPOOL_ENABLED = os.getenv("ANALYTICS_SPOOL_ENABLED", "True").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+ANALYTICS_SPOOL_DIR = os.getenv("ANALYTICS_SPOOL_DIR", "/tmp/irtc-spool")
+ANALYTICS_SPOOL_SEGMENT_BYTES = int(
+    os.getenv("ANALYTICS_SPOOL_SEGMENT_BYTES", str(16 * 1024 * 1024))
+)
+ANALYTICS_SPOOL_MAX_BYTES = int(
+    os.getenv("ANALYTICS_SPOOL_MAX_BYTES", str(1024 * 1024 * 1024))
+)
+ANALYTICS_SPOOL_RETRY_INTERVAL = float(
+    os.getenv("ANALYTICS_SPOOL_RETRY_INTERVAL", "5")
+)
+
+# Raw search logs expire after this many days (TTL index); rollup_routes
+# only recomputes hours that closed at least ANALYTICS_ROLLUP_LAG_SECONDS ago
+ANALYTICS_SEARCH_LOG_TTL_DAYS = int(os.getenv("ANALYTICS_SEARCH_LOG_TTL_DAYS", "30"))
+ANALYTICS_ROLLUP_LAG_SECONDS = int(os.getenv("ANALYTICS_ROLLUP_LAG_SECONDS", "300"))
+
+# Per-worker Space-Saving heavy-hitters sketch (top-routes ?mode=approx):
+# tracked routes per worker, push interval to MongoDB, and epoch length.
+# ANALYTICS_SEARCH_LOG_RAW=False keeps only the sketch (no search_logs).
+ANALYTICS_SKETCH_ENABLED = os.getenv("ANALYTICS_SKETCH_ENABLED", "True").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+ANALYTICS_SKETCH_CAPACITY = int(os.getenv("ANALYTICS_SKETCH_CAPACITY", "1000"))
+ANALYTICS_SKETCH_PUSH_INTERVAL = float(os.getenv("ANALYTICS_SKETCH_PUSH_INTERVAL", "10"))
+ANALYTICS_SKETCH_EPOCH_SECONDS = int(os.getenv("ANALYTICS_SKETCH_EPOCH_SECONDS", "3600"))
+ANALYTICS_SEARCH_LOG_RAW = os.getenv("ANALYTICS_SEARCH_LOG_RAW", "True").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+
+# General API request logging into APILog (api_logs) for /api/ paths.
+# Fraction of requests kept by default, per path prefix (longest match),
+# and per status class — a status-class rate can only raise the path rate.
+ANALYTICS_API_LOG_SAMPLE_RATE = float(os.getenv("ANALYTICS_API_LOG_SAMPLE_RATE", "0.1"))
+ANALYTICS_API_LOG_PATH_RATES = json.loads(
+    os.getenv("ANALYTICS_API_LOG_PATH_RATES", '{"/api/trains/search/": 0.01}')
+)
+ANALYTICS_API_LOG_STATUS_RATES = json.loads(
+    os.getenv("ANALYTICS_API_LOG_STATUS_RATES", '{"4xx": 0.5, "5xx": 1.0}')
+)
+# Largest JSON request body (bytes) stored with a sampled request
+ANALYTICS_API_LOG_MAX_BODY = int(os.getenv("ANALYTICS_API_LOG_MAX_BODY", "4096"))
+# Retention of sampled request logs (TTL index)
+ANALYTICS_API_LOG_TTL_DAYS = int(os.getenv("ANALYTICS_API_LOG_TTL_DAYS", "30"))
+
+# Per-endpoint, per-minute latency histograms (GET /api/analytics/latency/)
+ANALYTICS_LATENCY_RETENTION_DAYS = int(
+    os.getenv("ANALYTICS_LATENCY_RETENTION_DAYS", "14")
+)
+
+# ──────────────────────────────────────────────
+# Metrics
+# ──────────────────────────────────────────────
+# Bearer token required to scrape /metrics; required unless DEBUG (where
+# empty leaves the endpoint open)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# ──────────────────────────────────────────────
+# SQL query budgets (see config.query_budget)
+# ──────────────────────────────────────────────
+# "off" | "log" (warn on violations) | "raise" (fail the request; CI/staging)
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log")
+# Max queries per request, by view (as labelled in /metrics), and default.
+# Budgets are the measured worst case of each view, e.g. a search miss
+# filtering on both stations, a train saved with two new stations, or a
+# batched booking decided on its first poll (each further poll adds 2).
+QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", "20"))
+QUERY_BUDGETS = {
+    "trains.views.TrainSearchView": 4,
+    "trains.views.StationSuggestView": 1,
+    "trains.views.TrainDetailView": 12,
+    "trains.views.TrainListCreateView": 15,
+    "bookings.views.CreateBookingView": 11,
+    "bookings.views.MyBookingsView": 2,
+    "accounts.views.LoginView": 3,
+    "accounts.views.RegisterView": 3,
+    "analytics.views.TopRoutesView": 0,
+    "analytics.views.LatencyView": 1,
+    **json.loads(os.getenv("QUERY_BUDGETS", "{}")),
 }
+# The same query shape this many times in one request is reported as N+1
+QUERY_BUDGET_REPEAT_THRESHOLD = int(os.getenv("QUERY_BUDGET_REPEAT_THRESHOLD", "5"))
@@ -0,0 +1,16 @@
+"""
+The cross-worker cache, for state every worker must agree on.
+
+Token versions (``accounts.tokens``), booking-history versions
+(``bookings.versions``), the station-suggest generation (``trains.suggest``)
+and cached top routes live in ``caches[SHARED_CACHE_ALIAS]``.  Search pages
+have their own ``SEARCH_CACHE_ALIAS``, which may be pointed at a
+per-process cache without affecting any of these.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def shared_cache():
+    return caches[settings.SHARED_CACHE_ALIAS]
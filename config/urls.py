@@ -6,8 +6,12 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from config.metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    # ── Prometheus scrape endpoint ─────────────────────────────────
+    path("metrics", metrics_view, name="metrics"),
     # ── OpenAPI schema & itneractive docs ──────────────────────────
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
@@ -5,11 +5,20 @@ echo "🔄 Running migrations..."
 python manage.py migrate --noinput
 python manage.py migrate --database=mongo --noinput
 
+echo "🗂️  Ensuring MongoDB indexes..."
+python manage.py ensure_mongo_indexes --explain
+
 echo "📦 Collecting static files..."
 python manage.py collectstatic --noinput 2>/dev/null || true
 
+echo "📈 Preparing Prometheus multiprocess directory..."
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/irtc-prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 echo "🚀 Starting Gunicorn..."
 exec gunicorn config.wsgi:application \
+    --config config/gunicorn.py \
     --bind 0.0.0.0:8000 \
     --workers 3 \
     --timeout 120 \
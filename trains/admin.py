@@ -1,6 +1,27 @@
 from django.contrib import admin
 
-from .models import Train
+from .models import SeatShard, Station, Train
+
+
+@admin.register(Station)
+class StationAdmin(admin.ModelAdmin):
+    """Admin configuration for the station catalogue."""
+
+    list_display = ("name", "code", "aliases")
+    search_fields = ("name", "code")
+    list_per_page = 50
+
+
+class SeatShardInline(admin.TabularInline):
+    """Read-only view of a train's sharded seat inventory."""
+
+    model = SeatShard
+    extra = 0
+    can_delete = False
+    readonly_fields = ("shard", "available_seats")
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Train)
@@ -20,4 +41,5 @@ class TrainAdmin(admin.ModelAdmin):
     list_filter = ("source", "destination", "departure_time")
     search_fields = ("train_number", "name", "source", "destination")
     list_per_page = 25
-    readonly_fields = ("id",)
+    readonly_fields = ("id", "source_station", "destination_station")
+    inlines = [SeatShardInline]
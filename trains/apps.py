@@ -5,3 +5,6 @@ class TrainsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "trains"
     verbose_name = "Train Management"
+
+    def ready(self):
+        from . import signals  # noqa: F401
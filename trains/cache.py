@@ -0,0 +1,336 @@
+"""
+Read-through cache for ``GET /api/trains/search/``.
+
+Pages are cached per *scope* — the normalised ``(source, destination, date)``
+filter triple — and keyed on the full query string (limit/offset etc.):
+
+    search:dates                          [date, ...] filters with a directory
+    search:scopes:<date_hash>             [scope_hash, ...] for one date filter
+    search:scope:<scope_hash>             [src, dst, date, src_ids, dst_ids]
+    search:ver:<scope_hash>               opaque version token
+    search:page:<scope_hash>:<ver>:<qh>   serialised response payload
+
+When a train changes, every registered scope whose filters would match the
+train's old or new route/date gets a fresh version token, so only those
+pages go stale; everything else stays warm.  In station search mode a scope
+also remembers the station IDs its text resolved to, so alias and code
+searches are matched too.  When a station's name, aliases or code change
+(or it is created or deleted), every scope whose source or destination
+text is a prefix of a token the station gained or lost is bumped and
+unregistered, so it re-resolves its station IDs on the next request.  Bumps run on
+transaction commit.
+
+Each scope is registered under its own key, which expires
+``SEARCH_CACHE_TIMEOUT`` after it was last seen, and listed in the
+directory of its date filter (scopes without a date share one), so a bump
+only reads the directories of the dates it touches.  Directories are
+pruned of expired scopes as bumps read them.  Every search request — a
+miss, a hit or a 304 — extends its scope's registration, so a scope stays
+registered for as long as its pages or ETags are in use.
+
+The ETag combines the page key with a ``SEARCH_CACHE_TIMEOUT`` time
+bucket, like the page entries' own timeout.  If a registration is lost
+anyway — two workers rewriting a directory at once, or a cull — neither
+pages nor 304s are served stale for longer than that.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from config import metrics
+
+from .filters import resolve_stations
+from .models import normalise_name
+
+FILTER_PARAMS = ("source", "destination", "date")
+DATES_KEY = "search:dates"
+
+
+# ── Hit / miss counters (per process) ───────────────────────────
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def incr(self, field, amount=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "invalidations": self.invalidations,
+            }
+
+
+stats = CacheStats()
+
+
+# ── Helpers ─────────────────────────────────────────────────────
+
+
+def enabled():
+    return settings.SEARCH_CACHE_ENABLED
+
+
+def _cache():
+    return caches[settings.SEARCH_CACHE_ALIAS]
+
+
+def _digest(value):
+    return hashlib.sha1(
+        json.dumps(value, separators=(",", ":")).encode()
+    ).hexdigest()[:20]
+
+
+def scope_for(query_params):
+    """The ``[source, destination, date]`` filter triple of a request."""
+    return [
+        normalise_name(query_params.get("source", "")),
+        normalise_name(query_params.get("destination", "")),
+        query_params.get("date", "").strip(),
+    ]
+
+
+def _version(cache, scope_hash):
+    key = f"search:ver:{scope_hash}"
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex[:12]
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def _station_ids(text, request):
+    if not text or settings.TRAIN_SEARCH_MODE != "station":
+        return None
+    return resolve_stations(text, request) or None
+
+
+def _scope_key(scope_hash):
+    return f"search:scope:{scope_hash}"
+
+
+def _directory_key(date):
+    return f"search:scopes:{_digest(date)}"
+
+
+def _register(cache, scope_hash, scope, request):
+    cache.set(
+        _scope_key(scope_hash),
+        [*scope, _station_ids(scope[0], request), _station_ids(scope[1], request)],
+        settings.SEARCH_CACHE_TIMEOUT,
+    )
+    key = _directory_key(scope[2])
+    directory = cache.get(key) or []
+    if scope_hash not in directory:
+        cache.set(key, [*directory, scope_hash], None)
+        if not directory:
+            dates = cache.get(DATES_KEY) or []
+            if scope[2] not in dates:
+                cache.set(DATES_KEY, [*dates, scope[2]], None)
+
+
+def _keep_registered(cache, request):
+    """Extend the registration of *request*'s scope, or register it."""
+    scope = scope_for(request.query_params)
+    scope_hash = _digest(scope)
+    if not cache.touch(_scope_key(scope_hash), settings.SEARCH_CACHE_TIMEOUT):
+        _register(cache, scope_hash, scope, request)
+
+
+# ── Read / write ────────────────────────────────────────────────
+
+
+def page_key(request):
+    """
+    Build the cache key for *request*, reading (and creating, if needed)
+    the current version of its scope.
+    """
+    cache = _cache()
+    scope = scope_for(request.query_params)
+    scope_hash = _digest(scope)
+
+    params = {
+        name: (
+            scope[FILTER_PARAMS.index(name)]
+            if name in FILTER_PARAMS
+            else request.query_params.getlist(name)
+        )
+        for name in sorted(request.query_params)
+    }
+    query_hash = _digest([request.get_host(), params])
+    return f"search:page:{scope_hash}:{_version(cache, scope_hash)}:{query_hash}"
+
+
+def get_page(key):
+    data = _cache().get(key)
+    stats.incr("hits" if data is not None else "misses")
+    metrics.SEARCH_CACHE.labels("hit" if data is not None else "miss").inc()
+    return data
+
+
+def set_page(key, data, request):
+    cache = _cache()
+    _keep_registered(cache, request)
+    cache.set(key, data, settings.SEARCH_CACHE_TIMEOUT)
+
+
+# ── Invalidation ────────────────────────────────────────────────
+
+
+def route_state(
+    source,
+    destination,
+    departure_time,
+    source_station_id=None,
+    destination_station_id=None,
+):
+    """Normalised ``(source, destination, local date, station IDs)`` of a train."""
+    return (
+        normalise_name(source),
+        normalise_name(destination),
+        timezone.localtime(departure_time).date().isoformat(),
+        source_station_id,
+        destination_station_id,
+    )
+
+
+def _matches(scope, state):
+    source, destination, date, source_ids, destination_ids = scope
+    return (
+        (source in state[0] or state[3] in (source_ids or ()))
+        and (destination in state[1] or state[4] in (destination_ids or ()))
+        and (not date or date == state[2])
+    )
+
+
+def bump_routes(states):
+    """Invalidate every cached scope matching any of *states* right now."""
+    if not enabled():
+        return
+    cache = _cache()
+    directories = cache.get_many(
+        {_directory_key(""), *(_directory_key(state[2]) for state in states)}
+    )
+    scopes = cache.get_many(
+        {_scope_key(h) for directory in directories.values() for h in directory}
+    )
+    stale = {
+        scope_hash
+        for directory in directories.values()
+        for scope_hash in directory
+        if _scope_key(scope_hash) in scopes
+        and any(_matches(scopes[_scope_key(scope_hash)], state) for state in states)
+    }
+    cache.set_many(
+        {f"search:ver:{scope_hash}": uuid.uuid4().hex[:12] for scope_hash in stale},
+        None,
+    )
+    for key, directory in directories.items():
+        live = [h for h in directory if _scope_key(h) in scopes]
+        if len(live) < len(directory):
+            cache.set(key, live, None)
+    stats.incr("invalidations", len(stale))
+    metrics.SEARCH_CACHE_INVALIDATIONS.inc(len(stale))
+
+
+def bump_stations(tokens):
+    """
+    Invalidate and unregister every cached scope whose source or
+    destination text resolves through any of the station *tokens*.
+    """
+    if not enabled() or settings.TRAIN_SEARCH_MODE != "station":
+        return
+    cache = _cache()
+    dates = cache.get(DATES_KEY) or []
+    directories = cache.get_many({_directory_key(date) for date in {"", *dates}})
+    scopes = cache.get_many(
+        {_scope_key(h) for directory in directories.values() for h in directory}
+    )
+    stale = {
+        key.removeprefix(_scope_key(""))
+        for key, scope in scopes.items()
+        if any(
+            text and token.startswith(text)
+            for text in scope[:2]
+            for token in tokens
+        )
+    }
+    cache.set_many(
+        {f"search:ver:{scope_hash}": uuid.uuid4().hex[:12] for scope_hash in stale},
+        None,
+    )
+    cache.delete_many([_scope_key(scope_hash) for scope_hash in stale])
+    live = {
+        key: [h for h in directory if _scope_key(h) in scopes and h not in stale]
+        for key, directory in directories.items()
+    }
+    for key, directory in directories.items():
+        if len(live[key]) < len(directory):
+            cache.set(key, live[key], None)
+    live_dates = [date for date in dates if live.get(_directory_key(date))]
+    if len(live_dates) < len(dates):
+        cache.set(DATES_KEY, live_dates, None)
+    stats.incr("invalidations", len(stale))
+    metrics.SEARCH_CACHE_INVALIDATIONS.inc(len(stale))
+
+
+def invalidate_stations(tokens):
+    """Run ``bump_stations`` for *tokens* once the current transaction commits."""
+    tokens = set(tokens)
+    if tokens and enabled():
+        transaction.on_commit(lambda: bump_stations(tokens))
+
+
+def invalidate_routes(states):
+    """Invalidate matching scopes once the current transaction commits."""
+    states = [state for state in states if state]
+    if states and enabled():
+        transaction.on_commit(lambda: bump_routes(states))
+
+
+def invalidate_train(train):
+    """Convenience wrapper for a single ``Train`` instance."""
+    invalidate_routes([route_state(*route_fields(train))])
+
+
+def route_fields(train):
+    return (
+        train.source,
+        train.destination,
+        train.departure_time,
+        train.source_station_id,
+        train.destination_station_id,
+    )
+
+
+def search_etag(request, *args, **kwargs):
+    """
+    ETag for a search request: its page key (which embeds the scope
+    version) plus a ``SEARCH_CACHE_TIMEOUT`` time bucket.  Runs on every
+    search request, so it also keeps the scope registered.
+    """
+    if not enabled():
+        return None
+    _keep_registered(_cache(), request)
+    bucket = int(time.time() // settings.SEARCH_CACHE_TIMEOUT)
+    raw = f"{page_key(request)}:{bucket}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
@@ -1,9 +1,24 @@
-from datetime import datetime, time
-
 import django_filters
-from django.utils import timezone
+from django.conf import settings
+
+from .models import Station, Train, normalise_name
+
 
-from .models import Train
+def resolve_stations(text, request=None):
+    """
+    ``Station.objects.matching_ids(text)``, remembered on *request*: the
+    search cache resolves the same text when it registers the request's
+    scope, and should not query for it twice.
+    """
+    resolved = getattr(request, "_resolved_stations", None)
+    if resolved is None:
+        resolved = {}
+        if request is not None:
+            request._resolved_stations = resolved
+    key = normalise_name(text)
+    if key not in resolved:
+        resolved[key] = Station.objects.matching_ids(text)
+    return resolved[key]
 
 
 class TrainFilter(django_filters.FilterSet):
@@ -11,20 +26,25 @@ class TrainFilter(django_filters.FilterSet):
     Filters for GET /api/trains/search/
 
     Query params:
-        source       — partial, case-insensitive match on departure station
-        destination  — partial, case-insensitive match on arrival station
+        source       — match on departure station name, alias or code
+        destination  — match on arrival station name, alias or code
         date         — YYYY-MM-DD; returns trains departing on that calendar day
+
+    With ``TRAIN_SEARCH_MODE = "station"`` the free text is resolved to
+    station IDs through the indexed ``StationToken`` prefix lookup (any word
+    of a name or alias starting with the input) and trains are filtered on
+    the integer FKs.  ``"substring"`` keeps the original ``icontains``
+    behaviour, which is also used when no station matches and
+    ``TRAIN_SEARCH_SUBSTRING_FALLBACK`` is on.
     """
 
     source = django_filters.CharFilter(
-        field_name="source",
-        lookup_expr="icontains",
-        help_text="Partial match on departure station name",
+        method="filter_station",
+        help_text="Departure station name, alias or code (word-prefix match)",
     )
     destination = django_filters.CharFilter(
-        field_name="destination",
-        lookup_expr="icontains",
-        help_text="Partial match on arrival station name",
+        method="filter_station",
+        help_text="Arrival station name, alias or code (word-prefix match)",
     )
     date = django_filters.DateFilter(
         method="filter_by_date",
@@ -35,20 +55,24 @@ class TrainFilter(django_filters.FilterSet):
         model = Train
         fields = ["source", "destination", "date"]
 
+    def filter_station(self, queryset, name, value):
+        if not value:
+            return queryset
+
+        if settings.TRAIN_SEARCH_MODE == "station":
+            station_ids = resolve_stations(value, self.request)
+            if station_ids:
+                return queryset.filter(**{f"{name}_station_id__in": station_ids})
+            if not settings.TRAIN_SEARCH_SUBSTRING_FALLBACK:
+                return queryset.none()
+
+        return queryset.filter(**{f"{name}__icontains": value})
+
     def filter_by_date(self, queryset, name, value):
         """
-        Filter trains whose ``departure_time`` falls within *value* day
-        (midnight-to-midnight), timezone-aware.
+        Filter trains departing on calendar day *value* (project time zone)
+        with an equality lookup on the stored ``departure_date`` column.
         """
         if value is None:
             return queryset
-
-        day_start = timezone.make_aware(
-            datetime.combine(value, time.min),
-            timezone.get_current_timezone(),
-        )
-        day_end = timezone.make_aware(
-            datetime.combine(value, time.max),
-            timezone.get_current_timezone(),
-        )
-        return queryset.filter(departure_time__range=(day_start, day_end))
+        return queryset.filter(departure_date=value)
@@ -0,0 +1,130 @@
+"""
+Helpers for the sharded seat inventory (``SeatShard``).
+
+    split_inventory(train, shards)   — (re)distribute a train's seats across N rows
+    has_shards()                     — expression: whether a train is sharded
+    lock_shards(train_id)            — lock a train's shards (empty if unsharded)
+    take_seats(shards, seats)        — drain seats from locked shards
+    reconcile_inventory(train_ids)   — recompute ``Train.available_seats`` from shards
+    clear_inventory(train_ids)       — reconcile, then drop the shard rows
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Subquery, Sum
+
+from . import cache as search_cache
+from .models import SeatShard, Train
+
+
+def split_inventory(train, shards=None):
+    """
+    Split *train*'s ``available_seats`` evenly across *shards* counter rows,
+    replacing any existing shards.  Returns the created ``SeatShard`` list.
+
+    The train row is locked while the shards are rebuilt so that a
+    concurrent re-split cannot interleave with this one.
+    """
+    shards = shards or settings.BOOKING_INVENTORY_SHARDS
+    if shards < 1:
+        raise ValueError("shards must be >= 1")
+
+    with transaction.atomic():
+        locked = Train.objects.select_for_update().get(pk=train.pk)
+        SeatShard.objects.filter(train=locked).delete()
+
+        base, extra = divmod(locked.available_seats, shards)
+        return SeatShard.objects.bulk_create(
+            [
+                SeatShard(
+                    train=locked,
+                    shard=i,
+                    available_seats=base + (1 if i < extra else 0),
+                )
+                for i in range(shards)
+            ]
+        )
+
+
+def has_shards():
+    """Whether the outer ``Train`` row has shards, as an ``Exists`` expression."""
+    return Exists(SeatShard.objects.filter(train=OuterRef("pk")))
+
+
+def lock_shards(train_id):
+    """
+    Lock *train_id*'s shards in shard order and return them; an empty list
+    means the train is not sharded.
+    """
+    return list(
+        SeatShard.objects.select_for_update()
+        .filter(train_id=train_id)
+        .order_by("shard")
+    )
+
+
+def take_seats(shards, seats):
+    """
+    Take *seats* from *shards* (locked by ``lock_shards``), draining the
+    fullest first.  The caller has checked that their sum covers *seats*.
+    """
+    for shard in sorted(shards, key=lambda s: s.available_seats, reverse=True):
+        take = min(shard.available_seats, seats)
+        if take:
+            shard.available_seats -= take
+            shard.save(update_fields=["available_seats"])
+            seats -= take
+        if not seats:
+            break
+
+
+def reconcile_inventory(train_ids=None):
+    """
+    Set ``Train.available_seats`` to the sum of its shards for every sharded
+    train (or only *train_ids*) where the two differ.  Returns the number of
+    trains updated; only those have their search results invalidated.
+    """
+    shard_total = (
+        SeatShard.objects.filter(train=OuterRef("pk"))
+        .values("train")
+        .annotate(total=Sum("available_seats"))
+        .values("total")
+    )
+    trains = Train.objects.filter(has_shards()).filter(
+        ~Q(available_seats=Subquery(shard_total))
+    )
+    if train_ids is not None:
+        trains = trains.filter(pk__in=train_ids)
+
+    # MySQL cannot UPDATE a table it also selects from in a subquery,
+    # so materialise the target PKs first.
+    pks = list(trains.values_list("pk", flat=True))
+    if not pks:
+        return 0
+    updated = Train.objects.filter(pk__in=pks).update(
+        available_seats=Subquery(shard_total)
+    )
+    search_cache.invalidate_routes(
+        [
+            search_cache.route_state(*route)
+            for route in Train.objects.filter(pk__in=pks).values_list(
+                "source",
+                "destination",
+                "departure_time",
+                "source_station_id",
+                "destination_station_id",
+            )
+        ]
+    )
+    return updated
+
+
+def clear_inventory(train_ids=None):
+    """Fold shards back into ``Train.available_seats`` and delete them."""
+    with transaction.atomic():
+        reconciled = reconcile_inventory(train_ids)
+        shards = SeatShard.objects.all()
+        if train_ids is not None:
+            shards = shards.filter(train_id__in=train_ids)
+        shards.delete()
+    return reconciled
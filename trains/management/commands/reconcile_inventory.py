@@ -0,0 +1,34 @@
+"""
+Recompute ``Train.available_seats`` from the sharded seat inventory.
+
+Usage:
+    python manage.py reconcile_inventory                 # run once
+    python manage.py reconcile_inventory --interval 5    # loop every 5 seconds
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from trains.inventory import reconcile_inventory
+
+
+class Command(BaseCommand):
+    help = "Refresh Train.available_seats from SeatShard counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Repeat every N seconds instead of running once.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        while True:
+            updated = reconcile_inventory()
+            self.stdout.write(f"Reconciled {updated} sharded train(s)")
+            if not interval:
+                return
+            time.sleep(interval)
@@ -0,0 +1,65 @@
+"""
+Split train seat inventory into ``SeatShard`` counter rows.
+
+Usage:
+    python manage.py shard_inventory 12301 12951          # default shard count
+    python manage.py shard_inventory --all --shards 16
+    python manage.py shard_inventory 12301 --clear        # fold shards back
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from trains.inventory import clear_inventory, split_inventory
+from trains.models import Train
+
+
+class Command(BaseCommand):
+    help = "Split (or merge back) train seat inventory across SeatShard rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "train_numbers",
+            nargs="*",
+            help="Train numbers to shard.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Shard every train that has not departed yet.",
+        )
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=settings.BOOKING_INVENTORY_SHARDS,
+            help="Number of counter rows per train (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Reconcile and delete shards instead of creating them.",
+        )
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            trains = Train.objects.filter(departure_time__gt=timezone.now())
+        elif options["train_numbers"]:
+            trains = Train.objects.filter(train_number__in=options["train_numbers"])
+        else:
+            raise CommandError("Pass one or more train numbers, or --all.")
+
+        if options["clear"]:
+            count = clear_inventory(list(trains.values_list("pk", flat=True)))
+            self.stdout.write(self.style.SUCCESS(f"Unsharded {count} train(s)"))
+            return
+
+        count = 0
+        for train in trains.iterator():
+            split_inventory(train, options["shards"])
+            count += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sharded {count} train(s) into {options['shards']} shard(s) each"
+            )
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-16 23:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trains', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(help_text='Shard number, 0 … N-1')),
+                ('available_seats', models.PositiveIntegerField(help_text='Seats still available in this shard')),
+                ('train', models.ForeignKey(help_text='The train this inventory slice belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='seat_shards', to='trains.train')),
+            ],
+            options={
+                'db_table': 'train_seat_shards',
+                'ordering': ['train', 'shard'],
+                'constraints': [models.UniqueConstraint(fields=('train', 'shard'), name='uniq_seat_shard_train_shard')],
+            },
+        ),
+    ]
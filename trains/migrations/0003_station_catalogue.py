@@ -0,0 +1,91 @@
+# Generated by Django 6.0 on 2026-10-16 23:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_stations(apps, schema_editor):
+    """Build the station catalogue from existing routes and link every train."""
+    Train = apps.get_model("trains", "Train")
+    Station = apps.get_model("trains", "Station")
+    StationToken = apps.get_model("trains", "StationToken")
+
+    names = set(Train.objects.values_list("source", flat=True).distinct())
+    names |= set(Train.objects.values_list("destination", flat=True).distinct())
+
+    for raw in sorted(names):
+        name = " ".join(raw.split())
+        station = Station.objects.filter(name__iexact=name).first()
+        if station is None:
+            station = Station.objects.create(name=name)
+            words = name.casefold().split()
+            StationToken.objects.bulk_create(
+                [
+                    StationToken(station=station, token=" ".join(words[i:]))
+                    for i in range(len(words))
+                ],
+                ignore_conflicts=True,
+            )
+        Train.objects.filter(source=raw).update(source_station=station)
+        Train.objects.filter(destination=raw).update(destination_station=station)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trains', '0002_seatshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Station',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(blank=True, help_text='Station code, e.g. NDLS', max_length=10, null=True, unique=True)),
+                ('name', models.CharField(help_text='Canonical station name, e.g. New Delhi', max_length=120, unique=True)),
+                ('aliases', models.JSONField(blank=True, default=list, help_text='Alternative names, e.g. ["Delhi", "NDLS Junction"]')),
+            ],
+            options={
+                'db_table': 'stations',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StationToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(help_text='Normalised word-suffix of a name or alias, or the code', max_length=120)),
+            ],
+            options={
+                'db_table': 'station_tokens',
+            },
+        ),
+        migrations.AddField(
+            model_name='train',
+            name='destination_station',
+            field=models.ForeignKey(blank=True, help_text='Catalogue entry for the arrival station', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='arrivals', to='trains.station'),
+        ),
+        migrations.AddField(
+            model_name='train',
+            name='source_station',
+            field=models.ForeignKey(blank=True, help_text='Catalogue entry for the departure station', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='departures', to='trains.station'),
+        ),
+        migrations.AddIndex(
+            model_name='train',
+            index=models.Index(fields=['source_station', 'destination_station', 'departure_time'], name='idx_train_station_route'),
+        ),
+        migrations.AddField(
+            model_name='stationtoken',
+            name='station',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='trains.station'),
+        ),
+        migrations.AddIndex(
+            model_name='stationtoken',
+            index=models.Index(fields=['token'], name='idx_station_token'),
+        ),
+        migrations.AddConstraint(
+            model_name='stationtoken',
+            constraint=models.UniqueConstraint(fields=('station', 'token'), name='uniq_station_token'),
+        ),
+        migrations.RunPython(link_stations, migrations.RunPython.noop),
+    ]
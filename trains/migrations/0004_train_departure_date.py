@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-16 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trains', '0003_station_catalogue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='train',
+            name='departure_date',
+            field=models.DateField(blank=True, editable=False, help_text='Local (TIME_ZONE) calendar date of departure_time, kept in sync on save', null=True),
+        ),
+    ]
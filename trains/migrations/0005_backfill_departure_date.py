@@ -0,0 +1,41 @@
+# Backfills Train.departure_date in small primary-key chunks, each in its
+# own short transaction, so the table is never locked for the whole run.
+
+from django.db import migrations, transaction
+from django.utils import timezone
+
+CHUNK_SIZE = 1000
+
+
+def backfill_departure_date(apps, schema_editor):
+    Train = apps.get_model("trains", "Train")
+    db = schema_editor.connection.alias
+
+    last_pk = 0
+    while True:
+        rows = list(
+            Train.objects.using(db)
+            .filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only("pk", "departure_time")[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        for train in rows:
+            train.departure_date = timezone.localtime(train.departure_time).date()
+        with transaction.atomic(using=db):
+            Train.objects.using(db).bulk_update(rows, ["departure_date"])
+        last_pk = rows[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('trains', '0004_train_departure_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_departure_date, migrations.RunPython.noop),
+    ]
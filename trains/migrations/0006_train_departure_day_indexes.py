@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-16 23:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trains', '0005_backfill_departure_date'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='train',
+            name='idx_train_station_route',
+        ),
+        migrations.AddIndex(
+            model_name='train',
+            index=models.Index(fields=['source_station', 'destination_station', 'departure_date', 'departure_time'], name='idx_train_station_day'),
+        ),
+        migrations.AddIndex(
+            model_name='train',
+            index=models.Index(fields=['departure_date', 'departure_time'], name='idx_train_departure_day'),
+        ),
+    ]
@@ -1,4 +1,237 @@
+from datetime import datetime
+
 from django.db import models
+from django.utils import timezone
+
+
+def normalise_name(value):
+    """Case-fold and collapse whitespace for station name matching."""
+    return " ".join(value.split()).casefold()
+
+
+def station_tokens(name, aliases=(), code=None):
+    """
+    Searchable keys for a station: every word-suffix of the canonical name
+    and of each alias (``"mumbai central"``, ``"central"``), plus the code.
+    Matching a query against these with ``LIKE 'q%'`` finds stations whose
+    name contains a word starting with *q*, using the token index.
+    """
+    tokens = set()
+    for text in (name, *aliases):
+        words = normalise_name(text).split()
+        tokens.update(" ".join(words[i:]) for i in range(len(words)))
+    if code:
+        tokens.add(normalise_name(code))
+    return tokens
+
+
+class StationQuerySet(models.QuerySet):
+    def matching_ids(self, query):
+        """IDs of all stations with a token starting with *query*."""
+        query = normalise_name(query)
+        if not query:
+            return []
+        return list(
+            StationToken.objects.filter(token__startswith=query)
+            .values_list("station_id", flat=True)
+            .distinct()
+        )
+
+    def for_name(self, name):
+        """Return the station called *name*, creating it if needed."""
+        name = " ".join(name.split())
+        station = self.filter(name__iexact=name).first()
+        if station is None:
+            # Looks the station up again if a concurrent insert wins the race
+            station, _ = self.get_or_create(
+                name__iexact=name, defaults={"name": name}
+            )
+        return station
+
+
+def station_resolver():
+    """``name → Station`` through ``for_name``, once per distinct name."""
+    resolved = {}
+
+    def resolve(name):
+        if name not in resolved:
+            resolved[name] = Station.objects.for_name(name)
+        return resolved[name]
+
+    return resolve
+
+
+def local_departure_date(departure_time):
+    """Calendar date of *departure_time* in the project time zone."""
+    return timezone.localtime(departure_time).date()
+
+
+class TrainQuerySet(models.QuerySet):
+    """
+    Keeps ``departure_date`` and the station FKs in step with
+    ``departure_time``, ``source`` and ``destination`` for bulk writes that
+    bypass ``Train.save()``.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        station = station_resolver()
+        for obj in objs:
+            if obj.source_station_id is None:
+                obj.source_station = station(obj.source)
+            if obj.destination_station_id is None:
+                obj.destination_station = station(obj.destination)
+            obj.departure_date = local_departure_date(obj.departure_time)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        station = station_resolver()
+        extra = []
+        for field, derived in self.model.DERIVED_FIELDS.items():
+            if field not in fields or derived in fields:
+                continue
+            for obj in objs:
+                value = getattr(obj, field)
+                if field == "departure_time":
+                    setattr(obj, derived, local_departure_date(value))
+                else:
+                    setattr(obj, derived, station(value))
+            extra.append(derived)
+        return super().bulk_update(objs, [*fields, *extra], *args, **kwargs)
+
+    def update(self, **kwargs):
+        expressions = []
+        for field, derived in self.model.DERIVED_FIELDS.items():
+            if field not in kwargs or derived in kwargs:
+                continue
+            value = kwargs[field]
+            if field == "departure_time" and isinstance(value, datetime):
+                kwargs[derived] = local_departure_date(value)
+            elif field != "departure_time" and isinstance(value, str):
+                kwargs[derived] = Station.objects.for_name(value)
+            else:
+                expressions.append(field)
+        if not expressions:
+            return super().update(**kwargs)
+
+        # An expression (e.g. F() + delta): recompute per row afterwards
+        pks = list(self.values_list("pk", flat=True))
+        updated = super().update(**kwargs)
+        rows = self.model.objects.filter(pk__in=pks)
+        if "departure_time" in expressions:
+            rows.sync_departure_dates()
+        if {"source", "destination"} & set(expressions):
+            rows.sync_stations()
+        return updated
+
+    def sync_departure_dates(self, chunk_size=1000):
+        """Recompute ``departure_date`` for every row, in PK-ordered chunks."""
+        last_pk = 0
+        queryset = self.order_by("pk").only("pk", "departure_time")
+        while True:
+            rows = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+            if not rows:
+                return
+            for row in rows:
+                row.departure_date = local_departure_date(row.departure_time)
+            self.model.objects.bulk_update(rows, ["departure_date"])
+            last_pk = rows[-1].pk
+
+    def sync_stations(self, chunk_size=1000):
+        """Point every row's station FKs at its names, in PK-ordered chunks."""
+        station = station_resolver()
+        last_pk = 0
+        queryset = self.order_by("pk").only("pk", "source", "destination")
+        while True:
+            rows = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+            if not rows:
+                return
+            for row in rows:
+                row.source_station = station(row.source)
+                row.destination_station = station(row.destination)
+            self.model.objects.bulk_update(
+                rows, ["source_station", "destination_station"]
+            )
+            last_pk = rows[-1].pk
+
+
+class Station(models.Model):
+    """
+    A station in the normalised catalogue that ``Train`` routes point to.
+    """
+
+    code = models.CharField(
+        max_length=10,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="Station code, e.g. NDLS",
+    )
+    name = models.CharField(
+        max_length=120,
+        unique=True,
+        help_text="Canonical station name, e.g. New Delhi",
+    )
+    aliases = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Alternative names, e.g. [\"Delhi\", \"NDLS Junction\"]",
+    )
+
+    objects = StationQuerySet.as_manager()
+
+    class Meta:
+        db_table = "stations"
+        ordering = ["name"]
+
+    def __str__(self):
+        return f"{self.name} ({self.code})" if self.code else self.name
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.rebuild_tokens()
+
+    def rebuild_tokens(self):
+        tokens = station_tokens(self.name, self.aliases, self.code)
+        StationToken.objects.filter(station=self).exclude(token__in=tokens).delete()
+        existing = set(
+            StationToken.objects.filter(station=self).values_list("token", flat=True)
+        )
+        StationToken.objects.bulk_create(
+            [StationToken(station=self, token=token) for token in tokens - existing]
+        )
+
+
+class StationToken(models.Model):
+    """
+    Prefix-searchable key for a station (see ``station_tokens``).
+    """
+
+    station = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        related_name="tokens",
+    )
+    token = models.CharField(
+        max_length=120,
+        help_text="Normalised word-suffix of a name or alias, or the code",
+    )
+
+    class Meta:
+        db_table = "station_tokens"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["station", "token"],
+                name="uniq_station_token",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["token"], name="idx_station_token"),
+        ]
+
+    def __str__(self):
+        return self.token
 
 
 class Train(models.Model):
@@ -23,9 +256,31 @@ class Train(models.Model):
         max_length=120,
         help_text="Arrival station name",
     )
+    source_station = models.ForeignKey(
+        Station,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="departures",
+        help_text="Catalogue entry for the departure station",
+    )
+    destination_station = models.ForeignKey(
+        Station,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="arrivals",
+        help_text="Catalogue entry for the arrival station",
+    )
     departure_time = models.DateTimeField(
         help_text="Scheduled departure date & time",
     )
+    departure_date = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Local (TIME_ZONE) calendar date of departure_time, kept in sync on save",
+    )
     arrival_time = models.DateTimeField(
         help_text="Scheduled arrival date & time",
     )
@@ -36,6 +291,8 @@ class Train(models.Model):
         help_text="Currently available seats for booking",
     )
 
+    objects = TrainQuerySet.as_manager()
+
     class Meta:
         db_table = "trains"
         indexes = [
@@ -49,13 +306,90 @@ class Train(models.Model):
             models.Index(fields=["source"], name="idx_train_source"),
             models.Index(fields=["destination"], name="idx_train_destination"),
             models.Index(fields=["departure_time"], name="idx_train_departure"),
+            # Station-catalogue search: integer keys + day equality, then
+            # departure order within the day
+            models.Index(
+                fields=[
+                    "source_station",
+                    "destination_station",
+                    "departure_date",
+                    "departure_time",
+                ],
+                name="idx_train_station_day",
+            ),
+            # Date-only searches
+            models.Index(
+                fields=["departure_date", "departure_time"],
+                name="idx_train_departure_day",
+            ),
         ]
         ordering = ["departure_time"]
 
     def __str__(self):
         return f"{self.train_number} — {self.name} ({self.source} → {self.destination})"
 
+    # Derived columns refreshed whenever their source field is saved
+    DERIVED_FIELDS = {
+        "source": "source_station",
+        "destination": "destination_station",
+        "departure_time": "departure_date",
+    }
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "source" in update_fields:
+            self.source_station = Station.objects.for_name(self.source)
+        if update_fields is None or "destination" in update_fields:
+            self.destination_station = Station.objects.for_name(self.destination)
+        if update_fields is None or "departure_time" in update_fields:
+            self.departure_date = local_departure_date(self.departure_time)
+        if update_fields is not None:
+            extra = {
+                derived
+                for field, derived in self.DERIVED_FIELDS.items()
+                if field in update_fields
+            }
+            kwargs["update_fields"] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
+
     @property
     def is_available(self):
         """Check if seats are still available for booking."""
         return self.available_seats > 0
+
+
+class SeatShard(models.Model):
+    """
+    One slice of a train's seat inventory.
+
+    With the ``sharded`` booking strategy a train's seats are split across
+    several counter rows so that concurrent bookings on the same train
+    decrement different rows instead of serialising on ``trains.available_seats``.
+    ``Train.available_seats`` is then a reconciled aggregate of these rows.
+    """
+
+    train = models.ForeignKey(
+        Train,
+        on_delete=models.CASCADE,
+        related_name="seat_shards",
+        help_text="The train this inventory slice belongs to",
+    )
+    shard = models.PositiveSmallIntegerField(
+        help_text="Shard number, 0 … N-1",
+    )
+    available_seats = models.PositiveIntegerField(
+        help_text="Seats still available in this shard",
+    )
+
+    class Meta:
+        db_table = "train_seat_shards"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["train", "shard"],
+                name="uniq_seat_shard_train_shard",
+            ),
+        ]
+        ordering = ["train", "shard"]
+
+    def __str__(self):
+        return f"{self.train_id}#{self.shard}: {self.available_seats} seat(s)"
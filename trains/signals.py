@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache as search_cache
+from . import suggest
+from .models import Station, Train, station_tokens
+
+ROUTE_FIELDS = {"source", "destination", "departure_time"}
+ROUTE_COLUMNS = (
+    "source",
+    "destination",
+    "departure_time",
+    "source_station_id",
+    "destination_station_id",
+)
+
+
+@receiver(pre_save, sender=Train)
+def remember_old_route(sender, instance, update_fields=None, **kwargs):
+    """Capture the pre-update route so searches matching it are invalidated too."""
+    instance._old_route_state = None
+    if not search_cache.enabled() or instance.pk is None:
+        return
+    if update_fields is not None and not ROUTE_FIELDS & set(update_fields):
+        return
+    old = (
+        Train.objects.filter(pk=instance.pk)
+        .values_list(*ROUTE_COLUMNS)
+        .first()
+    )
+    if old:
+        instance._old_route_state = search_cache.route_state(*old)
+
+
+@receiver(post_save, sender=Train)
+def invalidate_search_on_save(sender, instance, **kwargs):
+    search_cache.invalidate_routes(
+        [
+            getattr(instance, "_old_route_state", None),
+            search_cache.route_state(*search_cache.route_fields(instance)),
+        ]
+    )
+
+
+@receiver(post_delete, sender=Train)
+def invalidate_search_on_delete(sender, instance, **kwargs):
+    search_cache.invalidate_train(instance)
+
+
+@receiver(pre_save, sender=Station)
+def remember_old_tokens(sender, instance, **kwargs):
+    """Capture the pre-update tokens so searches that resolved them are bumped."""
+    instance._old_tokens = set()
+    if not search_cache.enabled() or instance.pk is None:
+        return
+    old = (
+        Station.objects.filter(pk=instance.pk)
+        .values_list("name", "aliases", "code")
+        .first()
+    )
+    if old:
+        instance._old_tokens = station_tokens(*old)
+
+
+@receiver(post_save, sender=Station)
+def invalidate_search_on_station_save(sender, instance, **kwargs):
+    search_cache.invalidate_stations(
+        getattr(instance, "_old_tokens", set())
+        ^ station_tokens(instance.name, instance.aliases, instance.code)
+    )
+
+
+@receiver(post_delete, sender=Station)
+def invalidate_search_on_station_delete(sender, instance, **kwargs):
+    search_cache.invalidate_stations(
+        station_tokens(instance.name, instance.aliases, instance.code)
+    )
+
+
+@receiver(post_save, sender=Station)
+def refresh_suggest_on_station_save(sender, instance, **kwargs):
+    transaction.on_commit(lambda: suggest.note_stations_changed([instance.pk]))
+
+
+@receiver(post_delete, sender=Station)
+def refresh_suggest_on_station_delete(sender, instance, **kwargs):
+    station_id = instance.pk
+    transaction.on_commit(lambda: suggest.note_stations_changed([station_id]))
+
+
+@receiver(post_save, sender=Train)
+def refresh_suggest_on_train_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not ROUTE_FIELDS & set(update_fields):
+        return
+    station_ids = [instance.source_station_id, instance.destination_station_id]
+    transaction.on_commit(
+        lambda: suggest.note_stations_changed([pk for pk in station_ids if pk])
+    )
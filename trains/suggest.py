@@ -0,0 +1,206 @@
+"""
+In-process station autocomplete index for ``/api/trains/stations/suggest/``.
+
+The index is a sorted array of ``(token, station)`` pairs built from the
+station catalogue (every word-suffix of each name and alias, plus the
+code), sorted once when built, so a prefix query is two ``bisect`` calls
+and a small top-K over the matching slice (at most
+``STATION_SUGGEST_MAX_MATCHES`` entries of it).  Stations are ranked by how often they appear as a
+source or destination in searches (the all-time ``route_counts``).
+
+Lifecycle (per worker process):
+
+* built lazily on the first suggest request;
+* a train/station change or station deletion in this process is applied
+  to the local index immediately (a changed station's old tokens dropped) and bumps a generation counter in the shared cache;
+* other workers notice the new generation (checked at most every
+  ``STATION_SUGGEST_CHECK_INTERVAL`` seconds) and rebuild in a background
+  thread, as they do when the popularity weights age past
+  ``STATION_SUGGEST_WEIGHTS_TTL``.
+
+Requests never wait on MySQL or MongoDB once the index exists.
+"""
+
+import bisect
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from config.shared_cache import shared_cache
+
+from .models import Station, normalise_name, station_tokens
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "suggest:generation"
+
+# Searches per lower-cased station name, from the all-time route counters
+POPULARITY_PIPELINE = [
+    {"$match": {"granularity": "all", "bucket": None}},
+    {"$project": {"names": ["$source", "$destination"], "count": 1}},
+    {"$unwind": "$names"},
+    {"$group": {"_id": {"$toLower": "$names"}, "count": {"$sum": "$count"}}},
+]
+
+
+def load_popularity():
+    """``{normalised station name: search count}`` from the route counters."""
+    from analytics.mongo import get_collection
+    from analytics.routes import COLLECTION
+
+    try:
+        return {
+            normalise_name(row["_id"]): row["count"]
+            for row in get_collection(COLLECTION).aggregate(POPULARITY_PIPELINE)
+        }
+    except Exception:
+        logger.exception("Could not load station popularity from MongoDB")
+        return {}
+
+
+class StationSuggestIndex:
+    """Sorted-array prefix index with popularity ranking."""
+
+    def __init__(self, stations, popularity):
+        self._lock = threading.Lock()
+        self.popularity = popularity
+        self.stations = {}
+        self.tokens = {}  # station id → its tokens, to drop them on change
+        entries = []
+        for station in stations:
+            entries.extend(self._register(station))
+        entries.sort()
+        self.entries = entries
+        self.keys = [token for token, _ in entries]
+        self.built_at = time.monotonic()
+
+    def _weight(self, station):
+        names = [station["name"], *station["aliases"]]
+        return sum(self.popularity.get(normalise_name(name), 0) for name in names)
+
+    def _register(self, station):
+        """Record *station*; returns its ``(token, id)`` entries."""
+        station = {**station, "score": self._weight(station)}
+        tokens = station_tokens(station["name"], station["aliases"], station["code"])
+        self.stations[station["id"]] = station
+        self.tokens[station["id"]] = tokens
+        return [(token, station["id"]) for token in tokens]
+
+    def _remove(self, station_id):
+        self.stations.pop(station_id, None)
+        for token in self.tokens.pop(station_id, ()):
+            entry = (token, station_id)
+            pos = bisect.bisect_left(self.entries, entry)
+            if pos < len(self.entries) and self.entries[pos] == entry:
+                del self.entries[pos]
+                del self.keys[pos]
+
+    def add(self, station):
+        """Insert or replace *station*, dropping the tokens of its old names."""
+        with self._lock:
+            self._remove(station["id"])
+            for entry in self._register(station):
+                pos = bisect.bisect_left(self.entries, entry)
+                self.entries.insert(pos, entry)
+                self.keys.insert(pos, entry[0])
+
+    def remove(self, station_id):
+        with self._lock:
+            self._remove(station_id)
+
+    def suggest(self, query, limit=10):
+        query = normalise_name(query)
+        if not query:
+            return []
+        with self._lock:
+            lo = bisect.bisect_left(self.keys, query)
+            hi = bisect.bisect_left(self.keys, query + "\uffff")
+            # A broad prefix ranks only its first matches, in token order
+            hi = min(hi, lo + settings.STATION_SUGGEST_MAX_MATCHES)
+            matched = {station_id for _, station_id in self.entries[lo:hi]}
+            best = heapq.nsmallest(
+                limit,
+                (self.stations[station_id] for station_id in matched),
+                key=lambda s: (-s["score"], s["name"]),
+            )
+        return [
+            {"name": s["name"], "code": s["code"], "score": s["score"]} for s in best
+        ]
+
+
+def _station_rows(queryset=None):
+    queryset = queryset if queryset is not None else Station.objects.all()
+    return list(queryset.values("id", "name", "code", "aliases"))
+
+
+# ── Per-process index management ────────────────────────────────
+
+_index = None
+_generation = None
+_checked_at = 0.0
+_rebuilding = threading.Lock()
+
+
+def _build():
+    global _index, _generation
+    generation = shared_cache().get(GENERATION_KEY, 0)
+    _index = StationSuggestIndex(_station_rows(), load_popularity())
+    _generation = generation
+
+
+def _rebuild_in_background():
+    if not _rebuilding.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            _build()
+        except Exception:
+            logger.exception("Station suggest index rebuild failed")
+        finally:
+            _rebuilding.release()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_index():
+    """Return this worker's index, building it on first use."""
+    global _checked_at
+    if _index is None:
+        with _rebuilding:
+            if _index is None:
+                _build()
+        return _index
+
+    now = time.monotonic()
+    if now - _checked_at >= settings.STATION_SUGGEST_CHECK_INTERVAL:
+        _checked_at = now
+        stale = now - _index.built_at >= settings.STATION_SUGGEST_WEIGHTS_TTL
+        if stale or shared_cache().get(GENERATION_KEY, 0) != _generation:
+            _rebuild_in_background()
+    return _index
+
+
+def note_stations_changed(station_ids):
+    """
+    Apply station changes (including deletions) locally and tell the other
+    workers to refresh.
+    """
+    global _generation
+    cache = shared_cache()
+    cache.add(GENERATION_KEY, 0, None)
+    try:
+        generation = cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation = None
+    if _index is not None:
+        rows = _station_rows(Station.objects.filter(pk__in=station_ids))
+        for row in rows:
+            _index.add(row)
+        for station_id in set(station_ids) - {row["id"] for row in rows}:
+            _index.remove(station_id)  # deleted
+        if generation is not None and generation == (_generation or 0) + 1:
+            _generation = generation  # nobody else changed anything meanwhile
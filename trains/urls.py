@@ -1,9 +1,19 @@
 from django.urls import path
 
-from .views import TrainDetailView, TrainListCreateView, TrainSearchView
+from .views import (
+    StationSuggestView,
+    TrainDetailView,
+    TrainListCreateView,
+    TrainSearchView,
+)
 
 urlpatterns = [
     path("", TrainListCreateView.as_view(), name="train-create"),
     path("search/", TrainSearchView.as_view(), name="train-search"),
+    path(
+        "stations/suggest/",
+        StationSuggestView.as_view(),
+        name="station-suggest",
+    ),
     path("<int:pk>/", TrainDetailView.as_view(), name="train-detail"),
 ]
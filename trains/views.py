@@ -1,13 +1,26 @@
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework import serializers
 from rest_framework.generics import CreateAPIView, ListAPIView, RetrieveUpdateAPIView
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from accounts.authentication import StatelessJWTAuthentication
 from accounts.permissions import IsAdminUserRole
+from config.pagination import HybridPagination
 
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.utils import (
+    OpenApiParameter,
+    extend_schema,
+    extend_schema_view,
+    inline_serializer,
+)
 
+from . import cache as search_cache
+from . import suggest
 from .filters import TrainFilter
+from .inventory import split_inventory
 from .models import Train
 from .serializers import TrainSerializer
 
@@ -28,7 +41,7 @@ class TrainListCreateView(CreateAPIView):
 
     queryset = Train.objects.all()
     serializer_class = TrainSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAdminUserRole]
 
 
@@ -58,9 +71,23 @@ class TrainDetailView(RetrieveUpdateAPIView):
 
     queryset = Train.objects.all()
     serializer_class = TrainSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAdminUserRole]
 
+    def perform_update(self, serializer):
+        train = serializer.save()
+
+        # An explicit seat count overrides the sharded inventory, if any
+        shards = train.seat_shards.count()
+        if shards and "available_seats" in serializer.validated_data:
+            split_inventory(train, shards)
+
+
+class TrainSearchPagination(HybridPagination):
+    """Limit/offset by default; ``?pagination=cursor`` seeks on (departure_time, id)."""
+
+    ordering = ("departure_time", "id")
+
 
 @extend_schema_view(
     get=extend_schema(
@@ -68,25 +95,39 @@ class TrainDetailView(RetrieveUpdateAPIView):
         summary="Search trains",
         description=(
             "Public endpoint — search trains by source, destination, and/or date.\n"
-            "Supports LimitOffset pagination via `?limit=N&offset=M`.\n\n"
+            "Supports LimitOffset pagination via `?limit=N&offset=M`, or keyset "
+            "pagination via `?pagination=cursor` (follow the `next` / `previous` "
+            "links; add `&count=true` for a total).\n\n"
             "Filters (all optional):\n"
-            "• `source` — partial match on departure station\n"
-            "• `destination` — partial match on arrival station\n"
-            "• `date` — YYYY-MM-DD; trains departing on that calendar day"
+            "• `source` — departure station name, alias or code (word-prefix match)\n"
+            "• `destination` — arrival station name, alias or code (word-prefix match)\n"
+            "• `date` — YYYY-MM-DD; trains departing on that calendar day\n\n"
+            "Responses are served from a read-through cache when enabled; "
+            "the `X-Cache` header reports `HIT` or `MISS`. Send the previous "
+            "`ETag` in `If-None-Match` to get `304 Not Modified` when no "
+            "matching train changed."
         ),
     )
 )
+@method_decorator(condition(etag_func=search_cache.search_etag), name="get")
 class TrainSearchView(ListAPIView):
     """
     GET /api/trains/search/?source=Delhi&destination=Mumbai&date=2026-03-01
 
     Public endpoint — search trains by source, destination, and/or date.
-    Supports LimitOffset pagination via ``?limit=N&offset=M``.
+    Supports LimitOffset pagination via ``?limit=N&offset=M``, or keyset
+    pagination on (departure_time, id) via ``?pagination=cursor``.
 
     Filters (all optional):
-        source       — partial, case-insensitive match on departure station
-        destination  — partial, case-insensitive match on arrival station
+        source       — departure station name, alias or code (see ``TrainFilter``)
+        destination  — arrival station name, alias or code
         date         — YYYY-MM-DD; trains departing on that calendar day
+
+    Pages are cached per filter scope (see ``trains.cache``) and invalidated
+    when a matching train is saved or its seats change.  The scope version
+    doubles as the ETag (within a ``SEARCH_CACHE_TIMEOUT`` time bucket), so
+    conditional requests are answered with 304 without touching the
+    database.
     """
 
     queryset = Train.objects.all()
@@ -94,4 +135,66 @@ class TrainSearchView(ListAPIView):
     permission_classes = [AllowAny]
     authentication_classes = []
     filterset_class = TrainFilter
-    pagination_class = LimitOffsetPagination
+    pagination_class = TrainSearchPagination
+
+    def list(self, request, *args, **kwargs):
+        if not search_cache.enabled():
+            return super().list(request, *args, **kwargs)
+
+        key = search_cache.page_key(request)
+        data = search_cache.get_page(key)
+        if data is not None:
+            return Response(data, headers={"X-Cache": "HIT"})
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            search_cache.set_page(key, response.data, request)
+        response["X-Cache"] = "MISS"
+        return response
+
+
+class StationSuggestView(APIView):
+    """
+    GET /api/trains/stations/suggest/?q=mum&limit=10
+
+    Public endpoint — ranked station-name suggestions for autocomplete.
+    Served from an in-process prefix index (see ``trains.suggest``) with no
+    database round trip; stations are ranked by search popularity.
+    """
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = []  # in-memory lookup; meant to be called per keystroke
+
+    MAX_LIMIT = 25
+
+    @extend_schema(
+        tags=["Trains"],
+        summary="Suggest stations",
+        description=(
+            "Ranked station suggestions for autocomplete. Matches any word of a "
+            "station name or alias, or the station code, starting with `q`."
+        ),
+        parameters=[
+            OpenApiParameter("q", str, description="Prefix typed by the user"),
+            OpenApiParameter("limit", int, description="Max suggestions (≤ 25)"),
+        ],
+        responses={
+            200: inline_serializer(
+                name="StationSuggestion",
+                many=True,
+                fields={
+                    "name": serializers.CharField(),
+                    "code": serializers.CharField(allow_null=True),
+                    "score": serializers.IntegerField(),
+                },
+            )
+        },
+    )
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), self.MAX_LIMIT)
+        except ValueError:
+            limit = 10
+        query = request.query_params.get("q", "")
+        return Response(suggest.get_index().suggest(query, max(limit, 1)))